@@ -1,5 +1,9 @@
 from app.app_state import app_state
-from core.profiles import delete_reference_files
+from core.profiles import (
+    delete_reference_files,
+    get_reference_search_region,
+    set_reference_search_region,
+)
 
 
 class ReferenceController:
@@ -28,3 +32,18 @@ class ReferenceController:
         if app_state.selected_reference == ref_name:
             app_state.selected_reference = None
         return True, message
+
+    def toggle_search_region(self, ref_name):
+        """Mutates: reference search region flag. Does NOT mutate: app_state. Returns: (bool, str)."""
+        if app_state.monitoring_active:
+            return False, "Stop monitoring before changing search regions."
+        if not app_state.active_profile:
+            return False, "No profile selected."
+        region = get_reference_search_region(app_state.active_profile, ref_name)
+        if region is None:
+            return False, "Reference has no stored crop region."
+        return set_reference_search_region(
+            app_state.active_profile,
+            ref_name,
+            not region.search_enabled,
+        )
@@ -2,11 +2,20 @@
 import sys
 from pathlib import Path
 
-from PyQt6.QtCore import QCoreApplication
+from PyQt6.QtCore import QCoreApplication, QSettings
 from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import QApplication
 
 from app.ui.app_shell import AppShell
+from core import storage
+from core.asset_sync import asset_sync
+from core.debug_writer import debug_writer
+from core.profiles import (
+    start_asset_integrity_checks,
+    start_asset_watcher,
+    stop_asset_integrity_checks,
+    stop_asset_watcher,
+)
 from core.logging_setup import setup_logging
 
 
@@ -101,10 +110,21 @@ def main():
 
     app.setStyleSheet(LIGHT_THEME_STYLESHEET)
 
+    # The live watcher is optional; without it changes are picked up when profiles are listed.
+    if QSettings().value("assets/watch_filesystem", True, bool):
+        start_asset_watcher()
+    start_asset_integrity_checks()
+
     shell = AppShell()
     if not app_icon.isNull():
         shell.setWindowIcon(app_icon)
     shell.show()
+    app.aboutToQuit.connect(stop_asset_watcher)
+    app.aboutToQuit.connect(stop_asset_integrity_checks)
+    # Workers are joined first so no connection is closed under a running job.
+    app.aboutToQuit.connect(debug_writer.stop)
+    app.aboutToQuit.connect(asset_sync.stop)
+    app.aboutToQuit.connect(storage.close_connections)
     sys.exit(app.exec())
 
 
@@ -0,0 +1,35 @@
+"""Qt bridge that re-emits asset watcher notifications on the GUI thread."""
+from __future__ import annotations
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from core.asset_watcher import asset_watcher
+
+
+class AssetEvents(QObject):
+    """Emits assets_changed(kind, profile_name) for changes applied by the watcher.
+
+    The watcher calls from its own thread; signal delivery to widgets is queued,
+    so connected panels refresh on the GUI thread. profile_name is "" for
+    debug and profile-list changes.
+    """
+
+    assets_changed = pyqtSignal(str, str)
+
+    def __init__(self):
+        super().__init__()
+        asset_watcher.subscribe(self._forward)
+
+    def _forward(self, kind, profile_name):
+        self.assets_changed.emit(kind, profile_name or "")
+
+
+_asset_events: AssetEvents | None = None
+
+
+def get_asset_events() -> AssetEvents:
+    """Return the process-wide bridge, creating it on first use."""
+    global _asset_events
+    if _asset_events is None:
+        _asset_events = AssetEvents()
+    return _asset_events
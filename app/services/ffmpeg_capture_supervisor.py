@@ -1,4 +1,8 @@
-"""Supervise FFmpeg capture process and publish raw frames to FrameQueue."""
+"""Supervise FFmpeg capture process and publish raw frames to a FrameBus or FrameQueue.
+
+Frames are read with readinto() straight into preallocated FrameRing slabs,
+so steady-state capture performs no per-frame allocation or copy.
+"""
 from __future__ import annotations
 
 import logging
@@ -9,8 +13,13 @@ import time
 from dataclasses import dataclass
 from enum import Enum
 
+import numpy as np
+
 from app.services.ffmpeg_tools import CaptureConfig, FfmpegNotFoundError, build_ffmpeg_capture_command
-from app.services.frame_bus import FramePacket, FrameQueue
+from app.services.frame_bus import FrameBus, FramePacket, FrameQueue
+from app.services.frame_ring import RING_SPARE_SLOTS, FrameRing
+
+RING_ACQUIRE_TIMEOUT = 0.5  # seconds the reader waits for a free slot before discarding a frame
 
 
 class LogLevel(str, Enum):
@@ -26,7 +35,7 @@ class FfmpegLogEvent:
 
 
 class FfmpegCaptureSupervisor:
-    def __init__(self, input_token: str, config: CaptureConfig, frame_queue: FrameQueue):
+    def __init__(self, input_token: str, config: CaptureConfig, frame_queue: FrameBus | FrameQueue):
         self.input_token = input_token
         self.config = config
         self.frame_queue = frame_queue
@@ -35,6 +44,8 @@ class FfmpegCaptureSupervisor:
         self._reader_thread: threading.Thread | None = None
         self._stderr_thread: threading.Thread | None = None
         self.frames_captured = 0
+        self.frames_discarded = 0
+        self.ring: FrameRing | None = None
         self.log_events: "queue.Queue[FfmpegLogEvent]" = queue.Queue(maxsize=512)
         self.last_error: str | None = None
 
@@ -61,13 +72,23 @@ class FfmpegCaptureSupervisor:
     def _reader_loop(self) -> None:
         if not self.process or not self.process.stdout:
             return
-        frame_size = self.config.width * self.config.height * 3
+        shape = self.config.frame_shape
+        self.ring = FrameRing(self.frame_queue.maxlen + RING_SPARE_SLOTS, shape)
+        # Frames that arrive while every slot is held are read here and discarded.
+        scratch = memoryview(np.empty(shape, dtype=np.uint8)).cast("B")
+        stream = self.process.stdout
         try:
             while not self._stop.is_set():
-                frame = self._read_exact(self.process.stdout, frame_size)
-                if frame is None:
+                slot = self.ring.acquire(timeout=RING_ACQUIRE_TIMEOUT)
+                if slot is None:
+                    if not self._read_exact_into(stream, scratch):
+                        break
+                    self.frames_discarded += 1
+                    continue
+                if not self._read_exact_into(stream, slot.view):
+                    slot.release()
                     break
-                self.frame_queue.put(FramePacket(timestamp=time.time(), payload=frame))
+                self.frame_queue.put(FramePacket(timestamp=time.time(), payload=slot.array, slot=slot))
                 self.frames_captured += 1
         except Exception as exc:
             self.last_error = f"FFmpeg frame reader failed: {exc}"
@@ -109,14 +130,16 @@ class FfmpegCaptureSupervisor:
         return LogLevel.INFO
 
     @staticmethod
-    def _read_exact(stream, size: int) -> bytes | None:
-        data = bytearray()
-        while len(data) < size:
-            chunk = stream.read(size - len(data))
-            if not chunk:
-                return None
-            data.extend(chunk)
-        return bytes(data)
+    def _read_exact_into(stream, view: memoryview) -> bool:
+        """Fill view completely from stream; False on end of stream."""
+        filled = 0
+        total = len(view)
+        while filled < total:
+            count = stream.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        return True
 
     def stop(self, timeout: float = 5.0) -> None:
         self._stop.set()
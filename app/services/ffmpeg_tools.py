@@ -5,13 +5,16 @@ import logging
 import os
 import platform
 import subprocess
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
 
 from app.services.camera_enumerator import CameraDevice, enumerate_video_devices
 
 LOG = logging.getLogger(__name__)
 
+PIXEL_FORMAT_BGR = "bgr24"
+PIXEL_FORMAT_GRAY = "gray"  # the luma plane only; a third of bgr24 pipe bandwidth
+
 
 class FfmpegNotFoundError(RuntimeError):
     """Raised when FFmpeg cannot be located."""
@@ -19,9 +22,65 @@ class FfmpegNotFoundError(RuntimeError):
 
 @dataclass(frozen=True)
 class CaptureConfig:
+    """Camera input mode plus the optional FFmpeg-side filter stage.
+
+    width/height/fps describe the camera input and crop is (x, y, w, h) in
+    input pixels; frames on the pipe have output_size and pixel_format. There
+    is deliberately no scale stage: detection maps captured pixels back to
+    input coordinates by the crop origin alone.
+    """
+
     width: int
     height: int
     fps: int
+    crop: tuple[int, int, int, int] | None = None
+    pixel_format: str = PIXEL_FORMAT_BGR
+
+    @property
+    def output_size(self) -> tuple[int, int]:
+        if self.crop:
+            return self.crop[2], self.crop[3]
+        return self.width, self.height
+
+    @property
+    def origin(self) -> tuple[int, int]:
+        """Top-left of the output frame in input pixel coordinates."""
+        return (self.crop[0], self.crop[1]) if self.crop else (0, 0)
+
+    @property
+    def channels(self) -> int:
+        return 1 if self.pixel_format == PIXEL_FORMAT_GRAY else 3
+
+    @property
+    def frame_shape(self) -> tuple[int, ...]:
+        width, height = self.output_size
+        return (height, width) if self.channels == 1 else (height, width, self.channels)
+
+    @property
+    def frame_bytes(self) -> int:
+        width, height = self.output_size
+        return width * height * self.channels
+
+    def video_filter(self) -> str | None:
+        """Return the -vf crop filter, or None when frames pass through unfiltered."""
+        if not self.crop:
+            return None
+        x, y, w, h = self.crop
+        return f"crop={w}:{h}:{x}:{y}"
+
+
+def detection_capture_config(
+    config: CaptureConfig, crop: tuple[int, int, int, int] | None = None
+) -> CaptureConfig:
+    """Return config with grayscale output and crop clamped to the input frame."""
+    if crop is not None:
+        x, y, w, h = (int(v) for v in crop)
+        x = max(0, min(x, config.width - 1))
+        y = max(0, min(y, config.height - 1))
+        w = max(1, min(w, config.width - x))
+        h = max(1, min(h, config.height - y))
+        crop = None if (x, y, w, h) == (0, 0, config.width, config.height) else (x, y, w, h)
+    return replace(config, crop=crop, pixel_format=PIXEL_FORMAT_GRAY)
 
 
 _ENUM_CACHE: list[CameraDevice] | None = None
@@ -131,8 +190,13 @@ def build_ffmpeg_capture_command(input_token: str, config: CaptureConfig):
         str(config.fps),
         "-i",
         input_token,
+    ]
+    video_filter = config.video_filter()
+    if video_filter:
+        cmd += ["-vf", video_filter]
+    cmd += [
         "-pix_fmt",
-        "bgr24",
+        config.pixel_format,
         "-f",
         "rawvideo",
         "pipe:1",
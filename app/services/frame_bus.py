@@ -1,44 +1,90 @@
-"""Thread-safe frame bus with bounded policies and stale-marking semantics."""
+"""Thread-safe frame bus with bounded policies and stale-marking semantics.
+
+Packets may reference a FrameRing slot. The queue owns one reference per
+queued packet: frames it drops are released, get() hands the reference to
+the caller (who must call packet.release()), and peek_latest(retain=True)
+adds a reference for the caller.
+
+FrameBus broadcasts every published packet to all subscribers. Each
+subscriber is its own FrameQueue (its cursor into the stream) with its own
+length, overflow policy and drop counters, so a slow consumer never steals
+or delays frames meant for another.
+"""
 from __future__ import annotations
 
 import threading
+import time
 from collections import deque
 from dataclasses import dataclass
 from enum import Enum
-from typing import Deque
+from typing import Any, Deque, Iterable
+
+from app.services.frame_ring import FrameSlot
 
 
 class OverflowPolicy(str, Enum):
     DROP_OLDEST = "drop_oldest"
     LAST_ONLY = "last_only"
+    BLOCK = "block"  # publisher waits for room, up to BUS_BLOCK_TIMEOUT, then drops oldest
+
+
+BUS_MAX_PENDING = 10  # packets all subscribers plus the latest frame may hold; sizes the capture ring
+BUS_BLOCK_TIMEOUT = 1.0  # seconds a BLOCK subscriber may stall the publisher per frame
 
 
 @dataclass(frozen=True)
 class FramePacket:
     timestamp: float
-    payload: bytes
+    payload: Any  # bytes or a numpy view into a FrameRing slot
     stale: bool = False
+    slot: FrameSlot | None = None
+
+    def retain(self) -> "FramePacket":
+        if self.slot is not None:
+            self.slot.retain()
+        return self
+
+    def release(self) -> None:
+        if self.slot is not None:
+            self.slot.release()
+
+
+def _release(packet) -> None:
+    release = getattr(packet, "release", None)
+    if release is not None:
+        release()
 
 
 class FrameQueue:
-    def __init__(self, maxlen: int = 8, policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST):
+    def __init__(
+        self,
+        maxlen: int = 8,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        name: str = "",
+    ):
         self.maxlen = max(1, int(maxlen))
         self.policy = policy
+        self.name = name
         self._queue: Deque[FramePacket] = deque(maxlen=self.maxlen)
         self._cv = threading.Condition()
         self.dropped_frames = 0
         self.dropped = 0  # backward-compatible alias
+        self.delivered = 0  # packets handed out by get() or get_latest()
+        self.shed_frames = 0  # older packets skipped by get_latest()
         self.stale = False
 
-    def put(self, packet: FramePacket) -> None:
+    def put(self, packet: FramePacket, timeout: float = BUS_BLOCK_TIMEOUT) -> None:
         with self._cv:
+            if self.policy == OverflowPolicy.BLOCK and len(self._queue) >= self.maxlen:
+                self._cv.wait_for(lambda: len(self._queue) < self.maxlen, timeout=timeout)
             if self.policy == OverflowPolicy.LAST_ONLY:
                 dropped_now = len(self._queue)
-                self._queue.clear()
+                while self._queue:
+                    _release(self._queue.popleft())
                 self.dropped_frames += dropped_now
                 self.dropped += dropped_now
             elif len(self._queue) >= self.maxlen:
-                self._queue.popleft()
+                _release(self._queue.popleft())
                 self.dropped_frames += 1
                 self.dropped += 1
             self._queue.append(packet)
@@ -50,17 +96,141 @@ class FrameQueue:
                 self._cv.wait(timeout=timeout)
             if not self._queue:
                 return None
-            return self._queue.popleft()
+            self.delivered += 1
+            packet = self._queue.popleft()
+            self._cv.notify_all()
+            return packet
 
-    def peek_latest(self) -> FramePacket | None:
+    def get_latest(self, timeout: float | None = None) -> FramePacket | None:
+        """Like get(), but take the newest packet and release the older ones as shed."""
         with self._cv:
-            return self._queue[-1] if self._queue else None
+            if not self._queue:
+                self._cv.wait(timeout=timeout)
+            if not self._queue:
+                return None
+            packet = self._queue.pop()
+            shed = len(self._queue)
+            while self._queue:
+                _release(self._queue.popleft())
+            self.shed_frames += shed
+            self.delivered += 1
+            self._cv.notify_all()
+            return packet
+
+    def peek_latest(self, retain: bool = False) -> FramePacket | None:
+        """Return the newest packet without removing it; retain=True adds a caller reference."""
+        with self._cv:
+            if not self._queue:
+                return None
+            packet = self._queue[-1]
+            if retain:
+                packet.retain()
+            return packet
 
     def clear(self, stale: bool = True) -> None:
         with self._cv:
-            self._queue.clear()
+            while self._queue:
+                _release(self._queue.popleft())
             self.stale = stale
+            self._cv.notify_all()
 
     def size(self) -> int:
         with self._cv:
             return len(self._queue)
+
+    def stats(self, now: float | None = None) -> dict:
+        """Return pending count, age of the oldest pending frame and drop counters."""
+        now = time.time() if now is None else now
+        with self._cv:
+            oldest = getattr(self._queue[0], "timestamp", None) if self._queue else None
+            return {
+                "policy": self.policy.value,
+                "pending": len(self._queue),
+                "maxlen": self.maxlen,
+                "lag_ms": max(0.0, (now - oldest) * 1000.0) if oldest is not None else 0.0,
+                "delivered": self.delivered,
+                "dropped": self.dropped_frames,
+                "shed": self.shed_frames,
+            }
+
+
+class FrameBus:
+    """Broadcast publisher: every subscriber receives every packet in its own queue.
+
+    publish() takes over the caller's packet reference, retains one more per
+    subscriber and one for the latest-frame slot used by previews and
+    snapshots, then drops its own. Ring slots are therefore reused only once
+    every subscriber that received the frame has released it.
+    """
+
+    def __init__(self, max_pending: int = BUS_MAX_PENDING):
+        self.maxlen = max(1, int(max_pending))  # capture ring sizing, as for FrameQueue
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, FrameQueue] = {}
+        self._latest: FramePacket | None = None
+        self.published = 0
+        self.stale = False
+
+    def subscribe(
+        self,
+        name: str,
+        maxlen: int = 8,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ) -> FrameQueue:
+        """Register a consumer and return its queue. Frames published earlier are not replayed."""
+        with self._lock:
+            if name in self._subscribers:
+                raise ValueError(f"Frame bus subscriber '{name}' already exists.")
+            queue = FrameQueue(maxlen=maxlen, policy=policy, name=name)
+            self._subscribers[name] = queue
+            return queue
+
+    def unsubscribe(self, name: str) -> None:
+        """Remove a consumer and release the frames it still holds."""
+        with self._lock:
+            queue = self._subscribers.pop(name, None)
+        if queue is not None:
+            queue.clear(stale=True)
+
+    def subscribers(self) -> Iterable[str]:
+        with self._lock:
+            return list(self._subscribers)
+
+    def publish(self, packet: FramePacket) -> None:
+        with self._lock:
+            queues = list(self._subscribers.values())
+            previous, self._latest = self._latest, packet.retain()
+            self.published += 1
+            self.stale = False
+        if previous is not None:
+            _release(previous)
+        for queue in queues:
+            queue.put(packet.retain())
+        _release(packet)
+
+    put = publish  # lets the capture supervisor feed a bus or a single FrameQueue
+
+    def peek_latest(self, retain: bool = False) -> FramePacket | None:
+        """Return the newest published packet; retain=True adds a caller reference."""
+        with self._lock:
+            packet = self._latest
+            if packet is not None and retain:
+                packet.retain()
+            return packet
+
+    def clear(self, stale: bool = True) -> None:
+        with self._lock:
+            queues = list(self._subscribers.values())
+            previous, self._latest = self._latest, None
+            self.stale = stale
+        if previous is not None:
+            _release(previous)
+        for queue in queues:
+            queue.clear(stale=stale)
+
+    def stats(self, now: float | None = None) -> dict[str, dict]:
+        """Per-subscriber lag and drop counters keyed by subscriber name."""
+        now = time.time() if now is None else now
+        with self._lock:
+            queues = list(self._subscribers.items())
+        return {name: queue.stats(now) for name, queue in queues}
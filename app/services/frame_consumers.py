@@ -1,11 +1,16 @@
 """Frame consumer interfaces for preview, detection, snapshot, and metrics."""
 from __future__ import annotations
 
+import logging
 import threading
 import time
 from abc import ABC, abstractmethod
 
-from app.services.frame_bus import FramePacket, FrameQueue
+from app.services.frame_bus import FrameBus, FramePacket, FrameQueue
+
+SHED_EWMA_ALPHA = 0.2  # weight of the newest sample in the timing averages
+SHED_ENTER_RATIO = 1.0  # shed once processing takes longer than the capture interval
+SHED_EXIT_RATIO = 0.7  # return to FIFO once processing is comfortably faster again
 
 
 class FrameConsumer(ABC):
@@ -17,14 +22,17 @@ class FrameConsumer(ABC):
 class SnapshotConsumer:
     """Fetch immutable copy of latest frame without pausing capture/detection."""
 
-    def __init__(self, frame_queue: FrameQueue):
-        self._queue = frame_queue
+    def __init__(self, source: FrameBus | FrameQueue):
+        self._queue = source
 
     def capture_snapshot(self) -> FramePacket | None:
-        packet = self._queue.peek_latest()
+        packet = self._queue.peek_latest(retain=True)
         if not packet:
             return None
-        return FramePacket(timestamp=packet.timestamp, payload=bytes(packet.payload), stale=packet.stale)
+        try:
+            return FramePacket(timestamp=packet.timestamp, payload=bytes(packet.payload), stale=packet.stale)
+        finally:
+            packet.release()
 
 
 class DetectionConsumer:
@@ -42,17 +50,98 @@ class DetectionConsumer:
         return self._paused.is_set()
 
 
-class MetricsConsumer:
+def _ewma(current: float, sample: float) -> float:
+    return sample if current <= 0 else current + SHED_EWMA_ALPHA * (sample - current)
+
+
+class LoadShedder:
+    """Pick FIFO or latest-frame-wins for each detection pull from measured timings.
+
+    The capture interval is derived from packet timestamps, divided by the frames
+    skipped in between so it stays accurate while shedding. When the processing
+    average exceeds it, the detector jumps to the newest frame and the backlog is
+    counted as shed; hysteresis keeps the mode from flapping.
+    """
+
     def __init__(self):
+        self.shedding = False
+        self.switches = 0
+        self.process_time = 0.0  # EWMA seconds per evaluated frame
+        self.capture_interval = 0.0  # EWMA seconds between captured frames
+        self._last_capture_ts: float | None = None
+        self._skipped_seen = 0
+        self._staleness_sum = 0.0
+        self._staleness_count = 0
+        self._staleness_max = 0.0
+
+    def next_packet(self, queue: FrameQueue, timeout: float | None = None) -> FramePacket | None:
+        packet = queue.get_latest(timeout) if self.shedding else queue.get(timeout)
+        if packet is None:
+            return None
+        skipped = queue.shed_frames + queue.dropped_frames
+        frames = 1 + max(0, skipped - self._skipped_seen)
+        self._skipped_seen = skipped
+        if self._last_capture_ts is not None and packet.timestamp > self._last_capture_ts:
+            gap = (packet.timestamp - self._last_capture_ts) / frames
+            self.capture_interval = _ewma(self.capture_interval, gap)
+        self._last_capture_ts = packet.timestamp
+        return packet
+
+    def record(self, capture_ts: float, started: float, finished: float) -> None:
+        """Account one evaluated frame and switch modes when the timings cross over."""
+        self.process_time = _ewma(self.process_time, finished - started)
+        staleness = max(0.0, finished - capture_ts)
+        self._staleness_sum += staleness
+        self._staleness_count += 1
+        self._staleness_max = max(self._staleness_max, staleness)
+        if self.capture_interval <= 0:
+            return
+        if not self.shedding and self.process_time > self.capture_interval * SHED_ENTER_RATIO:
+            self.shedding = True
+        elif self.shedding and self.process_time < self.capture_interval * SHED_EXIT_RATIO:
+            self.shedding = False
+        else:
+            return
+        self.switches += 1
+        logging.info(
+            "[DETECT] %s: processing %.1f ms vs capture interval %.1f ms",
+            "shedding to latest frame" if self.shedding else "back to FIFO",
+            self.process_time * 1000.0,
+            self.capture_interval * 1000.0,
+        )
+
+    def stats(self) -> dict:
+        """Return mode, timing averages and capture-to-result staleness since the last call."""
+        count = max(1, self._staleness_count)
+        result = {
+            "shed_mode": "latest" if self.shedding else "fifo",
+            "shed_switches": self.switches,
+            "process_ms": self.process_time * 1000.0,
+            "capture_interval_ms": self.capture_interval * 1000.0,
+            "staleness_ms": self._staleness_sum / count * 1000.0,
+            "staleness_max_ms": self._staleness_max * 1000.0,
+        }
+        self._staleness_sum = 0.0
+        self._staleness_count = 0
+        self._staleness_max = 0.0
+        return result
+
+
+class MetricsConsumer:
+    """Capture rate and per-subscriber lag read from bus counters; holds no frames."""
+
+    def __init__(self, bus: FrameBus):
+        self._bus = bus
         self.capture_fps = 0.0
         self.last_ts = time.time()
-        self.frames = 0
+        self._last_published = bus.published
 
-    def on_frame(self):
-        self.frames += 1
+    def sample(self) -> dict:
         now = time.time()
+        published = self._bus.published
         delta = now - self.last_ts
-        if delta >= 1.0:
-            self.capture_fps = self.frames / delta
-            self.frames = 0
-            self.last_ts = now
+        if delta > 0:
+            self.capture_fps = (published - self._last_published) / delta
+        self._last_published = published
+        self.last_ts = now
+        return {"capture_fps": self.capture_fps, "consumers": self._bus.stats(now)}
@@ -0,0 +1,86 @@
+"""Preallocated ring of frame slabs shared by the capture reader and its consumers."""
+from __future__ import annotations
+
+import threading
+from collections import deque
+
+import numpy as np
+
+RING_SPARE_SLOTS = 4  # slots beyond the bus/queue length: reader, processing, preview, snapshot
+
+
+class FrameSlot:
+    """One slab of the ring. Holders call release() exactly once per reference."""
+
+    __slots__ = ("ring", "index", "array", "view", "_refs")
+
+    def __init__(self, ring: "FrameRing", index: int, array: np.ndarray):
+        self.ring = ring
+        self.index = index
+        self.array = array
+        self.view = memoryview(array).cast("B")  # flat byte view for readinto()
+        self._refs = 0
+
+    def retain(self) -> "FrameSlot":
+        """Add a reference; the slab is not reused until every reference is released."""
+        self.ring._retain(self)
+        return self
+
+    def release(self) -> None:
+        """Drop a reference; the last release returns the slab to the ring."""
+        self.ring._release(self)
+
+
+class FrameRing:
+    """Fixed set of (height, width, channels) uint8 slabs reused for every frame.
+
+    The reader acquires a free slot, fills it in place and hands it on; queues
+    and consumers release it when done. Nothing is allocated per frame.
+    """
+
+    def __init__(self, slots: int, shape: tuple[int, ...]):
+        self.shape = tuple(shape)
+        self._buffer = np.empty((max(1, int(slots)),) + self.shape, dtype=np.uint8)
+        self._slots = [FrameSlot(self, i, self._buffer[i]) for i in range(len(self._buffer))]
+        self._free = deque(self._slots)
+        self._cv = threading.Condition()
+        self.waits = 0  # acquires that found no free slot
+
+    @property
+    def capacity(self) -> int:
+        return len(self._slots)
+
+    @property
+    def nbytes(self) -> int:
+        return self._buffer.nbytes
+
+    def acquire(self, timeout: float | None = None) -> FrameSlot | None:
+        """Take a free slot with one reference, waiting up to timeout. None if still exhausted."""
+        with self._cv:
+            if not self._free:
+                self.waits += 1
+                self._cv.wait_for(lambda: self._free, timeout=timeout)
+                if not self._free:
+                    return None
+            slot = self._free.popleft()
+            slot._refs = 1
+            return slot
+
+    def _retain(self, slot: FrameSlot) -> None:
+        with self._cv:
+            if slot._refs <= 0:
+                raise RuntimeError("retain() on a released frame slot")
+            slot._refs += 1
+
+    def _release(self, slot: FrameSlot) -> None:
+        with self._cv:
+            if slot._refs <= 0:
+                raise RuntimeError("release() on a released frame slot")
+            slot._refs -= 1
+            if slot._refs == 0:
+                self._free.append(slot)
+                self._cv.notify()
+
+    def free_slots(self) -> int:
+        with self._cv:
+            return len(self._free)
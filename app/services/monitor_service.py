@@ -1,10 +1,12 @@
 """Monitoring service orchestrating FFmpeg capture and processing threads."""
 from __future__ import annotations
 
+import itertools
 import logging
 import os
 import threading
 import time
+from dataclasses import replace
 from pathlib import Path
 
 import numpy as np
@@ -15,28 +17,37 @@ from app.services.ffmpeg_capture_supervisor import LogLevel
 from app.services.ffmpeg_tools import (
     CaptureConfig,
     FfmpegNotFoundError,
+    detection_capture_config,
     list_camera_devices,
     resolve_camera_device_token,
 )
-from app.services.frame_bus import FrameQueue
-from app.services.frame_consumers import DetectionConsumer, MetricsConsumer, SnapshotConsumer
+from app.services.frame_bus import FrameBus, FrameQueue
+from app.services.frame_consumers import DetectionConsumer, LoadShedder, MetricsConsumer, SnapshotConsumer
 from app.services.monitor_state_machine import InvalidTransition, MonitoringState, MonitoringStateMachine
 from app.services.monitor_pipeline import FfmpegCapture
 from core import detector as dect
 from core import notifier as notif
+from core import storage
 from core.profiles import (
+    CAPTURE_FORMAT_DETECTION,
     get_profile_camera_device,
+    get_profile_capture_format,
     get_profile_dirs,
     get_profile_fps,
     get_profile_frame_size,
     get_profile_frame_size_fallback,
     set_profile_camera_device,
 )
+from core.debug_usage import debug_usage
+from core.debug_writer import debug_writer
+from core.reference_cache import reference_cache
 
 _GLOBAL_LOCK = threading.Lock()
 _GLOBAL_CAPTURE: FfmpegCapture | None = None
-_GLOBAL_QUEUE: FrameQueue | None = None
+_GLOBAL_BUS: FrameBus | None = None
 _GLOBAL_USERS = 0
+_SUBSCRIBER_IDS = itertools.count(1)
+DETECTION_QUEUE_LEN = 8  # frames buffered for one detection subscriber
 
 
 def _camera_debug_enabled() -> bool:
@@ -53,22 +64,22 @@ def _camera_debug_dump(section: str, payload: str) -> None:
         fh.write(f"[{section}]\n{payload}\n\n")
 
 
-def _ensure_global_capture(input_token: str, config: CaptureConfig) -> tuple[FfmpegCapture, FrameQueue]:
-    global _GLOBAL_CAPTURE, _GLOBAL_QUEUE, _GLOBAL_USERS
+def _ensure_global_capture(input_token: str, config: CaptureConfig) -> tuple[FfmpegCapture, FrameBus]:
+    global _GLOBAL_CAPTURE, _GLOBAL_BUS, _GLOBAL_USERS
     with _GLOBAL_LOCK:
         if _GLOBAL_CAPTURE and _GLOBAL_CAPTURE.is_alive():
             _GLOBAL_USERS += 1
-            return _GLOBAL_CAPTURE, _GLOBAL_QUEUE
+            return _GLOBAL_CAPTURE, _GLOBAL_BUS
 
-        _GLOBAL_QUEUE = FrameQueue(maxlen=8)
-        _GLOBAL_CAPTURE = FfmpegCapture(input_token=input_token, config=config, frame_queue=_GLOBAL_QUEUE)
+        _GLOBAL_BUS = FrameBus()
+        _GLOBAL_CAPTURE = FfmpegCapture(input_token=input_token, config=config, frame_queue=_GLOBAL_BUS)
         _GLOBAL_CAPTURE.start()
         _GLOBAL_USERS = 1
-        return _GLOBAL_CAPTURE, _GLOBAL_QUEUE
+        return _GLOBAL_CAPTURE, _GLOBAL_BUS
 
 
 def _release_global_capture(clear_queue: bool = False) -> None:
-    global _GLOBAL_CAPTURE, _GLOBAL_QUEUE, _GLOBAL_USERS
+    global _GLOBAL_CAPTURE, _GLOBAL_BUS, _GLOBAL_USERS
     with _GLOBAL_LOCK:
         if _GLOBAL_USERS <= 0:
             return
@@ -77,30 +88,39 @@ def _release_global_capture(clear_queue: bool = False) -> None:
             return
         if _GLOBAL_CAPTURE:
             _GLOBAL_CAPTURE.stop()
-        if _GLOBAL_QUEUE and clear_queue:
-            _GLOBAL_QUEUE.clear(stale=True)
+        if _GLOBAL_BUS and clear_queue:
+            _GLOBAL_BUS.clear(stale=True)
         _GLOBAL_CAPTURE = None
-        _GLOBAL_QUEUE = None
+        _GLOBAL_BUS = None
 
 
-def get_latest_global_frame():
+def global_capture_config() -> CaptureConfig | None:
+    """Return the geometry and pixel format of frames on the global bus."""
     with _GLOBAL_LOCK:
-        if not _GLOBAL_QUEUE:
-            return None
-        packet = _GLOBAL_QUEUE.peek_latest()
-        if packet is None:
+        return _GLOBAL_CAPTURE.config if _GLOBAL_CAPTURE else None
+
+
+def _place_context(context: dect.DetectionContext, config: CaptureConfig) -> dect.DetectionContext:
+    """Place a detection context in the capture's crop geometry."""
+    return replace(context, frame_origin=config.origin, source_size=(config.width, config.height))
+
+
+def acquire_latest_global_frame():
+    """Return the newest packet with a reference held for the caller, who must release() it."""
+    with _GLOBAL_LOCK:
+        if not _GLOBAL_BUS:
             return None
-        return (packet.timestamp, packet.payload)
+        return _GLOBAL_BUS.peek_latest(retain=True)
 
 
 def freeze_latest_global_frame():
     with _GLOBAL_LOCK:
-        if not _GLOBAL_QUEUE:
+        if not _GLOBAL_BUS:
             return None
-        snap = SnapshotConsumer(_GLOBAL_QUEUE).capture_snapshot()
+        snap = SnapshotConsumer(_GLOBAL_BUS).capture_snapshot()
         if not snap:
             return None
-        return (snap.timestamp, snap.payload)
+        return (snap.timestamp, snap.payload, _GLOBAL_CAPTURE.config if _GLOBAL_CAPTURE else None)
 
 
 class MonitorService(QThread):
@@ -113,16 +133,23 @@ class MonitorService(QThread):
         self.running = False
         self.detector_state = dect.new_detector_state()
         self._stop_event = threading.Event()
+        self._context_dirty = threading.Event()
         self._capture = None
         self._processing_thread = None
         self._capture_acquired = False
         self._state = MonitoringStateMachine()
         self._detection_consumer = DetectionConsumer()
-        self._metrics = MetricsConsumer()
+        self._metrics: MetricsConsumer | None = None
+        self._bus: FrameBus | None = None
+        self._subscriber = f"detection-{next(_SUBSCRIBER_IDS)}"
 
     def current_state(self) -> MonitoringState:
         return self._state.state
 
+    def refresh_detection_context(self) -> None:
+        """Ask the processing thread to re-resolve threshold and references."""
+        self._context_dirty.set()
+
     def _set_state(self, text: str, transition) -> bool:
         try:
             transition()
@@ -182,9 +209,20 @@ class MonitorService(QThread):
             fps = get_profile_fps(profile)
 
             config = CaptureConfig(width=width, height=height, fps=fps)
+            self._context_dirty.clear()
+            context = dect.build_detection_context(profile, app_state.selected_reference)
+            if get_profile_capture_format(profile) == CAPTURE_FORMAT_DETECTION:
+                roi = dect.capture_roi(context, (width, height))
+                config = detection_capture_config(config, crop=roi)
+                logging.info("[CAM_CAPTURE] detection format, capture area=%s", config.crop or "full frame")
             logging.info("[CAM_CAPTURE] selected display_name=%r resolved input token=%r", selected_display_name, input_token)
-            self._capture, queue = _ensure_global_capture(input_token, config)
+            self._capture, self._bus = _ensure_global_capture(input_token, config)
             self._capture_acquired = True
+            # A capture shared with another session keeps its own geometry.
+            config = self._capture.config
+            context = _place_context(context, config)
+            queue = self._bus.subscribe(self._subscriber, maxlen=DETECTION_QUEUE_LEN)
+            self._metrics = MetricsConsumer(self._bus)
 
             self._state.mark_running()
             self.state_changed.emit(MonitoringState.RUNNING.value)
@@ -194,7 +232,7 @@ class MonitorService(QThread):
 
             self._processing_thread = threading.Thread(
                 target=self._processing_loop,
-                args=(profile, queue, width, height),
+                args=(profile, queue, config, context),
                 daemon=True,
             )
             self._processing_thread.start()
@@ -219,6 +257,7 @@ class MonitorService(QThread):
                 pass
         finally:
             self.stop(clear_queue=self._state.state == MonitoringState.FAILED)
+            storage.close_thread_connection()
 
     def _drain_ffmpeg_logs(self):
         if not self._capture:
@@ -229,34 +268,51 @@ class MonitorService(QThread):
                 self.status.emit(f"FFmpeg error: {event.message}")
                 _camera_debug_dump("FFMPEG_STDERR", event.message)
 
-    def _processing_loop(self, profile, queue: FrameQueue, width: int, height: int):
+    def _processing_loop(self, profile, queue: FrameQueue, config: CaptureConfig, context: dect.DetectionContext):
+        try:
+            self._process_frames(profile, queue, config, context)
+        finally:
+            storage.close_thread_connection()
+
+    def _process_frames(self, profile, queue: FrameQueue, config: CaptureConfig, context: dect.DetectionContext):
         processed = 0
         start = time.time()
         last_confidence = 0.0
-        selected_reference = app_state.selected_reference
+        selected_reference = context.selected_reference
         last_detection_time = None
+        shedder = LoadShedder()
 
         while not self._stop_event.is_set():
-            pkt = queue.get(timeout=0.5)
-            if pkt is None:
-                continue
+            if self._context_dirty.is_set():
+                self._context_dirty.clear()
+                context = _place_context(dect.build_detection_context(profile, selected_reference), config)
+                if config.crop and dect.capture_roi(context, (config.width, config.height)) != config.crop:
+                    self.status.emit("Search regions changed; restart monitoring to update the capture area")
 
-            self._metrics.on_frame()
-            raw = pkt.payload
-            frame = np.frombuffer(raw, dtype=np.uint8)
-            expected = width * height * 3
-            if frame.size != expected:
-                continue
-            if self._detection_consumer.is_paused():
+            pkt = shedder.next_packet(queue, timeout=0.5)
+            if pkt is None:
                 continue
 
-            frame = frame.reshape((height, width, 3))
-            result = dect.evaluate_frame(
-                profile,
-                frame,
-                self.detector_state,
-                selected_reference=selected_reference,
-            )
+            try:
+                frame = np.frombuffer(pkt.payload, dtype=np.uint8)
+                if frame.size != config.frame_bytes:
+                    continue
+                if self._detection_consumer.is_paused():
+                    continue
+
+                started = time.time()
+                frame = frame.reshape(config.frame_shape)
+                result = dect.evaluate_frame(
+                    profile,
+                    frame,
+                    self.detector_state,
+                    selected_reference=selected_reference,
+                    context=context,
+                )
+            finally:
+                # The detector keeps no reference to the BGR frame; its ring slot can be reused.
+                pkt.release()
+            shedder.record(pkt.timestamp, started, time.time())
             last_confidence = result.confidence
             if result.matched:
                 self.status.emit("Dialogue detected!")
@@ -269,16 +325,42 @@ class MonitorService(QThread):
             processed += 1
             now = time.time()
             if now - start >= 5:
+                cache_stats = reference_cache.stats()
+                writer_stats = debug_writer.stats()
+                if debug_usage.reconcile_due(now):
+                    debug_writer.submit(debug_usage.reconcile)
+                debug_bytes, debug_files = debug_usage.snapshot()
+                bus_stats = self._metrics.sample()
+                shed_stats = shedder.stats()
+                own = bus_stats["consumers"].get(self._subscriber, {})
                 self.metrics.emit(
                     {
-                        "capture_fps": self._metrics.capture_fps,
+                        "capture_fps": bus_stats["capture_fps"],
                         "process_fps": processed / max(0.001, now - start),
                         "dropped": queue.dropped_frames,
+                        "ring_waits": self._capture.ring.waits if self._capture and self._capture.ring else 0,
+                        "ring_discarded": self._capture.frames_discarded if self._capture else 0,
                         "queue_fill": (queue.size() / max(1, queue.maxlen)) * 100,
+                        "detection_lag_ms": own.get("lag_ms", 0.0),
+                        "consumers": bus_stats["consumers"],
+                        "shed_frames": queue.shed_frames,
+                        **shed_stats,
                         "profile": profile,
                         "monitoring": True,
                         "last_detection_time": last_detection_time,
                         "confidence": last_confidence,
+                        "reference_cache_hits": cache_stats["hits"],
+                        "reference_cache_misses": cache_stats["misses"],
+                        "tracked_searches": self.detector_state.tracked_searches,
+                        "full_searches": self.detector_state.full_searches,
+                        "skipped_frames": self.detector_state.skipped_frames,
+                        "edge_tiles_recomputed": self.detector_state.edge_map.tiles_recomputed,
+                        "edge_tiles_total": self.detector_state.edge_map.tiles_total,
+                        "debug_queue_depth": writer_stats["pending"],
+                        "debug_write_ms": writer_stats["avg_write_ms"],
+                        "debug_dropped": writer_stats["dropped"],
+                        "debug_storage_bytes": debug_bytes,
+                        "debug_files": debug_files,
                     }
                 )
                 processed = 0
@@ -298,6 +380,9 @@ class MonitorService(QThread):
         if self._processing_thread and self._processing_thread.is_alive():
             self._processing_thread.join(timeout=5)
 
+        if self._bus is not None:
+            self._bus.unsubscribe(self._subscriber)
+            self._bus = None
         if self._capture and self._capture_acquired:
             _release_global_capture(clear_queue=clear_queue)
             self._capture_acquired = False
@@ -96,7 +96,14 @@ class CropPanel(QWidget):
             return
 
         # JSON metadata is deprecated; SQLite is the only source of truth.
-        storage.add_reference(profile, ref_name, ref_path, frame)
+        storage.add_reference(
+            profile,
+            ref_name,
+            ref_path,
+            frame,
+            crop=(x0, y0, x1, y1),
+            source_size=(orig_w, orig_h),
+        )
         app_state.selected_reference = ref_name
 
         cv2.destroyAllWindows()
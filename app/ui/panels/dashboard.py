@@ -21,23 +21,35 @@ from app.controllers.monitor_controller import MonitorController
 from app.services.ffmpeg_tools import list_video_devices
 from app.services.monitor_service import (
     MonitorService,
+    acquire_latest_global_frame,
     freeze_latest_global_frame,
-    get_latest_global_frame,
+    global_capture_config,
 )
 from app.ui.theme import Styles
 from app.ui.widget_utils import disable_button_focus_rect, disable_widget_interaction, make_preview_label
 from core import detector as dect
 from core.profiles import (
+    CAPTURE_FORMAT_COLOR,
+    CAPTURE_FORMAT_DETECTION,
+    MATCH_ENGINE_EXHAUSTIVE,
+    MATCH_ENGINE_FFT,
+    MATCH_ENGINE_PYRAMID,
     get_detection_threshold,
+    get_profile_change_threshold,
     get_profile_camera_device,
+    get_profile_capture_format,
     get_profile_fps,
     get_profile_frame_size,
     get_profile_frame_size_fallback,
     get_profile_icon_bytes,
+    get_profile_match_engine,
     list_profiles,
     set_profile_camera_device,
+    update_profile_capture_format,
+    update_profile_change_threshold,
     update_profile_detection_threshold,
     update_profile_fps,
+    update_profile_match_engine,
 )
 
 
@@ -50,6 +62,21 @@ class DashboardPanel(QWidget):
         ("Very Strict", 0.88),
         ("Extreme", 0.93),
     ]
+    ENGINE_OPTIONS = [
+        ("Exhaustive", MATCH_ENGINE_EXHAUSTIVE),
+        ("Pyramid (fast)", MATCH_ENGINE_PYRAMID),
+        ("FFT (many references)", MATCH_ENGINE_FFT),
+    ]
+    CHANGE_GATE_OPTIONS = [
+        ("Off", 0.0),
+        ("Sensitive", 4.0),
+        ("Balanced", 8.0),
+        ("Relaxed", 16.0),
+    ]
+    CAPTURE_FORMAT_OPTIONS = [
+        ("Full colour", CAPTURE_FORMAT_COLOR),
+        ("Detection (gray)", CAPTURE_FORMAT_DETECTION),
+    ]
 
     def __init__(self, nav):
         super().__init__()
@@ -69,8 +96,11 @@ class DashboardPanel(QWidget):
         self.queue_label = QLabel("Queue Fill: --")
         self.last_detection_label = QLabel("Last Detection: --")
         self.strictness_label = QLabel("Detection Strictness")
+        self.engine_label = QLabel("Matching")
+        self.change_gate_label = QLabel("Skip Static Frames")
         self.camera_label = QLabel("Camera Device")
         self.fps_label = QLabel("Target FPS")
+        self.capture_format_label = QLabel("Capture Format")
         self.camera_preview_title = QLabel("Camera Preview")
         self.camera_preview_hint = QLabel("Preview reads from monitoring frame queue")
 
@@ -86,8 +116,11 @@ class DashboardPanel(QWidget):
             self.queue_label,
             self.last_detection_label,
             self.strictness_label,
+            self.engine_label,
+            self.change_gate_label,
             self.camera_label,
             self.fps_label,
+            self.capture_format_label,
             self.camera_preview_title,
             self.camera_preview_hint,
         ]:
@@ -112,6 +145,18 @@ class DashboardPanel(QWidget):
         for label, _ in self.STRICTNESS_OPTIONS:
             self.strictness_combo.addItem(label)
 
+        self.engine_combo = QComboBox()
+        self.engine_combo.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.engine_combo.setStyleSheet(self.strictness_combo.styleSheet())
+        for label, _ in self.ENGINE_OPTIONS:
+            self.engine_combo.addItem(label)
+
+        self.change_gate_combo = QComboBox()
+        self.change_gate_combo.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.change_gate_combo.setStyleSheet(self.strictness_combo.styleSheet())
+        for label, _ in self.CHANGE_GATE_OPTIONS:
+            self.change_gate_combo.addItem(label)
+
         self.camera_combo = QComboBox()
         self.camera_combo.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
         self.camera_combo.setStyleSheet(self.strictness_combo.styleSheet())
@@ -124,6 +169,12 @@ class DashboardPanel(QWidget):
         self.fps_spinbox.setSuffix(" FPS")
         self.fps_spinbox.setStyleSheet(self.strictness_combo.styleSheet())
 
+        self.capture_format_combo = QComboBox()
+        self.capture_format_combo.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.capture_format_combo.setStyleSheet(self.strictness_combo.styleSheet())
+        for label, _ in self.CAPTURE_FORMAT_OPTIONS:
+            self.capture_format_combo.addItem(label)
+
         self.start_btn = QPushButton("▶ Start Monitoring")
         self.stop_btn = QPushButton("⏹ Stop")
         self.freeze_btn = QPushButton("📸 Capture Snapshot")
@@ -160,8 +211,14 @@ class DashboardPanel(QWidget):
         settings_row = QHBoxLayout()
         settings_row.addWidget(self.strictness_label)
         settings_row.addWidget(self.strictness_combo)
+        settings_row.addWidget(self.engine_label)
+        settings_row.addWidget(self.engine_combo)
+        settings_row.addWidget(self.change_gate_label)
+        settings_row.addWidget(self.change_gate_combo)
         settings_row.addWidget(self.fps_label)
         settings_row.addWidget(self.fps_spinbox)
+        settings_row.addWidget(self.capture_format_label)
+        settings_row.addWidget(self.capture_format_combo)
 
         camera_row = QHBoxLayout()
         camera_row.addWidget(self.camera_label)
@@ -220,9 +277,12 @@ class DashboardPanel(QWidget):
         self.freeze_btn.clicked.connect(self.freeze_frame)
         self.unfreeze_btn.clicked.connect(self.unfreeze_frame)
         self.strictness_combo.currentIndexChanged.connect(self.on_strictness_changed)
+        self.engine_combo.currentIndexChanged.connect(self.on_engine_changed)
+        self.change_gate_combo.currentIndexChanged.connect(self.on_change_gate_changed)
         self.camera_combo.currentIndexChanged.connect(self.on_camera_changed)
         self.camera_refresh_btn.clicked.connect(self.refresh_camera_devices)
         self.fps_spinbox.valueChanged.connect(self.on_fps_changed)
+        self.capture_format_combo.currentIndexChanged.connect(self.on_capture_format_changed)
 
         self.preview_timer = QTimer(self)
         self.preview_timer.setInterval(120)
@@ -317,7 +377,10 @@ class DashboardPanel(QWidget):
         self.freeze_btn.setEnabled(True)
         self.unfreeze_btn.setEnabled(True)
         self.update_detection_strictness()
+        self.update_match_engine()
+        self.update_change_gate()
         self.update_fps_setting()
+        self.update_capture_format()
         self.update_camera_devices()
         self.update_profile_preview()
 
@@ -330,6 +393,24 @@ class DashboardPanel(QWidget):
         self.strictness_combo.blockSignals(False)
         self.strictness_combo.setEnabled(bool(profile))
 
+    def update_match_engine(self):
+        profile = app_state.active_profile
+        engine = get_profile_match_engine(profile)
+        engines = [value for _, value in self.ENGINE_OPTIONS]
+        self.engine_combo.blockSignals(True)
+        self.engine_combo.setCurrentIndex(engines.index(engine) if engine in engines else 0)
+        self.engine_combo.blockSignals(False)
+        self.engine_combo.setEnabled(bool(profile))
+
+    def update_change_gate(self):
+        profile = app_state.active_profile
+        threshold = get_profile_change_threshold(profile)
+        distances = [abs(threshold - value) for _, value in self.CHANGE_GATE_OPTIONS]
+        self.change_gate_combo.blockSignals(True)
+        self.change_gate_combo.setCurrentIndex(distances.index(min(distances)))
+        self.change_gate_combo.blockSignals(False)
+        self.change_gate_combo.setEnabled(bool(profile))
+
     def update_fps_setting(self):
         profile = app_state.active_profile
         self.fps_spinbox.blockSignals(True)
@@ -337,6 +418,15 @@ class DashboardPanel(QWidget):
         self.fps_spinbox.blockSignals(False)
         self.fps_spinbox.setEnabled(bool(profile))
 
+    def update_capture_format(self):
+        profile = app_state.active_profile
+        capture_format = get_profile_capture_format(profile)
+        formats = [value for _, value in self.CAPTURE_FORMAT_OPTIONS]
+        self.capture_format_combo.blockSignals(True)
+        self.capture_format_combo.setCurrentIndex(formats.index(capture_format))
+        self.capture_format_combo.blockSignals(False)
+        self.capture_format_combo.setEnabled(bool(profile))
+
     def _strictness_index_for_threshold(self, threshold):
         try:
             target = float(threshold)
@@ -349,11 +439,32 @@ class DashboardPanel(QWidget):
         if app_state.active_profile:
             update_profile_fps(app_state.active_profile, value)
 
+    def on_capture_format_changed(self, index):
+        if index < 0 or not app_state.active_profile:
+            return
+        _, capture_format = self.CAPTURE_FORMAT_OPTIONS[index]
+        update_profile_capture_format(app_state.active_profile, capture_format)
+
     def on_strictness_changed(self, index):
         if index < 0 or not app_state.active_profile:
             return
         _, threshold = self.STRICTNESS_OPTIONS[index]
         update_profile_detection_threshold(app_state.active_profile, threshold)
+        self.monitor.refresh_detection_context()
+
+    def on_engine_changed(self, index):
+        if index < 0 or not app_state.active_profile:
+            return
+        _, engine = self.ENGINE_OPTIONS[index]
+        update_profile_match_engine(app_state.active_profile, engine)
+        self.monitor.refresh_detection_context()
+
+    def on_change_gate_changed(self, index):
+        if index < 0 or not app_state.active_profile:
+            return
+        _, threshold = self.CHANGE_GATE_OPTIONS[index]
+        update_profile_change_threshold(app_state.active_profile, threshold)
+        self.monitor.refresh_detection_context()
 
     def update_camera_devices(self):
         profile = app_state.active_profile
@@ -427,11 +538,13 @@ class DashboardPanel(QWidget):
         process_fps = payload.get("process_fps", 0.0)
         dropped = payload.get("dropped", 0)
         queue_fill = payload.get("queue_fill", 0.0)
+        lag_ms = payload.get("detection_lag_ms", 0.0)
+        shed = payload.get("shed_frames", 0)
         last_detection_time = payload.get("last_detection_time")
         self.capture_fps_label.setText(f"Capture FPS: {capture_fps:.2f}")
         self.process_fps_label.setText(f"Processing FPS: {process_fps:.2f}")
-        self.dropped_label.setText(f"Dropped Frames: {dropped}")
-        self.queue_label.setText(f"Queue Fill: {queue_fill:.0f}%")
+        self.dropped_label.setText(f"Dropped Frames: {dropped} (shed {shed})")
+        self.queue_label.setText(f"Queue Fill: {queue_fill:.0f}% (lag {lag_ms:.0f} ms)")
         if last_detection_time:
             self.last_detection_label.setText(f"Last Detection: {time.ctime(last_detection_time)}")
         else:
@@ -460,33 +573,45 @@ class DashboardPanel(QWidget):
         if not self.isVisible():
             return
 
-        frame_item = self._frozen_frame or get_latest_global_frame()
-        if frame_item is None:
-            self.camera_preview.setPixmap(QPixmap())
-            self.camera_preview.setText("Camera preview unavailable")
-            return
-
-        profile = app_state.active_profile
-        width, height = get_profile_frame_size(profile)
-        if not width or not height:
-            width, height = get_profile_frame_size_fallback()
-
-        _, raw = frame_item
-        frame = np.frombuffer(raw, dtype=np.uint8)
-        expected = width * height * 3
-        if frame.size != expected:
-            self.camera_preview.setPixmap(QPixmap())
-            self.camera_preview.setText("Preview size mismatch")
-            return
+        packet = None
+        if self._frozen_frame is not None:
+            _, raw, config = self._frozen_frame
+        else:
+            packet = acquire_latest_global_frame()
+            if packet is None:
+                self.camera_preview.setPixmap(QPixmap())
+                self.camera_preview.setText("Camera preview unavailable")
+                return
+            raw = packet.payload
+            config = global_capture_config()
 
-        rgb = frame.reshape((height, width, 3))[:, :, ::-1].copy()
-        image = QImage(
-            rgb.data,
-            width,
-            height,
-            width * 3,
-            QImage.Format.Format_RGB888,
-        ).copy()
+        try:
+            if config is not None:
+                (width, height), channels = config.output_size, config.channels
+            else:
+                width, height = get_profile_frame_size(app_state.active_profile)
+                if not width or not height:
+                    width, height = get_profile_frame_size_fallback()
+                channels = 3
+
+            frame = np.frombuffer(raw, dtype=np.uint8)
+            expected = width * height * channels
+            if frame.size != expected:
+                self.camera_preview.setPixmap(QPixmap())
+                self.camera_preview.setText("Preview size mismatch")
+                return
+
+            # One copy: QImage reads the slab directly, then detaches before the slot is released.
+            image = QImage(
+                frame.data,
+                width,
+                height,
+                width * channels,
+                QImage.Format.Format_BGR888 if channels == 3 else QImage.Format.Format_Grayscale8,
+            ).copy()
+        finally:
+            if packet is not None:
+                packet.release()
         pixmap = QPixmap.fromImage(image)
         self.camera_preview.setPixmap(
             pixmap.scaled(
@@ -12,6 +12,7 @@ from PyQt6.QtWidgets import (
 )
 
 from app.app_state import app_state
+from app.services.asset_events import get_asset_events
 from app.ui.panel_header import PanelHeader
 from app.ui.theme import Styles
 from app.ui.widget_utils import disable_button_focus_rect, disable_widget_interaction, make_preview_label
@@ -69,6 +70,12 @@ class DebugPanel(QWidget):
         layout.addWidget(scroll)
         layout.addWidget(delete_btn)
         self.setLayout(layout)
+        get_asset_events().assets_changed.connect(self.on_assets_changed)
+
+    def on_assets_changed(self, kind, profile_name):
+        """Refresh the list when debug images are added or removed on disk."""
+        if kind == "debug":
+            self.refresh_debug()
 
     def refresh_debug(self):
         """Refresh debug list and preview based on active profile."""
@@ -13,6 +13,7 @@ from PyQt6.QtWidgets import (
 
 from app.app_state import app_state
 from app.controllers.frame_controller import FrameController
+from app.services.asset_events import get_asset_events
 from app.ui.panel_header import PanelHeader
 from app.ui.theme import Styles
 from app.ui.widget_utils import (
@@ -66,6 +67,12 @@ class FramesPanel(QWidget):
         layout.addWidget(scroll)
         layout.addWidget(add_btn)
         self.setLayout(layout)
+        get_asset_events().assets_changed.connect(self.on_assets_changed)
+
+    def on_assets_changed(self, kind, profile_name):
+        """Refresh the list when frame files change on disk for the active profile."""
+        if kind == "frames" and profile_name == app_state.active_profile:
+            self.refresh_frames()
 
     def refresh_frames(self):
         self.selected_btn = None
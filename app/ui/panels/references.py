@@ -12,10 +12,16 @@ from PyQt6.QtWidgets import (
 
 from app.app_state import app_state
 from app.controllers.reference_controller import ReferenceController
+from app.services.asset_events import get_asset_events
 from app.ui.panel_header import PanelHeader
 from app.ui.theme import Styles
 from app.ui.widget_utils import disable_button_focus_rect, disable_widget_interaction, make_preview_label
-from core.profiles import get_reference_image_bytes, get_reference_parent_frame, list_references
+from core.profiles import (
+    get_reference_image_bytes,
+    get_reference_parent_frame,
+    get_reference_search_region,
+    list_references,
+)
 
 
 class ReferencesPanel(QWidget):
@@ -62,6 +68,12 @@ class ReferencesPanel(QWidget):
         layout.addWidget(scroll)
         layout.addWidget(self.new_ref_btn)
         self.setLayout(layout)
+        get_asset_events().assets_changed.connect(self.on_assets_changed)
+
+    def on_assets_changed(self, kind, profile_name):
+        """Refresh the list when reference files change on disk for the active profile."""
+        if kind == "references" and profile_name == app_state.active_profile:
+            self.refresh()
 
     def refresh(self):
         self.refresh_references()
@@ -115,6 +127,13 @@ class ReferencesPanel(QWidget):
             delete_btn.clicked.connect(lambda _, r=ref: self.delete_reference(r))
 
             row.addWidget(select_btn)
+            region = get_reference_search_region(profile, ref)
+            if region is not None:
+                region_btn = QPushButton("📍 Region: On" if region.search_enabled else "📍 Region: Off")
+                region_btn.setStyleSheet(Styles.button())
+                disable_button_focus_rect(region_btn)
+                region_btn.clicked.connect(lambda _, r=ref: self.toggle_search_region(r))
+                row.addWidget(region_btn)
             row.addWidget(delete_btn)
             self.body_layout.addLayout(row)
 
@@ -163,6 +182,13 @@ class ReferencesPanel(QWidget):
             self.new_ref_btn.setEnabled(False)
             self.new_ref_btn.setText("➕ New Reference (select a frame first)")
 
+    def toggle_search_region(self, ref_name):
+        success, message = self.reference_controller.toggle_search_region(ref_name)
+        if not success:
+            QMessageBox.warning(self, "Search Region", message)
+            return
+        self.refresh_references()
+
     def delete_reference(self, ref_name):
         confirm = QMessageBox.question(
             self,
@@ -0,0 +1,199 @@
+"""Background consistency checker for frame and reference metadata.
+
+Design:
+ - Listing functions read SQLite only; this checker is what reconciles rows
+   with the filesystem. A row whose file is missing is repointed to the
+   expected profile path when the file exists there, otherwise deleted.
+ - Rows are visited in id order, INTEGRITY_CHUNK_ROWS at a time, with
+   repairs written as one bulk call per chunk. The background pass sleeps
+   INTEGRITY_CHUNK_PAUSE between chunks so it never competes with the UI or
+   detection for disk and database time.
+ - Full passes run every INTEGRITY_INTERVAL seconds; request() moves a
+   profile to the front without waiting for the next pass.
+ - Every repair is logged and kept in a short in-memory history for stats().
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from core import storage
+
+INTEGRITY_CHUNK_ROWS = 200  # rows checked per chunk
+INTEGRITY_CHUNK_PAUSE = 0.05  # seconds slept between chunks by the background thread
+INTEGRITY_INTERVAL = 600.0  # seconds between full background passes
+INTEGRITY_HISTORY = 100  # recent repairs kept for stats()
+
+_ASSET_KINDS = {
+    "frames": (
+        storage.list_frame_entries_page,
+        storage.add_frames_bulk,
+        storage.delete_frames_bulk,
+    ),
+    "references": (
+        storage.list_reference_entries_page,
+        lambda profile, moved: storage.add_references_bulk(
+            profile, [(name, path, None) for name, path in moved]
+        ),
+        storage.delete_references_bulk,
+    ),
+}
+
+
+@dataclass(frozen=True)
+class Repair:
+    timestamp: float
+    profile_name: str
+    kind: str
+    name: str
+    action: str  # "repointed" or "removed"
+    path: str | None
+
+
+class AssetIntegrityChecker:
+    """Chunked, rate-limited reconciliation of asset rows against files on disk."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._requested: list[str] = []
+        self._history: deque[Repair] = deque(maxlen=INTEGRITY_HISTORY)
+        self.base_dir = ""
+        self.rows_checked = 0
+        self.repaired = 0
+        self.passes = 0
+        self.last_pass = 0.0
+
+    def check_profile(self, base_dir: str, profile_name: str, pause: float = 0.0) -> list[Repair]:
+        """Reconcile one profile's frame and reference rows. Returns the repairs made."""
+        repairs = []
+        for kind in _ASSET_KINDS:
+            repairs.extend(self._check_kind(base_dir, profile_name, kind, pause))
+        return repairs
+
+    def _check_kind(self, base_dir: str, profile_name: str, kind: str, pause: float) -> list[Repair]:
+        list_page, repoint, delete = _ASSET_KINDS[kind]
+        asset_dir = os.path.join(base_dir, profile_name, kind)
+        repairs = []
+        after_id = 0
+        while not (pause and self._stop.is_set()):
+            rows = list_page(profile_name, after_id, INTEGRITY_CHUNK_ROWS)
+            if not rows:
+                break
+            after_id = rows[-1]["id"]
+            moved = []
+            stale = []
+            for row in rows:
+                name, path = row["name"], row["path"]
+                if name and path and os.path.isfile(path):
+                    continue
+                expected = os.path.join(asset_dir, name) if name else None
+                if expected and os.path.isfile(expected):
+                    moved.append((name, expected))
+                else:
+                    stale.append(name)
+            if moved:
+                repoint(profile_name, moved)
+            if stale:
+                delete(profile_name, stale)
+            now = time.time()
+            chunk = [Repair(now, profile_name, kind, name, "repointed", path) for name, path in moved]
+            chunk += [Repair(now, profile_name, kind, name, "removed", None) for name in stale]
+            for repair in chunk:
+                logging.info(
+                    "Asset integrity: %s %s '%s' in profile '%s'.",
+                    repair.action, kind, repair.name, profile_name,
+                )
+            with self._lock:
+                self.rows_checked += len(rows)
+                self.repaired += len(chunk)
+                self._history.extend(chunk)
+            repairs.extend(chunk)
+            if len(rows) < INTEGRITY_CHUNK_ROWS:
+                break
+            if pause:
+                self._stop.wait(pause)
+        return repairs
+
+    def run_pass(self, base_dir: str, pause: float = 0.0) -> list[Repair]:
+        """Check every profile once."""
+        repairs = []
+        for profile_name in storage.list_profiles():
+            if pause and self._stop.is_set():
+                break
+            repairs.extend(self.check_profile(base_dir, profile_name, pause))
+        with self._lock:
+            self.passes += 1
+            self.last_pass = time.time()
+        return repairs
+
+    def start(self, base_dir: str) -> bool:
+        """Start periodic background passes over base_dir profiles."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self.base_dir = base_dir
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="asset-integrity", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop the background thread after its current chunk."""
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            self._thread = None
+
+    def request(self, profile_name: str) -> None:
+        """Ask the background thread to check a profile soon."""
+        with self._lock:
+            if profile_name not in self._requested:
+                self._requested.append(profile_name)
+        self._wake.set()
+
+    def _run(self) -> None:
+        try:
+            self._loop()
+        finally:
+            storage.close_thread_connection()
+
+    def _loop(self) -> None:
+        next_pass = time.monotonic()
+        while not self._stop.is_set():
+            self._wake.wait(max(0.0, next_pass - time.monotonic()))
+            self._wake.clear()
+            with self._lock:
+                requested, self._requested = self._requested, []
+            try:
+                for profile_name in requested:
+                    self.check_profile(self.base_dir, profile_name, INTEGRITY_CHUNK_PAUSE)
+                if time.monotonic() >= next_pass:
+                    self.run_pass(self.base_dir, INTEGRITY_CHUNK_PAUSE)
+                    next_pass = time.monotonic() + INTEGRITY_INTERVAL
+            except Exception:
+                logging.warning("Asset integrity check failed; retrying next pass.", exc_info=True)
+                next_pass = time.monotonic() + INTEGRITY_INTERVAL
+
+    def stats(self) -> dict:
+        """Return counters and the most recent repairs, newest last."""
+        with self._lock:
+            return {
+                "rows_checked": self.rows_checked,
+                "repaired": self.repaired,
+                "passes": self.passes,
+                "last_pass": self.last_pass,
+                "recent": list(self._history),
+            }
+
+
+asset_integrity = AssetIntegrityChecker()
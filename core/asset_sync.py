@@ -0,0 +1,132 @@
+"""Change-gated filesystem-to-SQLite asset sync for profiles.
+
+Design:
+ - Each profile's asset directories are summarized by a signature of
+   (mtime_ns, entry count) per directory. Adding, removing or renaming a file
+   changes the directory mtime; the entry count covers filesystems with
+   coarse timestamps.
+ - A profile is re-synced only when its signature differs from the one
+   recorded at its last sync, so listing profiles costs one stat and one
+   directory listing per asset directory instead of a stat per file.
+ - Syncs run on one daemon worker thread; a profile already queued is not
+   queued twice. The signature is taken before the sync starts, so changes
+   made while it runs trigger another pass on the next check.
+ - stop() ends the worker after the queued syncs; it closes its SQLite
+   connection on exit and a later request() starts a new one.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+
+from core import storage
+
+
+def directory_signature(paths) -> tuple:
+    """Return a (mtime_ns, entry_count) pair per directory; missing directories map to None."""
+    signature = []
+    for path in paths:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            with os.scandir(path) as entries:
+                count = sum(1 for _ in entries)
+        except OSError:
+            signature.append(None)
+            continue
+        signature.append((mtime_ns, count))
+    return tuple(signature)
+
+
+class AssetSyncIndex:
+    """Last-synced directory signatures plus a background queue of pending syncs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._synced: dict[str, tuple] = {}
+        self._pending: set[str] = set()
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self.syncs = 0
+        self.skipped = 0
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="asset-sync", daemon=True)
+            self._thread.start()
+
+    def request(self, key: str, paths, func, *args) -> bool:
+        """Queue func(*args) when the directories under key changed. Returns True if queued."""
+        signature = directory_signature(paths)
+        with self._lock:
+            if self._synced.get(key) == signature or key in self._pending:
+                self.skipped += 1
+                return False
+            self._pending.add(key)
+        self._ensure_worker()
+        self._queue.put((key, signature, func, args))
+        return True
+
+    def invalidate(self, key: str | None = None) -> None:
+        """Forget one recorded signature, or all of them, forcing the next sync."""
+        with self._lock:
+            if key is None:
+                self._synced.clear()
+            else:
+                self._synced.pop(key, None)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued sync has run. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Run the queued syncs, then end the worker thread."""
+        with self._lock:
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+
+    def _run(self) -> None:
+        try:
+            self._drain()
+        finally:
+            storage.close_thread_connection()
+
+    def _drain(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            key, signature, func, args = job
+            try:
+                func(*args)
+                ok = True
+            except Exception:
+                logging.warning("Asset sync failed for %s; will retry on next request.", key, exc_info=True)
+                ok = False
+            with self._lock:
+                self._pending.discard(key)
+                if ok:
+                    self._synced[key] = signature
+                    self.syncs += 1
+            self._queue.task_done()
+
+    def stats(self) -> dict:
+        """Return sync counters and the number of queued profiles."""
+        with self._lock:
+            return {"syncs": self.syncs, "skipped": self.skipped, "pending": len(self._pending)}
+
+
+asset_sync = AssetSyncIndex()
@@ -0,0 +1,435 @@
+"""Optional filesystem watcher that keeps asset metadata in sync as files change.
+
+Design:
+ - Watches Data/Profiles, each profile root and its frames/ and references/
+   directories, plus Data/Debug. On Linux the kernel reports changes through
+   inotify (via ctypes); elsewhere a polling backend diffs directory listings,
+   re-listing only directories whose mtime changed.
+ - Backends only report which names changed. Events are coalesced for
+   WATCH_DEBOUNCE seconds and then classified by checking whether the file
+   still exists, so create/modify/move/delete bursts collapse into one upsert
+   or remove per name and one bulk write per directory. Frames that still
+   exist are re-probed, so a rewritten image refreshes its stored size. The
+   polling backend only sees name changes, not in-place rewrites.
+ - A profile is "covered" once its directories are watched and one full sync
+   has run; the change-gated asset sync then skips it. A lost-event overflow
+   re-syncs every profile.
+ - Subscribers are called with (kind, profile_name) from the watcher thread,
+   where kind is "frames", "references", "debug" or "profiles".
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from core import storage
+from core.debug_usage import debug_usage
+from core.debug_writer import debug_writer
+from core.image_header import probe_image_size
+
+WATCH_DEBOUNCE = 0.25  # seconds of quiet before a batch of events is applied
+WATCH_MAX_DELAY = 1.0  # longest a busy directory may defer a batch
+WATCH_IDLE_TIMEOUT = 0.5  # seconds each backend read blocks when nothing is pending
+WATCH_POLL_INTERVAL = 2.0  # seconds between scans for the polling backend
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_INOTIFY_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _InotifyBackend:
+    """Linux inotify through libc; raises OSError when unavailable."""
+
+    name = "inotify"
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        libc_name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libc_name or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._paths: dict[int, str] = {}
+        self._watches: dict[str, int] = {}
+
+    def add(self, path: str) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _INOTIFY_MASK)
+        if wd < 0:
+            return False
+        self._paths[wd] = path
+        self._watches[path] = wd
+        return True
+
+    def remove(self, path: str) -> None:
+        wd = self._watches.pop(path, None)
+        if wd is not None:
+            self._paths.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def read(self, timeout: float) -> tuple[set[tuple[str, str]], bool]:
+        """Return ({(directory, name)}, overflowed) for events within timeout."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set(), False
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set(), False
+        touched = set()
+        overflow = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & _IN_IGNORED:
+                path = self._paths.pop(wd, None)
+                if path is not None:
+                    self._watches.pop(path, None)
+                continue
+            directory = self._paths.get(wd)
+            if directory is not None and name:
+                touched.add((directory, name))
+        return touched, overflow
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class _PollingBackend:
+    """Portable fallback that diffs directory listings when a directory's mtime changes."""
+
+    name = "polling"
+
+    def __init__(self, interval: float | None = None):
+        self.interval = max(0.01, float(WATCH_POLL_INTERVAL if interval is None else interval))
+        self._dirs: dict[str, tuple[int, frozenset[str]] | None] = {}
+        self._next_scan = 0.0
+
+    @staticmethod
+    def _snapshot(path: str, previous=None):
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        if previous is not None and previous[0] == mtime_ns:
+            return previous
+        try:
+            return mtime_ns, frozenset(os.listdir(path))
+        except OSError:
+            return None
+
+    def add(self, path: str) -> bool:
+        snapshot = self._snapshot(path)
+        if snapshot is None:
+            return False
+        self._dirs[path] = snapshot
+        return True
+
+    def remove(self, path: str) -> None:
+        self._dirs.pop(path, None)
+
+    def read(self, timeout: float) -> tuple[set[tuple[str, str]], bool]:
+        """Sleep until the next scan (at most timeout) and report changed names."""
+        now = time.monotonic()
+        if now < self._next_scan:
+            time.sleep(min(timeout, self._next_scan - now))
+            if time.monotonic() < self._next_scan:
+                return set(), False
+        self._next_scan = time.monotonic() + self.interval
+        touched = set()
+        for path, previous in list(self._dirs.items()):
+            current = self._snapshot(path, previous)
+            if current is previous:
+                continue
+            if current is None:
+                self._dirs.pop(path, None)
+                names = previous[1] if previous else frozenset()
+            else:
+                self._dirs[path] = current
+                names = current[1] ^ (previous[1] if previous else frozenset())
+            touched.update((path, name) for name in names)
+        return touched, False
+
+    def close(self) -> None:
+        self._dirs.clear()
+
+
+def _create_backend(prefer: str | None = None):
+    """Return an inotify backend when possible, otherwise the polling fallback."""
+    if prefer != "polling":
+        try:
+            return _InotifyBackend()
+        except (OSError, AttributeError):
+            if prefer == "inotify":
+                raise
+            logging.info("inotify unavailable; asset watcher falls back to polling.")
+    return _PollingBackend()
+
+
+class AssetWatcher:
+    """Background thread applying filesystem changes to SQLite and notifying subscribers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._backend = None
+        self._base_dir = ""
+        self._debug_dir = ""
+        self._extensions: tuple[str, ...] = ()
+        self._sync_profile = None
+        self._roles: dict[str, tuple[str, str | None]] = {}
+        self._covered: set[str] = set()
+        self._subscribers: list = []
+        self.events_applied = 0
+
+    @property
+    def backend_name(self) -> str | None:
+        """Return the active backend name, or None when stopped."""
+        backend = self._backend
+        return backend.name if backend is not None else None
+
+    def start(self, base_dir, debug_dir, extensions, sync_profile, backend: str | None = None) -> bool:
+        """Watch base_dir profiles and debug_dir; sync_profile(name) runs a full profile sync."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            try:
+                self._backend = _create_backend(backend)
+            except OSError:
+                logging.warning("Asset watcher backend unavailable.", exc_info=True)
+                return False
+            self._base_dir = base_dir
+            self._debug_dir = debug_dir
+            self._extensions = tuple(extensions)
+            self._sync_profile = sync_profile
+            self._roles.clear()
+            self._covered.clear()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="asset-watcher", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop the watcher thread and release the backend."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            self._thread = None
+            self._covered.clear()
+            if self._backend is not None:
+                self._backend.close()
+                self._backend = None
+
+    def covers(self, profile_name: str) -> bool:
+        """Return True when SQLite is kept current for this profile by the watcher."""
+        with self._lock:
+            return profile_name in self._covered
+
+    def subscribe(self, callback) -> None:
+        """Register callback(kind, profile_name) for applied changes."""
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        """Remove a previously registered callback."""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _notify(self, kind: str, profile_name: str | None) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(kind, profile_name)
+            except Exception:
+                logging.warning("Asset watcher subscriber failed.", exc_info=True)
+
+    def _watch(self, path: str, kind: str, profile_name: str | None) -> None:
+        if path in self._roles or not os.path.isdir(path):
+            return
+        if self._backend.add(path):
+            self._roles[path] = (kind, profile_name)
+
+    def _watch_profile(self, profile_name: str) -> None:
+        """Watch a profile's directories, then run one full sync so SQLite can be trusted."""
+        with self._lock:
+            # Not covered again until this sync has finished.
+            self._covered.discard(profile_name)
+        root = os.path.join(self._base_dir, profile_name)
+        self._watch(root, "profile", profile_name)
+        self._watch(os.path.join(root, "frames"), "frames", profile_name)
+        self._watch(os.path.join(root, "references"), "references", profile_name)
+        try:
+            self._sync_profile(profile_name)
+        except Exception:
+            logging.warning("Initial asset sync failed for %s.", profile_name, exc_info=True)
+            return
+        with self._lock:
+            self._covered.add(profile_name)
+
+    def _unwatch_profile(self, profile_name: str) -> None:
+        root = os.path.join(self._base_dir, profile_name)
+        with self._lock:
+            self._covered.discard(profile_name)
+        for path in (root, os.path.join(root, "frames"), os.path.join(root, "references")):
+            if self._roles.pop(path, None) is not None:
+                self._backend.remove(path)
+
+    def _initial_sync(self) -> None:
+        self._watch(self._base_dir, "profiles", None)
+        self._watch(self._debug_dir, "debug", None)
+        try:
+            names = sorted(os.listdir(self._base_dir), key=str.lower)
+        except OSError:
+            names = []
+        for name in names:
+            if self._stop.is_set():
+                return
+            if os.path.isdir(os.path.join(self._base_dir, name)):
+                self._watch_profile(name)
+
+    def _run(self) -> None:
+        try:
+            self._watch_loop()
+        finally:
+            storage.close_thread_connection()
+
+    def _watch_loop(self) -> None:
+        self._initial_sync()
+        pending: set[tuple[str, str]] = set()
+        overflow = False
+        first_event = None
+        while not self._stop.is_set():
+            try:
+                touched, lost = self._backend.read(WATCH_DEBOUNCE if pending else WATCH_IDLE_TIMEOUT)
+            except (OSError, ValueError):
+                if not self._stop.is_set():
+                    logging.warning("Asset watcher backend failed; watcher stopped.", exc_info=True)
+                with self._lock:
+                    self._covered.clear()
+                return
+            if touched or lost:
+                pending.update(touched)
+                overflow = overflow or lost
+                if first_event is None:
+                    first_event = time.monotonic()
+                if time.monotonic() - first_event < WATCH_MAX_DELAY:
+                    continue
+            if pending or overflow:
+                try:
+                    self._apply(pending, overflow)
+                except Exception:
+                    logging.warning("Applying asset changes failed; continuing.", exc_info=True)
+                pending = set()
+                overflow = False
+                first_event = None
+
+    def _apply(self, touched: set[tuple[str, str]], overflow: bool) -> None:
+        """Write one batch of changed names to SQLite and notify subscribers."""
+        if overflow:
+            logging.info("Asset watcher lost events; re-syncing every profile.")
+            with self._lock:
+                profile_names = sorted(self._covered)
+            for name in profile_names:
+                self._watch_profile(name)
+                self._notify("frames", name)
+                self._notify("references", name)
+            self._notify("debug", None)
+            return
+
+        grouped: dict[str, list[str]] = {}
+        for directory, name in touched:
+            grouped.setdefault(directory, []).append(name)
+
+        for directory, names in grouped.items():
+            role = self._roles.get(directory)
+            if role is None:
+                continue
+            kind, profile_name = role
+            if kind == "profiles":
+                for name in names:
+                    if os.path.isdir(os.path.join(directory, name)):
+                        self._watch_profile(name)
+                    else:
+                        self._unwatch_profile(name)
+                self._notify("profiles", None)
+            elif kind == "profile":
+                if {"frames", "references"} & set(names):
+                    self._watch_profile(profile_name)
+            elif kind == "debug":
+                self._apply_debug(directory, names)
+            else:
+                self._apply_assets(kind, profile_name, directory, names)
+
+    def _apply_assets(self, kind: str, profile_name: str, directory: str, names: list[str]) -> None:
+        names = [name for name in names if name.lower().endswith(self._extensions)]
+        if not names:
+            return
+        present = [name for name in names if os.path.isfile(os.path.join(directory, name))]
+        missing = [name for name in names if name not in present]
+        if kind == "frames":
+            known = {entry["name"] for entry in storage.list_frame_entries(profile_name)}
+            # Known names are upserted too: a modified image may have a new size.
+            paths = [os.path.join(directory, name) for name in present]
+            storage.add_frames_bulk(
+                profile_name,
+                [
+                    (os.path.basename(path), path, *(probe_image_size(path) or (None, None)))
+                    for path in paths
+                ],
+            )
+            storage.delete_frames_bulk(profile_name, [name for name in missing if name in known])
+        else:
+            known = {entry["name"] for entry in storage.list_reference_entries(profile_name)}
+            storage.add_references_bulk(
+                profile_name,
+                [(name, os.path.join(directory, name), None) for name in present if name not in known],
+            )
+            storage.delete_references_bulk(profile_name, [name for name in missing if name in known])
+        self.events_applied += len(names)
+        self._notify(kind, profile_name)
+
+    def _apply_debug(self, directory: str, names: list[str]) -> None:
+        names = [name for name in names if name.lower().endswith(self._extensions)]
+        if not names:
+            return
+        base = os.path.abspath(directory)
+        missing = [
+            os.path.join(base, name) for name in names if not os.path.isfile(os.path.join(base, name))
+        ]
+        if missing and storage.delete_debug_entries_by_paths(missing):
+            # Files removed outside the app: rescan totals instead of guessing sizes.
+            debug_writer.submit(debug_usage.reconcile)
+        self.events_applied += len(names)
+        self._notify("debug", None)
+
+
+asset_watcher = AssetWatcher()
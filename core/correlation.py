@@ -0,0 +1,96 @@
+"""FFT-based normalized cross-correlation shared across references.
+
+Design:
+ - The frame edge map is transformed once per frame (FrameSpectrum).
+ - Each reference keeps the conjugate spectrum of its zero-mean, zero-padded
+   template, cached per padded frame size on the compiled reference.
+ - Window energy for the normalization comes from box filters, cached per
+   template size, so references reuse the per-frame work and each one only
+   pays a spectrum product and one inverse FFT.
+ - Scores follow TM_CCOEFF_NORMED, including 0 for flat frame windows.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+_EPSILON = 1e-6
+_FLAT_TOLERANCE = 1e-5  # relative variance below which a window counts as flat
+
+
+def _optimal_size(n: int) -> int:
+    """Return a DFT-friendly length >= n."""
+    import cv2
+
+    return cv2.getOptimalDFTSize(int(n))
+
+
+class FrameSpectrum:
+    """Per-frame transform and window statistics reused by every reference."""
+
+    def __init__(self, frame_e):
+        import cv2
+
+        self.height, self.width = frame_e.shape[:2]
+        self.shape = (_optimal_size(self.height), _optimal_size(self.width))
+        padded = np.zeros(self.shape, dtype=np.float32)
+        padded[: self.height, : self.width] = frame_e
+        self._image = padded[: self.height, : self.width]
+        self.spectrum = cv2.dft(padded)
+        self._variance: dict[tuple[int, int], np.ndarray] = {}
+
+    def _window_stddev(self, th: int, tw: int) -> np.ndarray:
+        """Return sqrt of the summed squared deviation over every th x tw window.
+
+        Flat windows are set to +inf so their score becomes 0, like OpenCV.
+        Results are cached per template size for the lifetime of the frame.
+        """
+        import cv2
+
+        key = (th, tw)
+        cached = self._variance.get(key)
+        if cached is not None:
+            return cached
+        rows, cols = self.height - th + 1, self.width - tw + 1
+        sums = cv2.boxFilter(
+            self._image, cv2.CV_32F, (tw, th), anchor=(0, 0), normalize=False,
+            borderType=cv2.BORDER_CONSTANT,
+        )[:rows, :cols]
+        sums_sq = cv2.sqrBoxFilter(
+            self._image, cv2.CV_32F, (tw, th), anchor=(0, 0), normalize=False,
+            borderType=cv2.BORDER_CONSTANT,
+        )[:rows, :cols]
+        variance = sums_sq - sums * sums / float(th * tw)
+        flat = variance <= _FLAT_TOLERANCE * np.maximum(sums_sq, 1.0)
+        stddev = np.sqrt(variance, where=~flat, out=np.full_like(variance, np.inf))
+        self._variance[key] = stddev
+        return stddev
+
+    def match(self, compiled) -> tuple[float, tuple[int, int]]:
+        """Return (score, (x, y)) of the best TM_CCOEFF_NORMED match for a reference."""
+        import cv2
+
+        template = compiled.edges
+        th, tw = template.shape[:2]
+        if th > self.height or tw > self.width:
+            return 0.0, (0, 0)
+
+        entry = compiled.spectra.get(self.shape)
+        if entry is None:
+            centered = template.astype(np.float64)
+            centered -= centered.mean()
+            norm = float(np.sqrt((centered * centered).sum()))
+            padded = np.zeros(self.shape, dtype=np.float32)
+            padded[:th, :tw] = centered
+            entry = (cv2.dft(padded), norm)
+            compiled.spectra[self.shape] = entry
+        template_spectrum, template_norm = entry
+        if template_norm < _EPSILON:
+            return 1.0, (0, 0)
+
+        product = cv2.mulSpectrums(self.spectrum, template_spectrum, 0, conjB=True)
+        numerator = cv2.idft(product, flags=cv2.DFT_SCALE | cv2.DFT_REAL_OUTPUT)
+        numerator = numerator[: self.height - th + 1, : self.width - tw + 1]
+
+        scores = numerator / (self._window_stddev(th, tw) * template_norm)
+        _, max_val, _, max_loc = cv2.minMaxLoc(scores)
+        return min(1.0, float(max_val)), (int(max_loc[0]), int(max_loc[1]))
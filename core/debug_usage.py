@@ -0,0 +1,105 @@
+"""Running totals of debug image storage shared by the detector and the UI.
+
+Design:
+ - Totals are seeded by one directory scan and then adjusted by every add,
+   prune and user deletion, so no write pays for a full rescan.
+ - A periodic reconciliation rescans the directory off the detection thread
+   to correct drift from files changed outside the app.
+ - A scan is discarded if totals changed while it ran; the next pass retries.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+DEBUG_RECONCILE_INTERVAL = 300.0  # seconds between background rescans
+
+
+def scan_debug_dir(debug_dir: str, extensions: tuple[str, ...]) -> tuple[int, int]:
+    """Return (total_bytes, file_count) of files with the given extensions."""
+    total = 0
+    count = 0
+    try:
+        entries = list(os.scandir(debug_dir))
+    except OSError:
+        return 0, 0
+    for entry in entries:
+        if not entry.name.lower().endswith(extensions):
+            continue
+        try:
+            if entry.is_file():
+                total += entry.stat().st_size
+                count += 1
+        except OSError:
+            continue
+    return total, count
+
+
+class DebugUsage:
+    """Thread-safe byte and file counters for one debug directory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.debug_dir: str | None = None
+        self.extensions: tuple[str, ...] = ()
+        self.total_bytes = 0
+        self.file_count = 0
+        self.last_reconcile = 0.0
+        self._mutations = 0
+
+    def seed(self, debug_dir: str, extensions: tuple[str, ...]) -> None:
+        """Scan once per directory; later calls for the same directory are no-ops."""
+        debug_dir = os.path.abspath(debug_dir)
+        with self._lock:
+            if self.debug_dir == debug_dir:
+                return
+            self.extensions = tuple(extensions)
+        self.reconcile(debug_dir, force=True)
+
+    def add(self, size_bytes: int, count: int = 1) -> None:
+        """Account for newly written debug files."""
+        with self._lock:
+            self.total_bytes += max(0, int(size_bytes))
+            self.file_count += count
+            self._mutations += 1
+
+    def remove(self, size_bytes: int, count: int = 1) -> None:
+        """Account for deleted debug files."""
+        with self._lock:
+            self.total_bytes = max(0, self.total_bytes - max(0, int(size_bytes)))
+            self.file_count = max(0, self.file_count - count)
+            self._mutations += 1
+
+    def reconcile_due(self, now: float | None = None) -> bool:
+        """Return True when the last reconciliation is older than the interval."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return now - self.last_reconcile >= DEBUG_RECONCILE_INTERVAL
+
+    def reconcile(self, debug_dir: str | None = None, force: bool = False) -> bool:
+        """Replace totals with a fresh scan. Returns False if the scan raced a change."""
+        with self._lock:
+            target = os.path.abspath(debug_dir) if debug_dir else self.debug_dir
+            extensions = self.extensions
+            mutations = self._mutations
+        if target is None:
+            return False
+        total_bytes, file_count = scan_debug_dir(target, extensions)
+        with self._lock:
+            if not force and (self._mutations != mutations or self.debug_dir != target):
+                return False
+            self.debug_dir = target
+            self.total_bytes = total_bytes
+            self.file_count = file_count
+            self.last_reconcile = time.time()
+            self._mutations += 1
+        return True
+
+    def snapshot(self) -> tuple[int, int]:
+        """Return (total_bytes, file_count)."""
+        with self._lock:
+            return self.total_bytes, self.file_count
+
+
+debug_usage = DebugUsage()
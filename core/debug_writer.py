@@ -0,0 +1,121 @@
+"""Background writer for debug images so detection never waits on disk.
+
+Design:
+ - One daemon worker drains a bounded queue of write jobs in order.
+ - When the queue is full new jobs are dropped (and counted) instead of
+   blocking the detection thread; debug images are best effort.
+ - Jobs are plain callables; the detector supplies the encode, write,
+   metadata insert and pruning step.
+ - Queue depth, drop count and write latency are exposed through stats().
+ - stop() ends the worker after the queued jobs; the worker closes its
+   SQLite connection on exit and a later submit() starts a new one.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+
+from core import storage
+
+DEBUG_QUEUE_SIZE = 8
+
+
+class DebugWriter:
+    """Bounded drop-on-full queue executed by a single background thread."""
+
+    def __init__(self, max_pending: int = DEBUG_QUEUE_SIZE):
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_write_ms = 0.0
+        self._total_write_ms = 0.0
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="debug-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, func, *args) -> bool:
+        """Queue func(*args) for the worker. Returns False when the job was dropped."""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((func, args))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued job has run. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Run the queued jobs, then end the worker thread."""
+        with self._lock:
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def _run(self) -> None:
+        try:
+            self._drain()
+        finally:
+            storage.close_thread_connection()
+
+    def _drain(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            func, args = job
+            start = time.perf_counter()
+            try:
+                func(*args)
+                ok = True
+            except Exception:
+                logging.warning("Debug writer job failed; continuing monitoring.", exc_info=True)
+                ok = False
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            with self._lock:
+                if ok:
+                    self.written += 1
+                else:
+                    self.failed += 1
+                self.last_write_ms = elapsed_ms
+                self._total_write_ms += elapsed_ms
+            self._queue.task_done()
+
+    def stats(self) -> dict:
+        """Return queue depth, counters and write latency in milliseconds."""
+        with self._lock:
+            completed = self.written + self.failed
+            return {
+                "pending": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "last_write_ms": self.last_write_ms,
+                "avg_write_ms": self._total_write_ms / completed if completed else 0.0,
+            }
+
+
+debug_writer = DebugWriter()
@@ -2,26 +2,46 @@
 
 Uses OpenCV edge-based template matching to detect user-defined references
 in camera frames. Detection flow: grayscale -> Canny edges -> matchTemplate
-with TM_CCOEFF_NORMED. Debug images are written on detection events, with
-global bounded storage enforcement.
+with TM_CCOEFF_NORMED. Debug images are written on detection events by a
+background writer, with global bounded storage enforcement.
 """
 import cv2
 import logging
 import os
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from core.profiles import (
     DEBUG_EXTENSIONS,
+    DEFAULT_CHANGE_THRESHOLD,
+    DEFAULT_SEARCH_MARGIN,
+    MATCH_ENGINE_EXHAUSTIVE,
+    MATCH_ENGINE_FFT,
+    MATCH_ENGINE_PYRAMID,
     get_profile_dirs,
     get_debug_dir,
     profile_path,
     get_detection_threshold,
+    get_profile_change_threshold,
+    get_profile_match_engine,
+    list_reference_search_regions,
 )
 from core import storage
+from core.correlation import FrameSpectrum
+from core.debug_usage import debug_usage
+from core.debug_writer import debug_writer
+from core.edge_tiles import TiledEdgeMap
+from core.reference_cache import CANNY_HIGH, CANNY_LOW, downscale_edges, reference_cache
 
 EXIT_TIMEOUT = 0.6  # seconds dialogue must disappear to reset
 DEBUG_STORAGE_LIMIT_BYTES = 1_073_741_824  # 1 GB
 DEBUG_STORAGE_LIMIT_COUNT = 2000
+TRACK_PADDING = 32  # pixels searched around the last match while tracking
+TRACK_FULL_SEARCH_INTERVAL = 30  # tracked frames before a forced full-frame search
+PYRAMID_TOP_K = 3  # coarse peaks verified at full resolution
+PYRAMID_MIN_TEMPLATE = 12  # smallest coarse template side worth matching
+PYRAMID_CONFIRM_MARGIN = 0.1  # verified scores this close to the threshold are rechecked exhaustively
+SIGNATURE_SIZE = (64, 36)  # (width, height) block grid of the frame-change signature
+CAPTURE_ROI_PADDING = TRACK_PADDING  # extra pixels around the region union so tracking windows fit
 
 
 # =========================
@@ -37,6 +57,34 @@ class DetectorState:
     debug_counter: int = 0
     debug_limit_warning_emitted: bool = False
     total_debug_storage_bytes: int = 0
+    track_reference: str | None = None
+    track_bbox: tuple | None = None
+    frames_since_full_search: int = 0
+    tracked_searches: int = 0
+    full_searches: int = 0
+    last_signature: object = None
+    last_search: tuple | None = None
+    gate_context: object = None
+    skipped_frames: int = 0
+    edge_map: TiledEdgeMap = field(default_factory=TiledEdgeMap)
+
+
+@dataclass(frozen=True)
+class DetectionContext:
+    """Per-session detection inputs resolved once instead of on every frame."""
+    profile_name: str
+    profile_valid: bool
+    threshold: float
+    references_dir: str
+    debug_dir: str | None
+    selected_reference: str | None = None
+    references: dict = field(default_factory=dict)
+    regions: dict = field(default_factory=dict)
+    tracking: bool = True
+    engine: str = MATCH_ENGINE_EXHAUSTIVE
+    change_threshold: float = DEFAULT_CHANGE_THRESHOLD
+    frame_origin: tuple = (0, 0)  # (x, y) of cropped capture frames in camera pixels
+    source_size: tuple | None = None  # (width, height) of the camera frame before any crop
 
 
 @dataclass(frozen=True)
@@ -45,35 +93,18 @@ class DetectionResult:
     confidence: float
     reference: str | None
     timestamp: float
+    bbox: tuple | None = None
 
 
 # =========================
 # Debug storage accounting
 # =========================
 
-def _compute_initial_debug_storage_bytes():
-    debug_dir = get_debug_dir()
-    total = 0
-    try:
-        names = os.listdir(debug_dir)
-    except Exception:
-        return 0
-    for name in names:
-        if not name.lower().endswith(DEBUG_EXTENSIONS):
-            continue
-        path = os.path.join(debug_dir, name)
-        try:
-            if os.path.isfile(path):
-                total += os.path.getsize(path)
-        except Exception:
-            continue
-    return total
-
-
 def initialize_debug_storage_tracking(state: DetectorState):
-    """Initialize debug storage accounting at startup."""
+    """Initialize debug storage accounting at startup (scans the directory once)."""
     try:
-        state.total_debug_storage_bytes = _compute_initial_debug_storage_bytes()
+        debug_usage.seed(get_debug_dir(), DEBUG_EXTENSIONS)
+        state.total_debug_storage_bytes = debug_usage.snapshot()[0]
     except Exception:
         logging.warning(
             "Failed to initialize debug storage accounting; disabling debug writes.",
@@ -93,14 +124,23 @@ def _emit_debug_limit_warning_once(state: DetectorState):
     state.debug_limit_warning_emitted = True
 
 
-def _save_debug_image_if_allowed(debug_dir, debug_image, state: DetectorState, profile_name: str, reference_name: str):
-    """Persist debug image and enforce global bounds."""
+def _debug_image_path(debug_dir, state: DetectorState):
+    """Return a new debug image path, numbered by the detection thread's counter."""
+    state.debug_counter += 1
+    return os.path.join(debug_dir, f"match_{time.time_ns()}_{state.debug_counter:04d}.png")
+
+
+def _save_debug_image_if_allowed(debug_path, frame_gray, bbox, profile_name: str, reference_name: str):
+    """Render, persist and index a debug image, then enforce global bounds.
+
+    Runs on the debug writer, so it never touches DetectorState; sizes are
+    reported through debug_usage and latency/drops through the writer's stats.
+    """
     try:
-        state.debug_counter += 1
-        debug_path = os.path.join(
-            debug_dir,
-            f"match_{time.time_ns()}_{state.debug_counter:04d}.png"
-        )
+        debug_usage.seed(os.path.dirname(debug_path), DEBUG_EXTENSIONS)
+        debug_image = cv2.cvtColor(frame_gray, cv2.COLOR_GRAY2BGR)
+        x, y, w, h = bbox
+        cv2.rectangle(debug_image, (x, y), (x + w, y + h), (0, 255, 0), 2)
 
         if not cv2.imwrite(debug_path, debug_image):
             logging.warning("Failed to write debug image; continuing monitoring.")
@@ -111,15 +151,14 @@ def _save_debug_image_if_allowed(debug_dir, debug_image, state: DetectorState, p
         except Exception:
             size_bytes = 0
         storage.add_debug_entry(profile_name, reference_name, debug_path, size_bytes)
+        debug_usage.add(size_bytes)
         for path in storage.prune_debug_entries(DEBUG_STORAGE_LIMIT_BYTES, DEBUG_STORAGE_LIMIT_COUNT):
             try:
+                pruned_bytes = os.path.getsize(path)
                 os.remove(path)
+                debug_usage.remove(pruned_bytes)
             except Exception:
                 logging.warning("Failed to prune debug image %s", path, exc_info=True)
-        state.total_debug_storage_bytes = _compute_initial_debug_storage_bytes()
-
-        state.last_debug_frame = debug_image
-
     except Exception:
         logging.warning(
             "Failed to write debug image; continuing monitoring.",
@@ -191,45 +230,258 @@ def reference_selector(profile_name):
     ref_path = os.path.join(ref_dir, f"ref_{len(existing) + 1}.png")
 
     cv2.imwrite(ref_path, crop)
-    storage.add_reference(profile_name, os.path.basename(ref_path), ref_path, base_frames[0])
+    storage.add_reference(
+        profile_name,
+        os.path.basename(ref_path),
+        ref_path,
+        base_frames[0],
+        crop=(x0, y0, x1, y1),
+        source_size=(orig_w, orig_h),
+    )
     cv2.destroyAllWindows()
     return True, f"Reference saved as {os.path.basename(ref_path)}"
 
 
 # =========================
-# Detection core
+# Detection context
 # =========================
 
-def _find_best_match(profile_name, frame_gray, selected_reference: str | None = None):
-    """Return best matching reference and confidence score for a frame."""
-    frame_e = cv2.Canny(frame_gray, 80, 160)
-    references_dir = get_profile_dirs(profile_name)["references"]
-
-    refs_to_check = (
+def build_detection_context(profile_name, selected_reference: str | None = None):
+    """Resolve threshold, directories and compiled references for a session."""
+    dirs = get_profile_dirs(profile_name)
+    references_dir = dirs["references"]
+    names = (
         [selected_reference]
         if selected_reference
-        else [f for f in os.listdir(references_dir) if f.lower().endswith(".png")]
+        else sorted(
+            (f for f in os.listdir(references_dir) if f.lower().endswith(".png")),
+            key=str.lower,
+        )
+    )
+    references = {}
+    for name in names:
+        if not name.lower().endswith(".png"):
+            continue
+        compiled = reference_cache.get(profile_name, name, os.path.join(references_dir, name))
+        if compiled is not None:
+            references[name] = compiled
+
+    regions = {
+        name: region
+        for name, region in list_reference_search_regions(profile_name).items()
+        if name in references
+    }
+
+    return DetectionContext(
+        profile_name=profile_name,
+        profile_valid=os.path.isdir(profile_path(profile_name)),
+        threshold=get_detection_threshold(profile_name),
+        references_dir=references_dir,
+        debug_dir=os.path.abspath(get_debug_dir()),
+        selected_reference=selected_reference,
+        references=references,
+        regions=regions,
+        engine=get_profile_match_engine(profile_name),
+        change_threshold=get_profile_change_threshold(profile_name),
+    )
+
+
+# =========================
+# Detection core
+# =========================
+
+def _tracking_window(bbox, frame_shape, padding=TRACK_PADDING):
+    """Return (x0, y0, x1, y1) of the padded search window around a bbox."""
+    x, y, w, h = bbox
+    fh, fw = frame_shape[:2]
+    return (
+        max(0, x - padding),
+        max(0, y - padding),
+        min(fw, x + w + padding),
+        min(fh, y + h + padding),
+    )
+
+
+def _region_window(region, frame_shape, origin=(0, 0), source_size=None):
+    """Return the padded (x0, y0, x1, y1) search window for a stored crop region.
+
+    Coordinates are scaled when the capture size differs from the source frame,
+    then shifted by origin when the capture is cropped to source_size.
+    """
+    fh, fw = frame_shape[:2]
+    cw, ch = source_size or (fw, fh)
+    sx = cw / region.source_width if region.source_width else 1.0
+    sy = ch / region.source_height if region.source_height else 1.0
+    margin = region.search_margin if region.search_margin is not None else DEFAULT_SEARCH_MARGIN
+    ox, oy = origin
+    return (
+        max(0, int(region.x0 * sx) - margin - ox),
+        max(0, int(region.y0 * sy) - margin - oy),
+        min(fw, int(region.x1 * sx) + margin - ox),
+        min(fh, int(region.y1 * sy) + margin - oy),
+    )
+
+
+def capture_roi(context: DetectionContext, frame_size, padding=CAPTURE_ROI_PADDING):
+    """Return the (x, y, w, h) camera area covering every active reference's search window.
+
+    None when a reference has no enabled search region (it needs the whole frame)
+    or when the union would not be smaller than the frame. Edges are kept even.
+    """
+    if not context.references or any(ref not in context.regions for ref in context.references):
+        return None
+    width, height = frame_size
+    windows = [_region_window(context.regions[ref], (height, width)) for ref in context.references]
+    x0 = max(0, min(w[0] for w in windows) - padding) & ~1
+    y0 = max(0, min(w[1] for w in windows) - padding) & ~1
+    x1 = min(width, max(w[2] for w in windows) + padding)
+    y1 = min(height, max(w[3] for w in windows) + padding)
+    x1 = min(width, x1 + ((x1 - x0) & 1))
+    y1 = min(height, y1 + ((y1 - y0) & 1))
+    if x1 <= x0 or y1 <= y0 or (x1 - x0) * (y1 - y0) >= width * height:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _match_exhaustive(frame_e, template_e):
+    """Return (score, (x, y)) of the best TM_CCOEFF_NORMED match over the whole edge map."""
+    result = cv2.matchTemplate(frame_e, template_e, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return max_val, max_loc
+
+
+def _coarse_peaks(result, top_k, suppress_w, suppress_h):
+    """Return up to top_k peak locations, suppressing neighbours around each pick."""
+    peaks = []
+    for _ in range(top_k):
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val <= -1.0:
+            break
+        peaks.append(max_loc)
+        x, y = max_loc
+        result[
+            max(0, y - suppress_h):y + suppress_h + 1,
+            max(0, x - suppress_w):x + suppress_w + 1,
+        ] = -1.0
+    return peaks
+
+
+def _match_pyramid(frame_e, compiled, frame_pyramid, floor):
+    """Return (score, (x, y)) using a coarse search on downscaled edges, or None.
+
+    Candidate peaks from the coarsest usable level are verified with a full
+    resolution TM_CCOEFF_NORMED match in a small neighbourhood. The coarse
+    stage can miss the best position, so the score is a lower bound of the
+    exhaustive one and the bbox may differ; only the matched/unmatched
+    decision is meant to agree. A verified score within PYRAMID_CONFIRM_MARGIN
+    of floor, or a template too small to downscale, returns None so the
+    caller runs the exhaustive search.
+    """
+    template_e = compiled.edges
+    th, tw = template_e.shape[:2]
+    fh, fw = frame_e.shape[:2]
+    for scale in sorted(compiled.pyramid):
+        coarse_t = compiled.pyramid[scale]
+        if min(coarse_t.shape[:2]) < PYRAMID_MIN_TEMPLATE:
+            continue
+        if scale not in frame_pyramid:
+            frame_pyramid[scale] = downscale_edges(frame_e, scale)
+        coarse_f = frame_pyramid[scale]
+        if coarse_t.shape[0] > coarse_f.shape[0] or coarse_t.shape[1] > coarse_f.shape[1]:
+            continue
+        result = cv2.matchTemplate(coarse_f, coarse_t, cv2.TM_CCOEFF_NORMED)
+        peaks = _coarse_peaks(
+            result,
+            PYRAMID_TOP_K,
+            max(1, coarse_t.shape[1] // 2),
+            max(1, coarse_t.shape[0] // 2),
+        )
+        radius = int(round(1.0 / scale)) + 1
+        best_val = -1.0
+        best_loc = (0, 0)
+        for cx, cy in peaks:
+            x0 = max(0, int(cx / scale) - radius)
+            y0 = max(0, int(cy / scale) - radius)
+            x1 = min(fw, int(cx / scale) + tw + radius)
+            y1 = min(fh, int(cy / scale) + th + radius)
+            if x1 - x0 < tw or y1 - y0 < th:
+                continue
+            val, (lx, ly) = _match_exhaustive(frame_e[y0:y1, x0:x1], template_e)
+            if val > best_val:
+                best_val = val
+                best_loc = (x0 + lx, y0 + ly)
+        if abs(best_val - floor) < PYRAMID_CONFIRM_MARGIN:
+            return None
+        return best_val, best_loc
+    return None
+
+
+def _find_best_match(context: DetectionContext, frame_gray, names=None, window=None, edge_map=None):
+    """Return best matching reference and confidence score for a frame.
+
+    When window is set, only that (x0, y0, x1, y1) region is searched. Otherwise
+    references with an enabled search region are matched inside their region and
+    the rest against the full frame. Bboxes are always in frame coordinates.
+    The FFT engine shares one frame transform across all full-frame references;
+    windowed searches stay spatial because the windows are small. The pyramid
+    engine rechecks scores near the threshold with the exhaustive search. With
+    an edge_map, full-frame edges and exhaustive scores are refreshed only
+    where tiles changed since the previous search.
+    """
+    full_e = None
+    full_pyramid = {}
+    full_spectrum = None
+    candidates = (
+        context.references.items()
+        if names is None
+        else [(n, context.references[n]) for n in names if n in context.references]
     )
     best_ref = None
     best_bbox = None
     best_score = 0.0
-    for ref in refs_to_check:
-        if not ref.lower().endswith(".png"):
-            continue
-        ref_path = os.path.join(references_dir, ref)
-        template = cv2.imread(ref_path, cv2.IMREAD_GRAYSCALE)
-        if template is None:
-            continue
-
-        template_e = cv2.Canny(template, 80, 160)
+    for ref, compiled in candidates:
+        ref_window = window
+        if ref_window is None and ref in context.regions:
+            ref_window = _region_window(
+                context.regions[ref], frame_gray.shape, context.frame_origin, context.source_size
+            )
+        if ref_window is None:
+            if full_e is None:
+                full_e = (
+                    edge_map.update(frame_gray)
+                    if edge_map is not None
+                    else cv2.Canny(frame_gray, CANNY_LOW, CANNY_HIGH)
+                )
+            frame_e, ox, oy = full_e, 0, 0
+            frame_pyramid = full_pyramid
+        else:
+            ox, oy, x1, y1 = ref_window
+            if x1 <= ox or y1 <= oy:
+                continue  # region lies outside a cropped capture
+            frame_e = cv2.Canny(frame_gray[oy:y1, ox:x1], CANNY_LOW, CANNY_HIGH)
+            frame_pyramid = {}
+
+        template_e = compiled.edges
         tw, th = template_e.shape[1], template_e.shape[0]
         fw, fh = frame_e.shape[1], frame_e.shape[0]
         if tw > fw or th > fh:
             continue
-        result = cv2.matchTemplate(frame_e, template_e, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        match = None
+        if context.engine == MATCH_ENGINE_FFT and ref_window is None:
+            if full_spectrum is None:
+                full_spectrum = FrameSpectrum(full_e)
+            match = full_spectrum.match(compiled)
+        elif context.engine == MATCH_ENGINE_PYRAMID:
+            match = _match_pyramid(frame_e, compiled, frame_pyramid, context.threshold)
+        if match is None and edge_map is not None and ref_window is None:
+            match = edge_map.match(ref, compiled)
+        elif match is None:
+            match = _match_exhaustive(frame_e, template_e)
+        max_val, max_loc = match
         if max_val > best_score:
             x, y = max_loc
+            x += ox
+            y += oy
             h, w = template_e.shape[:2]
             GRID = 8
             x = (x // GRID) * GRID
@@ -238,18 +490,83 @@ def _find_best_match(profile_name, frame_gray, selected_reference: str | None =
             best_bbox = (x, y, w, h)
             best_score = max_val
 
-    if best_ref and best_score >= get_detection_threshold(profile_name):
+    if best_ref and best_score >= context.threshold:
         return best_ref, best_bbox, best_score
 
     return None, None, best_score
 
 
-def evaluate_frame(profile_name, frame, state: DetectorState, selected_reference: str | None = None):
-    """Evaluate a frame deterministically and return match metadata."""
+def _frame_signature(frame_gray):
+    """Return per-block mean intensities of the frame used for change detection."""
+    return cv2.resize(frame_gray, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def _frame_unchanged(context: DetectionContext, state: DetectorState, signature) -> bool:
+    """Return True when no signature block changed by more than the profile threshold.
+
+    The per-block maximum keeps small overlays (a dialogue box appearing) from
+    being averaged away by an otherwise static frame. Only frames evaluated
+    with the same context are compared, so a rebuilt context (new threshold,
+    engine or references) always triggers a fresh search.
+    """
+    if (
+        context.change_threshold <= 0
+        or state.last_search is None
+        or state.last_signature is None
+        or state.gate_context is not context
+        or state.last_signature.shape != signature.shape
+    ):
+        return False
+    _, max_diff, _, _ = cv2.minMaxLoc(cv2.absdiff(signature, state.last_signature))
+    return max_diff <= context.change_threshold
+
+
+def _search_frame(context: DetectionContext, frame_gray, state: DetectorState):
+    """Search around the last match when tracking, falling back to the full frame."""
+    matched_ref = None
+    if (
+        context.tracking
+        and state.track_bbox is not None
+        and state.track_reference in context.references
+        and state.frames_since_full_search < TRACK_FULL_SEARCH_INTERVAL
+    ):
+        window = _tracking_window(state.track_bbox, frame_gray.shape)
+        matched_ref, match_bbox, confidence = _find_best_match(
+            context, frame_gray, names=[state.track_reference], window=window
+        )
+        state.frames_since_full_search += 1
+        state.tracked_searches += 1
+
+    if matched_ref is None:
+        matched_ref, match_bbox, confidence = _find_best_match(
+            context, frame_gray, edge_map=state.edge_map
+        )
+        state.frames_since_full_search = 0
+        state.full_searches += 1
+
+    state.track_reference = matched_ref
+    state.track_bbox = match_bbox
+    return matched_ref, match_bbox, confidence
+
+
+def evaluate_frame(
+    profile_name,
+    frame,
+    state: DetectorState,
+    selected_reference: str | None = None,
+    context: DetectionContext | None = None,
+):
+    """Evaluate a frame deterministically and return match metadata.
+
+    Pass a prebuilt context from the monitoring loop; without one it is resolved per call.
+    Frames that did not change since the last search reuse its result; this only
+    applies across calls sharing the same context.
+    """
     if not profile_name or frame is None:
         return DetectionResult(False, 0.0, None, time.time())
 
-    profile_valid = os.path.isdir(profile_path(profile_name))
+    if context is None:
+        context = build_detection_context(profile_name, selected_reference)
 
     frame_gray = (
         cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
@@ -257,11 +574,15 @@ def evaluate_frame(profile_name, frame, state: DetectorState, selected_reference
     )
 
     now = time.time()
-    matched_ref, match_bbox, confidence = _find_best_match(
-        profile_name,
-        frame_gray,
-        selected_reference,
-    )
+    signature = _frame_signature(frame_gray)
+    if _frame_unchanged(context, state, signature):
+        matched_ref, match_bbox, confidence = state.last_search
+        state.skipped_frames += 1
+    else:
+        matched_ref, match_bbox, confidence = _search_frame(context, frame_gray, state)
+        state.last_signature = signature
+        state.last_search = (matched_ref, match_bbox, confidence)
+        state.gate_context = context
 
     if matched_ref is not None:
         state.last_seen_time = now
@@ -273,22 +594,23 @@ def evaluate_frame(profile_name, frame, state: DetectorState, selected_reference
         if state.active_dialogue != matched_ref:
             state.active_dialogue = matched_ref
 
-        if event_start:
-            debug = cv2.cvtColor(frame_gray, cv2.COLOR_GRAY2BGR)
-            x, y, w, h = match_bbox
-            cv2.rectangle(debug, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-            debug_dir = get_debug_dir()
-            if debug_dir:
-                _save_debug_image_if_allowed(
-                    debug_dir,
-                    debug,
-                    state,
-                    profile_name if profile_valid else None,
-                    matched_ref,
-                )
-
-        return DetectionResult(True, float(confidence), matched_ref, now)
+        if event_start and context.debug_dir:
+            # Detector state is only written here; the writer gets its own copies.
+            state.last_debug_frame = frame_gray.copy()
+            state.total_debug_storage_bytes = debug_usage.snapshot()[0]
+            debug_writer.submit(
+                _save_debug_image_if_allowed,
+                _debug_image_path(context.debug_dir, state),
+                state.last_debug_frame,
+                match_bbox,
+                profile_name if context.profile_valid else None,
+                matched_ref,
+            )
+
+        ox, oy = context.frame_origin
+        x, y, w, h = match_bbox
+        # Tracking and debug images stay in capture coordinates; results report camera pixels.
+        return DetectionResult(True, float(confidence), matched_ref, now, (x + ox, y + oy, w, h))
 
     if state.active_dialogue and now - state.last_seen_time > EXIT_TIMEOUT:
         state.active_dialogue = None
@@ -0,0 +1,194 @@
+"""Incremental Canny edge map and score maps updated only where tiles changed.
+
+Design:
+ - The frame is split into TILE_SIZE squares. Each tile is compared with the
+   gray pixels its current edges were computed from; only tiles whose largest
+   difference exceeds TILE_CHANGE_TOLERANCE are dirty. Comparing with the
+   source pixels (not the previous frame) keeps slow drifts from slipping by.
+ - Dirty tiles are grouped into connected rectangles and Canny is re-run per
+   rectangle with an apron. Edges up to EDGE_REACH pixels outside a changed
+   area depend on it through Sobel and non-maximum suppression, so the
+   written area is the rectangle dilated by EDGE_REACH. Hysteresis can carry
+   a change further along an edge chain: when the recomputed edges in the
+   ring just outside the written area disagree with the stored ones, the
+   rectangle grows to its apron and is recomputed with a doubled apron
+   until they agree. Once the local passes of an update would cover more
+   than FULL_PASS_FRACTION of the frame, one full pass is run instead.
+ - Each reference keeps its full TM_CCOEFF_NORMED score map. Only positions
+   whose template footprint overlaps a dirty rectangle are rescored.
+ - A short history of dirty rectangles lets references that were not matched
+   on every update catch up; anything older triggers a full rescore.
+"""
+from __future__ import annotations
+
+from collections import deque
+
+import numpy as np
+
+from core.reference_cache import CANNY_HIGH, CANNY_LOW
+
+TILE_SIZE = 64
+TILE_CHANGE_TOLERANCE = 2  # gray levels a tile pixel may drift before the tile is dirty
+TILE_APRON = 16  # extra pixels around dirty rectangles fed to Canny
+EDGE_REACH = 4  # pixels beyond changed gray values whose edges can change (Sobel + NMS)
+FULL_PASS_FRACTION = 0.25  # share of the frame local Canny passes may cover before one full pass
+DIRTY_HISTORY = 8  # updates remembered for score maps that fall behind
+
+
+class TiledEdgeMap:
+    """Persistent edge map of the last searched frame, refreshed tile by tile."""
+
+    def __init__(self, tile_size: int = TILE_SIZE, tolerance: int = TILE_CHANGE_TOLERANCE):
+        self.tile_size = max(8, int(tile_size))
+        self.tolerance = int(tolerance)
+        self.gray = None
+        self.edges = None
+        self.version = 0
+        self._history: deque = deque(maxlen=DIRTY_HISTORY)
+        self._scores: dict[str, tuple[object, int, np.ndarray]] = {}
+        self.tiles_recomputed = 0
+        self.tiles_total = 0
+
+    def reset(self) -> None:
+        """Forget the edge map and every score map."""
+        self.gray = None
+        self.edges = None
+        self._history.clear()
+        self._scores.clear()
+
+    def _grid(self, shape) -> tuple[int, int]:
+        """Return the (rows, cols) tile grid covering a frame shape."""
+        return -(-shape[0] // self.tile_size), -(-shape[1] // self.tile_size)
+
+    def _dirty_rects(self, frame_gray) -> list[tuple[int, int, int, int]]:
+        """Return (x0, y0, x1, y1) rectangles covering connected dirty tiles."""
+        import cv2
+
+        tile = self.tile_size
+        height, width = frame_gray.shape[:2]
+        rows, cols = self._grid(frame_gray.shape)
+        diff = cv2.absdiff(frame_gray, self.gray)
+        diff = cv2.copyMakeBorder(
+            diff, 0, rows * tile - height, 0, cols * tile - width, cv2.BORDER_CONSTANT, value=0
+        )
+        tile_max = diff.reshape(rows, tile, cols, tile).max(axis=(1, 3))
+        dirty = (tile_max > self.tolerance).astype(np.uint8)
+        if not dirty.any():
+            return []
+        self.tiles_recomputed += int(dirty.sum())
+        count, _, stats, _ = cv2.connectedComponentsWithStats(dirty, connectivity=8)
+        rects = []
+        for x, y, w, h, _ in stats[1:count]:
+            rects.append((x * tile, y * tile, min(width, (x + w) * tile), min(height, (y + h) * tile)))
+        return rects
+
+    def update(self, frame_gray):
+        """Refresh edges for a new frame and return them.
+
+        Returns the full edge map; dirty rectangles are recorded for match().
+        """
+        import cv2
+
+        self.version += 1
+        rows, cols = self._grid(frame_gray.shape)
+        self.tiles_total += rows * cols
+        if self.gray is None or self.gray.shape != frame_gray.shape:
+            self.reset()
+            self.gray = frame_gray.copy()
+            self.edges = cv2.Canny(frame_gray, CANNY_LOW, CANNY_HIGH)
+            self.tiles_recomputed += rows * cols
+            self._history.append((self.version, None))
+            return self.edges
+
+        height, width = frame_gray.shape[:2]
+        budget = [width * height * FULL_PASS_FRACTION]
+        rects = []
+        for rect in self._dirty_rects(frame_gray):
+            written = self._recompute(frame_gray, rect, budget)
+            if written is None:
+                # Local passes would cost more than one exact full pass.
+                self.edges = cv2.Canny(frame_gray, CANNY_LOW, CANNY_HIGH)
+                self.gray = frame_gray.copy()
+                rects = [(0, 0, width, height)]
+                break
+            rects.append(written)
+        self._history.append((self.version, rects))
+        return self.edges
+
+    def _recompute(self, frame_gray, rect, budget) -> tuple[int, int, int, int] | None:
+        """Re-run Canny around a dirty rectangle and return the (x0, y0, x1, y1) area written.
+
+        budget is a one-item list of pixels the caller still allows; None when exceeded.
+        """
+        import cv2
+
+        height, width = frame_gray.shape[:2]
+
+        def grow(r, by):
+            return max(0, r[0] - by), max(0, r[1] - by), min(width, r[2] + by), min(height, r[3] + by)
+
+        apron = TILE_APRON
+        while True:
+            ax0, ay0, ax1, ay1 = grow(rect, apron)
+            budget[0] -= (ax1 - ax0) * (ay1 - ay0)
+            if budget[0] < 0:
+                return None
+            wx0, wy0, wx1, wy1 = grow(rect, EDGE_REACH)
+            patch = cv2.Canny(frame_gray[ay0:ay1, ax0:ax1], CANNY_LOW, CANNY_HIGH)
+            # Compare the ring outside the written area, away from the apron edge.
+            cx0 = ax0 + EDGE_REACH if ax0 else 0
+            cy0 = ay0 + EDGE_REACH if ay0 else 0
+            cx1 = ax1 - EDGE_REACH if ax1 < width else width
+            cy1 = ay1 - EDGE_REACH if ay1 < height else height
+            changed = patch[cy0 - ay0:cy1 - ay0, cx0 - ax0:cx1 - ax0] != self.edges[cy0:cy1, cx0:cx1]
+            changed[wy0 - cy0:wy1 - cy0, wx0 - cx0:wx1 - cx0] = False
+            if not changed.any():
+                break
+            rect = (ax0, ay0, ax1, ay1)
+            apron *= 2
+        self.edges[wy0:wy1, wx0:wx1] = patch[wy0 - ay0:wy1 - ay0, wx0 - ax0:wx1 - ax0]
+        self.gray[wy0:wy1, wx0:wx1] = frame_gray[wy0:wy1, wx0:wx1]
+        return wx0, wy0, wx1, wy1
+
+    def _pending_rects(self, since: int):
+        """Return dirty rectangles recorded after version `since`, or None if unknown."""
+        if since >= self.version:
+            return []
+        if not self._history or self._history[0][0] > since + 1:
+            return None
+        pending = []
+        for version, rects in self._history:
+            if version <= since:
+                continue
+            if rects is None:
+                return None
+            pending.extend(rects)
+        return pending
+
+    def match(self, name: str, compiled) -> tuple[float, tuple[int, int]]:
+        """Return (score, (x, y)) of the best match, rescoring only dirty positions."""
+        import cv2
+
+        template_e = compiled.edges
+        th, tw = template_e.shape[:2]
+        entry = self._scores.get(name)
+        pending = None
+        if entry is not None and entry[0] is compiled:
+            pending = self._pending_rects(entry[1])
+
+        if pending is None:
+            scores = cv2.matchTemplate(self.edges, template_e, cv2.TM_CCOEFF_NORMED)
+        else:
+            scores = entry[2]
+            rows, cols = scores.shape[:2]
+            for x0, y0, x1, y1 in pending:
+                rx0, ry0 = max(0, x0 - tw + 1), max(0, y0 - th + 1)
+                rx1, ry1 = min(cols, x1), min(rows, y1)
+                if rx1 <= rx0 or ry1 <= ry0:
+                    continue
+                scores[ry0:ry1, rx0:rx1] = cv2.matchTemplate(
+                    self.edges[ry0:ry1 + th - 1, rx0:rx1 + tw - 1], template_e, cv2.TM_CCOEFF_NORMED
+                )
+        self._scores[name] = (compiled, self.version, scores)
+        _, max_val, _, max_loc = cv2.minMaxLoc(scores)
+        return max_val, max_loc
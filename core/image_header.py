@@ -0,0 +1,88 @@
+"""Read image dimensions from PNG, JPEG and WebP headers without decoding pixels.
+
+Design:
+ - Only the bytes that carry the size are read: the PNG IHDR chunk, the JPEG
+   segment headers up to the first start-of-frame marker, or the WebP
+   VP8/VP8L/VP8X chunk header.
+ - Unknown or truncated files return None; callers fall back to other sources.
+"""
+from __future__ import annotations
+
+import struct
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_JPEG_SOF_MARKERS = frozenset(
+    (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF)
+)
+_JPEG_STANDALONE_MARKERS = frozenset((0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8))
+_JPEG_MAX_SEGMENTS = 256  # guards against corrupt files that never reach a frame header
+
+
+def _png_size(head: bytes) -> tuple[int, int] | None:
+    if len(head) < 24 or head[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", head[16:24])
+
+
+def _webp_size(head: bytes) -> tuple[int, int] | None:
+    chunk = head[12:16]
+    if chunk == b"VP8 " and len(head) >= 30 and head[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(head) >= 25 and head[20] == 0x2F:
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(head) >= 30:
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def _jpeg_size(handle) -> tuple[int, int] | None:
+    handle.seek(2)
+    for _ in range(_JPEG_MAX_SEGMENTS):
+        byte = handle.read(1)
+        while byte and byte != b"\xff":
+            byte = handle.read(1)
+        while byte == b"\xff":
+            byte = handle.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):  # end of image / start of scan before any frame header
+            return None
+        length_bytes = handle.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if marker in _JPEG_SOF_MARKERS:
+            frame = handle.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        handle.seek(length - 2, 1)
+    return None
+
+
+def probe_image_size(path: str) -> tuple[int, int] | None:
+    """Return (width, height) from the file header, or None if unknown or unreadable."""
+    try:
+        with open(path, "rb") as handle:
+            head = handle.read(32)
+            if head.startswith(_PNG_SIGNATURE):
+                size = _png_size(head)
+            elif head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+                size = _webp_size(head)
+            elif head[:2] == b"\xff\xd8":
+                size = _jpeg_size(handle)
+            else:
+                size = None
+    except OSError:
+        return None
+    if size is None or size[0] <= 0 or size[1] <= 0:
+        return None
+    return size
@@ -3,16 +3,27 @@
 Design:
 - SQLite stores metadata (profiles, frames, references, debug).
 - Filesystem stores images under Data/Profiles and Data/Debug.
+- Filesystem-only assets are synced into SQLite in the background, and only
+  for profiles whose asset directories changed (see core/asset_sync.py).
+- Frame and reference listings are plain SQLite reads. Rows are reconciled
+  with files by the asset sync, the optional watcher (core/asset_watcher.py)
+  and a chunked background checker (core/asset_integrity.py).
 """
 import os
 import re
 import shutil
 
 from core import storage
+from core.asset_integrity import asset_integrity
+from core.asset_sync import asset_sync
+from core.asset_watcher import asset_watcher
+from core.debug_usage import debug_usage
+from core.image_header import probe_image_size
 
 BASE_DIR = os.path.join("Data", "Profiles")
 DEBUG_DIR = os.path.join("Data", "Debug")
 DEBUG_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+ASSET_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
 DEFAULT_DETECTION_THRESHOLD = 0.70
 MIN_DETECTION_THRESHOLD = 0.50
 MAX_DETECTION_THRESHOLD = 0.95
@@ -20,6 +31,21 @@ DEFAULT_TARGET_FPS = 30
 MIN_TARGET_FPS = 1
 MAX_TARGET_FPS = 60
 DEFAULT_FRAME_SIZE = (1280, 720)
+MATCH_ENGINE_EXHAUSTIVE = "exhaustive"
+MATCH_ENGINE_PYRAMID = "pyramid"
+MATCH_ENGINE_FFT = "fft"
+MATCH_ENGINES = (MATCH_ENGINE_EXHAUSTIVE, MATCH_ENGINE_PYRAMID, MATCH_ENGINE_FFT)
+DEFAULT_MATCH_ENGINE = MATCH_ENGINE_EXHAUSTIVE
+DEFAULT_CHANGE_THRESHOLD = 8.0  # largest per-block gray-level change treated as static
+MIN_CHANGE_THRESHOLD = 0.0  # 0 disables change gating
+MAX_CHANGE_THRESHOLD = 64.0
+DEFAULT_SEARCH_MARGIN = 48
+MIN_SEARCH_MARGIN = 0
+MAX_SEARCH_MARGIN = 512
+CAPTURE_FORMAT_COLOR = "color"  # full-resolution bgr24, as the preview shows it
+CAPTURE_FORMAT_DETECTION = "detection"  # FFmpeg-side crop and grayscale for the detector
+CAPTURE_FORMATS = (CAPTURE_FORMAT_COLOR, CAPTURE_FORMAT_DETECTION)
+DEFAULT_CAPTURE_FORMAT = CAPTURE_FORMAT_COLOR
 
 def profile_path(name):
     """Return filesystem path for a profile root directory."""
@@ -47,7 +73,7 @@ def list_profiles():
     profiles = storage.list_profiles()
     if profiles:
         for name in profiles:
-            migrate_profile_assets(name)
+            request_asset_sync(name)
         return profiles
     if not os.path.exists(BASE_DIR):
         return []
@@ -60,10 +86,48 @@ def list_profiles():
             storage.create_profile(name)
         except Exception:
             continue
-        migrate_profile_assets(name)
+        request_asset_sync(name)
     return sorted(discovered, key=str.lower)
 
 
+def start_asset_watcher(backend=None):
+    """Start the optional filesystem watcher for profile assets and debug images."""
+    return asset_watcher.start(BASE_DIR, DEBUG_DIR, ASSET_EXTENSIONS, migrate_profile_assets, backend=backend)
+
+
+def stop_asset_watcher():
+    """Stop the filesystem watcher; changes are then picked up by the gated asset sync."""
+    asset_watcher.stop()
+
+
+def start_asset_integrity_checks():
+    """Start periodic background reconciliation of asset rows with files."""
+    return asset_integrity.start(BASE_DIR)
+
+
+def stop_asset_integrity_checks():
+    """Stop background reconciliation."""
+    asset_integrity.stop()
+
+
+def _asset_sync_key(profile_name):
+    """Return the sync index key for a profile (its absolute root directory)."""
+    return os.path.abspath(profile_path(profile_name))
+
+
+def request_asset_sync(profile_name):
+    """Queue a background asset sync if the profile's frame or reference directory changed."""
+    if asset_watcher.covers(profile_name):
+        return False
+    root = _asset_sync_key(profile_name)
+    return asset_sync.request(
+        root,
+        (os.path.join(root, "frames"), os.path.join(root, "references")),
+        migrate_profile_assets,
+        profile_name,
+    )
+
+
 def get_profile_dirs(profile_name):
     """Ensure profile directories exist and return paths dict (root, frames, references, captures)."""
     root = os.path.join(BASE_DIR, profile_name)
@@ -81,41 +145,54 @@ def get_profile_dirs(profile_name):
     return dirs
 
 
+def _untracked_images(directory, known_names, valid_exts):
+    """Return sorted (name, path) pairs for image files not yet in known_names."""
+    found = []
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return found
+    for entry in entries:
+        name = entry.name
+        if not name.lower().endswith(valid_exts) or name in known_names:
+            continue
+        try:
+            if entry.is_file():
+                found.append((name, entry.path))
+        except OSError:
+            continue
+    found.sort(key=lambda item: item[0].lower())
+    return found
+
+
 def migrate_profile_assets(profile_name):
     #note:
-    # This migration is intentionally idempotent and may run multiple times
-    # during profile listing in V1. This is acceptable for now.
-    # Future versions may gate or cache this to reduce filesystem scans.
+    # This migration is intentionally idempotent. list_profiles only queues it
+    # (via request_asset_sync) when the profile's asset directories changed.
     """Populate SQLite with filesystem-only frames/references and prune missing entries."""
     if not profile_name:
         return
     dirs = get_profile_dirs(profile_name)
     frame_dir = dirs["frames"]
     ref_dir = dirs["references"]
-    valid_exts = (".png", ".jpg", ".jpeg", ".webp")
+    valid_exts = ASSET_EXTENSIONS
 
     existing_frames = {entry["name"] for entry in storage.list_frame_entries(profile_name)}
-    for name in sorted(os.listdir(frame_dir), key=str.lower):
-        if not name.lower().endswith(valid_exts):
-            continue
-        if name in existing_frames:
-            continue
-        path = os.path.join(frame_dir, name)
-        if os.path.isfile(path):
-            storage.add_frame(profile_name, name, path)
+    storage.add_frames_bulk(
+        profile_name,
+        [
+            (name, path, *(probe_image_size(path) or (None, None)))
+            for name, path in _untracked_images(frame_dir, existing_frames, valid_exts)
+        ],
+    )
 
     existing_refs = {entry["name"] for entry in storage.list_reference_entries(profile_name)}
-    for name in sorted(os.listdir(ref_dir), key=str.lower):
-        if not name.lower().endswith(valid_exts):
-            continue
-        if name in existing_refs:
-            continue
-        path = os.path.join(ref_dir, name)
-        if os.path.isfile(path):
-            storage.add_reference(profile_name, name, path, None)
+    storage.add_references_bulk(
+        profile_name,
+        [(name, path, None) for name, path in _untracked_images(ref_dir, existing_refs, valid_exts)],
+    )
 
-    list_frames(profile_name)
-    list_references(profile_name)
+    asset_integrity.check_profile(BASE_DIR, profile_name)
 
 def create_profile(profile_name):
     """
@@ -148,6 +225,7 @@ def delete_profile(profile_name):
         return False, "Profile not found."
     shutil.rmtree(target)
     storage.delete_profile(profile_name)
+    asset_sync.invalidate(_asset_sync_key(profile_name))
     return True, f"Profile '{profile_name}' deleted."
 
 
@@ -211,6 +289,66 @@ def update_profile_detection_threshold(profile_name, threshold):
     return True
 
 
+def get_profile_match_engine(profile_name):
+    """Fetch the template matching engine configured for a profile."""
+    record = storage.get_profile(profile_name) if profile_name else None
+    engine = record.match_engine if record else None
+    if engine not in MATCH_ENGINES:
+        engine = DEFAULT_MATCH_ENGINE
+    return engine
+
+
+def update_profile_match_engine(profile_name, engine):
+    """Persist the template matching engine for a profile."""
+    if not profile_name or engine not in MATCH_ENGINES:
+        return False
+    storage.update_profile_fields(profile_name, match_engine=engine)
+    return True
+
+
+def get_profile_capture_format(profile_name):
+    """Fetch the capture pixel format configured for a profile."""
+    record = storage.get_profile(profile_name) if profile_name else None
+    capture_format = record.capture_format if record else None
+    if capture_format not in CAPTURE_FORMATS:
+        capture_format = DEFAULT_CAPTURE_FORMAT
+    return capture_format
+
+
+def update_profile_capture_format(profile_name, capture_format):
+    """Persist the capture pixel format for a profile."""
+    if not profile_name or capture_format not in CAPTURE_FORMATS:
+        return False
+    storage.update_profile_fields(profile_name, capture_format=capture_format)
+    return True
+
+
+def _clamp_change_threshold(value):
+    """Clamp frame-change threshold within bounds."""
+    try:
+        numeric = float(value)
+    except (TypeError, ValueError):
+        numeric = DEFAULT_CHANGE_THRESHOLD
+    return max(MIN_CHANGE_THRESHOLD, min(MAX_CHANGE_THRESHOLD, numeric))
+
+
+def get_profile_change_threshold(profile_name):
+    """Fetch the frame-change gating threshold for a profile with defaults."""
+    record = storage.get_profile(profile_name) if profile_name else None
+    threshold = record.change_threshold if record else None
+    if threshold is None:
+        threshold = DEFAULT_CHANGE_THRESHOLD
+    return _clamp_change_threshold(threshold)
+
+
+def update_profile_change_threshold(profile_name, threshold):
+    """Persist the frame-change gating threshold for a profile."""
+    if not profile_name:
+        return False
+    storage.update_profile_fields(profile_name, change_threshold=_clamp_change_threshold(threshold))
+    return True
+
+
 def _clamp_target_fps(value):
     """Clamp target FPS within bounds."""
     try:
@@ -259,24 +397,23 @@ def set_profile_camera_device(profile_name, device_name):
 
 
 def get_profile_frame_size(profile_name):
-    """Return width/height of first frame image for the profile."""
-    import cv2
+    """Return width/height of first frame image for the profile.
+
+    Sizes come from SQLite; rows imported before sizes were stored are probed
+    from the image header once and backfilled.
+    """
     if not profile_name:
         return None, None
-    dirs = get_profile_dirs(profile_name)
-    frames_dir = dirs["frames"]
-    if not os.path.isdir(frames_dir):
-        return None, None
-    for name in sorted(os.listdir(frames_dir), key=str.lower):
-        if not name.lower().endswith((".png", ".jpg", ".jpeg")):
+    for entry in storage.list_frame_sizes(profile_name):
+        if not entry["name"].lower().endswith(ASSET_EXTENSIONS):
             continue
-        path = os.path.join(frames_dir, name)
-        frame = cv2.imread(path)
-        if frame is None:
+        if entry["width"] and entry["height"]:
+            return entry["width"], entry["height"]
+        size = probe_image_size(entry["path"])
+        if size is None:
             continue
-        height, width = frame.shape[:2]
-        if width > 0 and height > 0:
-            return width, height
+        storage.set_frame_size(profile_name, entry["name"], *size)
+        return size
     return None, None
 
 
@@ -288,51 +425,13 @@ def get_profile_frame_size_fallback():
 
 
 def list_frames(profile_name):
-    """List frame names for a profile from SQLite."""
-    dirs = get_profile_dirs(profile_name)
-    frame_dir = dirs["frames"]
-    cleaned = []
-    for entry in storage.list_frame_entries(profile_name):
-        name = entry["name"]
-        path = entry["path"]
-        if not name or not path:
-            # Remove incomplete rows so missing metadata does not linger in UI lists.
-            storage.delete_frame(profile_name, name)
-            continue
-        expected = os.path.join(frame_dir, name)
-        if path and os.path.isfile(path):
-            cleaned.append(name)
-            continue
-        if os.path.isfile(expected):
-            storage.update_frame_path(profile_name, name, expected)
-            cleaned.append(name)
-            continue
-        storage.delete_frame(profile_name, name)
-    return cleaned
+    """List frame names for a profile from SQLite (indexed read, no file checks)."""
+    return storage.list_frames(profile_name)
 
 
 def list_references(profile_name):
-    """List reference names for a profile from SQLite."""
-    dirs = get_profile_dirs(profile_name)
-    ref_dir = dirs["references"]
-    cleaned = []
-    for entry in storage.list_reference_entries(profile_name):
-        name = entry["name"]
-        path = entry["path"]
-        if not name or not path:
-            # Remove incomplete rows so missing metadata does not linger in UI lists.
-            storage.delete_reference(profile_name, name)
-            continue
-        expected = os.path.join(ref_dir, name)
-        if path and os.path.isfile(path):
-            cleaned.append(name)
-            continue
-        if os.path.isfile(expected):
-            storage.update_reference_path(profile_name, name, expected)
-            cleaned.append(name)
-            continue
-        storage.delete_reference(profile_name, name)
-    return cleaned
+    """List reference names for a profile from SQLite (indexed read, no file checks)."""
+    return storage.list_references(profile_name)
 
 
 def list_debug_frames(profile_name, allow_fallback=False):
@@ -348,6 +447,46 @@ def get_reference_parent_frame(profile_name, ref_name):
     return frame_name or "legacy"
 
 
+def _clamp_search_margin(value):
+    """Clamp reference search margin within bounds."""
+    try:
+        numeric = int(value)
+    except (TypeError, ValueError):
+        numeric = DEFAULT_SEARCH_MARGIN
+    return max(MIN_SEARCH_MARGIN, min(MAX_SEARCH_MARGIN, numeric))
+
+
+def get_reference_search_region(profile_name, ref_name):
+    """Return the stored crop region for a reference, or None for legacy references."""
+    if not profile_name or not ref_name:
+        return None
+    return storage.get_reference_region(profile_name, ref_name)
+
+
+def list_reference_search_regions(profile_name):
+    """Return enabled search regions keyed by reference name."""
+    if not profile_name:
+        return {}
+    return {
+        name: region
+        for name, region in storage.list_reference_regions(profile_name).items()
+        if region.search_enabled
+    }
+
+
+def set_reference_search_region(profile_name, ref_name, enabled, margin=None):
+    """Toggle region-restricted matching for a reference. Returns (success, message)."""
+    region = get_reference_search_region(profile_name, ref_name)
+    if region is None:
+        return False, "Reference has no stored crop region."
+    margin_value = _clamp_search_margin(margin) if margin is not None else None
+    if enabled and margin_value is None and region.search_margin is None:
+        margin_value = DEFAULT_SEARCH_MARGIN
+    storage.set_reference_search_region(profile_name, ref_name, enabled, margin_value)
+    state = "enabled" if enabled else "disabled"
+    return True, f"Search region {state} for '{ref_name}'."
+
+
 def _load_image_bytes(path):
     """Read image bytes from disk or return None."""
     if not path or not os.path.exists(path):
@@ -436,7 +575,7 @@ def import_frames(profile_name, file_paths):
     """Import external images into profile frames directory."""
     dirs = get_profile_dirs(profile_name)
     frames_dir = dirs["frames"]
-    added = 0
+    imported = []
     for src in file_paths:
         if not os.path.isfile(src):
             continue
@@ -450,9 +589,9 @@ def import_frames(profile_name, file_paths):
         if os.path.exists(dst):
             continue
         shutil.copy2(src, dst)
-        storage.add_frame(profile_name, name, dst)
-        added += 1
-    return added
+        imported.append((name, dst, *(probe_image_size(dst) or (None, None))))
+    storage.add_frames_bulk(profile_name, imported)
+    return len(imported)
 
 
 def delete_reference_files(profile_name, ref_name):
@@ -510,12 +649,14 @@ def delete_debug_frame(profile_name, debug_name, allow_fallback=False):
     debug_path = _safe_realpath(get_debug_dir(), debug_name)
     if not debug_path or not os.path.exists(debug_path):
         return False, 0
+    debug_usage.seed(get_debug_dir(), DEBUG_EXTENSIONS)
     if os.path.isfile(debug_path):
         try:
             bytes_freed = os.path.getsize(debug_path)
         except Exception:
             bytes_freed = 0
         os.remove(debug_path)
+        debug_usage.remove(bytes_freed)
         entries = storage.list_debug_entries(profile_name if not allow_fallback else None)
         for entry in entries:
             if os.path.basename(entry["path"]) == debug_name:
@@ -528,6 +669,7 @@ def delete_debug_frame(profile_name, debug_name, allow_fallback=False):
 def delete_all_debug_frames(profile_name, allow_fallback=False):
     """Delete all debug frames. Returns (deleted_count, bytes_freed)."""
     entries = storage.list_debug_entries(profile_name if not allow_fallback else None)
+    debug_usage.seed(get_debug_dir(), DEBUG_EXTENSIONS)
     deleted = 0
     bytes_freed = 0
     for entry in entries:
@@ -540,4 +682,5 @@ def delete_all_debug_frames(profile_name, allow_fallback=False):
             os.remove(path)
             deleted += 1
     storage.delete_debug_entries([entry["id"] for entry in entries])
+    debug_usage.remove(bytes_freed, deleted)
     return deleted, bytes_freed
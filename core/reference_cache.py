@@ -0,0 +1,129 @@
+"""In-memory cache of compiled reference templates for the detector.
+
+Design:
+ - Each reference is decoded once into grayscale plus a Canny edge map and
+   its downscaled pyramid levels. FFT spectra are added lazily per frame size.
+ - Entries are keyed by profile and reference name and validated against the
+   file path, mtime and size, so edits on disk are picked up automatically.
+ - Reference row writes invalidate affected entries through a storage
+   listener registered when this module is imported.
+ - Profiles are kept in LRU order; switching profiles evicts the oldest ones.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from core import storage
+
+CANNY_LOW = 80
+CANNY_HIGH = 160
+MAX_CACHED_PROFILES = 2
+PYRAMID_SCALES = (0.5, 0.25)
+
+
+@dataclass(frozen=True)
+class CompiledReference:
+    name: str
+    path: str
+    mtime_ns: int
+    size: int
+    gray: object
+    edges: object
+    pyramid: dict = field(default_factory=dict)
+    spectra: dict = field(default_factory=dict)
+
+
+def downscale_edges(edges, scale: float):
+    """Downscale an edge map with area averaging so thin edges keep their weight."""
+    import cv2
+
+    height, width = edges.shape[:2]
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return cv2.resize(edges, size, interpolation=cv2.INTER_AREA)
+
+
+def _compile_reference(name: str, path: str, mtime_ns: int, size: int) -> CompiledReference | None:
+    """Decode a reference image and precompute its edge maps."""
+    import cv2
+
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    edges = cv2.Canny(gray, CANNY_LOW, CANNY_HIGH)
+    pyramid = {scale: downscale_edges(edges, scale) for scale in PYRAMID_SCALES}
+    return CompiledReference(name, path, mtime_ns, size, gray, edges, pyramid)
+
+
+class ReferenceCache:
+    """Thread-safe LRU cache of compiled references grouped by profile."""
+
+    def __init__(self, max_profiles: int = MAX_CACHED_PROFILES):
+        self.max_profiles = max(1, int(max_profiles))
+        self._profiles: "OrderedDict[str, dict[str, CompiledReference]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, profile_name: str, name: str, path: str) -> CompiledReference | None:
+        """Return the compiled reference, recompiling when the file changed."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.invalidate(profile_name, name)
+            return None
+
+        with self._lock:
+            entries = self._profiles.get(profile_name)
+            if entries is not None:
+                self._profiles.move_to_end(profile_name)
+                entry = entries.get(name)
+                if (
+                    entry is not None
+                    and entry.path == path
+                    and entry.mtime_ns == stat.st_mtime_ns
+                    and entry.size == stat.st_size
+                ):
+                    self.hits += 1
+                    return entry
+
+        compiled = _compile_reference(name, path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            self.misses += 1
+            if compiled is None:
+                return None
+            entries = self._profiles.setdefault(profile_name, {})
+            self._profiles.move_to_end(profile_name)
+            entries[name] = compiled
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return compiled
+
+    def invalidate(self, profile_name: str | None = None, name: str | None = None) -> None:
+        """Drop one reference, one profile, or (with no arguments) everything."""
+        with self._lock:
+            if profile_name is None:
+                self._profiles.clear()
+                return
+            if name is None:
+                self._profiles.pop(profile_name, None)
+                return
+            entries = self._profiles.get(profile_name)
+            if entries is not None:
+                entries.pop(name, None)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current entry count."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": sum(len(entries) for entries in self._profiles.values()),
+                "profiles": len(self._profiles),
+            }
+
+
+reference_cache = ReferenceCache()
+storage.add_reference_listener(reference_cache.invalidate)
@@ -3,23 +3,80 @@
 Design:
  - SQLite stores metadata only (no image blobs).
  - Filesystem stores actual images in Data/Profiles/... and Data/Debug.
- - Each call opens a short-lived connection (thread-safe, WAL mode).
+ - Schema changes are ordered migrations tracked by PRAGMA user_version.
+ - Each thread keeps one persistent connection (WAL mode, tuned pragmas,
+   statement cache); the schema is initialized once per database file.
+   Worker threads call close_thread_connection() on exit; connections of
+   threads that exited without it are reaped when the next one is opened.
+ - connect() commits when its outermost scope exits; transaction() groups
+   several calls into one atomic write.
+ - Bulk asset helpers use executemany inside one connect() scope, so a batch
+   costs a single profile lookup and a single commit.
+ - Profile records are cached in-process and invalidated by every profile write.
+ - Reference row writes notify listeners registered with
+   add_reference_listener(); higher layers such as the compiled-template
+   cache subscribe instead of being imported here.
 """
 from __future__ import annotations
 
 import contextlib
+import logging
 import os
 import sqlite3
+import threading
+import weakref
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Iterable, Iterator
 
+
 def _db_path() -> Path:
     """Resolve SQLite DB path from environment or default."""
     return Path(os.environ.get("APP_DB_PATH", Path("Data") / "app.db"))
 
 
+def _db_key() -> str:
+    """Return the absolute DB path as a string, used to key per-database state."""
+    return os.path.abspath(os.environ.get("APP_DB_PATH") or os.path.join("Data", "app.db"))
+
+
+_CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-8192",  # KiB
+    "PRAGMA mmap_size=67108864",
+    "PRAGMA temp_store=MEMORY",
+)
+_STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_registry_lock = threading.Lock()
+_open_connections: dict[sqlite3.Connection, weakref.ref] = {}  # connection -> owning thread
+_connection_generation = 0
+_schema_lock = threading.Lock()
+_initialized_paths: set[str] = set()
+_reference_listeners: list = []
+_profile_cache_lock = threading.Lock()
+_profiles_by_name: dict[tuple[str, str], ProfileRecord] = {}
+_profiles_by_id: dict[tuple[str, int], ProfileRecord] = {}
+_profile_cache_generation = 0
+
+
+def add_reference_listener(callback) -> None:
+    """Call callback(profile_name, name) after reference rows change.
+
+    name is None when every reference of the profile may have changed.
+    """
+    if callback not in _reference_listeners:
+        _reference_listeners.append(callback)
+
+
+def _reference_changed(profile_name: str, name: str | None = None) -> None:
+    for callback in list(_reference_listeners):
+        callback(profile_name, name)
+
+
 @dataclass(frozen=True)
 class ProfileRecord:
     id: int
@@ -29,70 +86,331 @@ class ProfileRecord:
     camera_device: str | None
     target_fps: int | None
     detection_threshold: float | None
+    match_engine: str | None = None
+    change_threshold: float | None = None
+    capture_format: str | None = None
 
 
-def init_db() -> None:
-    """Initialize SQLite schema and enable WAL mode."""
-    db_path = _db_path()
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    with connect() as conn:
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.execute("PRAGMA foreign_keys=ON")
-        conn.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS profiles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                created_at TEXT NOT NULL,
-                icon_path TEXT,
-                camera_device TEXT,
-                target_fps INTEGER,
-                detection_threshold REAL
-            );
-            CREATE TABLE IF NOT EXISTS frames (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                profile_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                path TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY(profile_id) REFERENCES profiles(id) ON DELETE CASCADE
-            );
-            CREATE TABLE IF NOT EXISTS reference_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                profile_id INTEGER NOT NULL,
-                frame_name TEXT,
-                name TEXT NOT NULL,
-                path TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY(profile_id) REFERENCES profiles(id) ON DELETE CASCADE
-            );
-            CREATE TABLE IF NOT EXISTS debug_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                profile_id INTEGER,
-                reference_name TEXT,
-                path TEXT NOT NULL,
-                size_bytes INTEGER NOT NULL,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY(profile_id) REFERENCES profiles(id) ON DELETE SET NULL
-            );
-            CREATE TABLE IF NOT EXISTS app_state (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            );
-            """
+@dataclass(frozen=True)
+class ReferenceRegion:
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+    source_width: int | None
+    source_height: int | None
+    search_enabled: bool
+    search_margin: int | None
+
+
+_PRUNE_SCAN_ROWS = 256  # oldest debug rows examined per pruning pass before widening
+
+_PROFILE_MATCH_COLUMNS = {
+    "match_engine": "TEXT",
+    "change_threshold": "REAL",
+}
+
+_REFERENCE_REGION_COLUMNS = {
+    "crop_x0": "INTEGER",
+    "crop_y0": "INTEGER",
+    "crop_x1": "INTEGER",
+    "crop_y1": "INTEGER",
+    "source_width": "INTEGER",
+    "source_height": "INTEGER",
+    "search_region": "INTEGER NOT NULL DEFAULT 0",
+    "search_margin": "INTEGER",
+}
+
+_FRAME_DIMENSION_COLUMNS = {
+    "width": "INTEGER",
+    "height": "INTEGER",
+}
+
+_PROFILE_CAPTURE_COLUMNS = {
+    "capture_format": "TEXT",
+}
+
+
+# =========================
+# Schema migrations
+# =========================
+
+def _add_columns(conn: sqlite3.Connection, table: str, columns: dict[str, str]) -> None:
+    """Add columns that are not present yet (databases from development builds may have some)."""
+    existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for column, decl in columns.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _migrate_base_tables(conn: sqlite3.Connection) -> None:
+    """v1: original layout; IF NOT EXISTS adopts databases created before versioning."""
+    for statement in (
+        """
+        CREATE TABLE IF NOT EXISTS profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            created_at TEXT NOT NULL,
+            icon_path TEXT,
+            camera_device TEXT,
+            target_fps INTEGER,
+            detection_threshold REAL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS frames (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            profile_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            path TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(profile_id) REFERENCES profiles(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS reference_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            profile_id INTEGER NOT NULL,
+            frame_name TEXT,
+            name TEXT NOT NULL,
+            path TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(profile_id) REFERENCES profiles(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS debug_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            profile_id INTEGER,
+            reference_name TEXT,
+            path TEXT NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(profile_id) REFERENCES profiles(id) ON DELETE SET NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS app_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        """,
+    ):
+        conn.execute(statement)
+
+
+def _migrate_profile_match_settings(conn: sqlite3.Connection) -> None:
+    """v2: per-profile matching engine and frame-change threshold."""
+    _add_columns(conn, "profiles", _PROFILE_MATCH_COLUMNS)
+
+
+def _migrate_reference_regions(conn: sqlite3.Connection) -> None:
+    """v3: stored crop coordinates and optional static search regions."""
+    _add_columns(conn, "reference_entries", _REFERENCE_REGION_COLUMNS)
+
+
+def _migrate_debug_indexes(conn: sqlite3.Connection) -> None:
+    """v4: covering index for pruning and a profile index for listing."""
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_debug_entries_created_at"
+        " ON debug_entries(created_at, id, size_bytes)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_debug_entries_profile_id ON debug_entries(profile_id)"
+    )
+
+
+def _migrate_asset_indexes(conn: sqlite3.Connection) -> None:
+    """v5: unique (profile_id, name) for frames/references plus LOWER(name) listing indexes.
+
+    Duplicate rows left by earlier repeated asset migrations are collapsed to
+    the newest row before the unique index is created.
+    """
+    for table in ("frames", "reference_entries"):
+        conn.execute(
+            f"DELETE FROM {table} WHERE id NOT IN"
+            f" (SELECT MAX(id) FROM {table} GROUP BY profile_id, name)"
+        )
+        conn.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_profile_name ON {table}(profile_id, name)"
+        )
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_profile_lower_name"
+            f" ON {table}(profile_id, LOWER(name))"
+        )
+
+
+def _migrate_frame_dimensions(conn: sqlite3.Connection) -> None:
+    """v6: stored frame width/height (NULL until probed for legacy rows)."""
+    _add_columns(conn, "frames", _FRAME_DIMENSION_COLUMNS)
+
+
+def _migrate_profile_capture_format(conn: sqlite3.Connection) -> None:
+    """v7: per-profile capture pixel format (NULL means full colour)."""
+    _add_columns(conn, "profiles", _PROFILE_CAPTURE_COLUMNS)
+
+
+# Ordered steps; a step's version is its position (1-based). Append only.
+_MIGRATIONS = (
+    _migrate_base_tables,
+    _migrate_profile_match_settings,
+    _migrate_reference_regions,
+    _migrate_debug_indexes,
+    _migrate_asset_indexes,
+    _migrate_frame_dimensions,
+    _migrate_profile_capture_format,
+)
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+def schema_version() -> int:
+    """Return the PRAGMA user_version of the current database."""
+    with connect() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _apply_migrations(conn: sqlite3.Connection) -> None:
+    """Run each pending migration in its own transaction and bump user_version."""
+    for version, step in enumerate(_MIGRATIONS, start=1):
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock in case another process migrated first.
+            if conn.execute("PRAGMA user_version").fetchone()[0] < version:
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        logging.info("Database schema migrated to version %d (%s)", version, step.__name__)
+
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    if current > SCHEMA_VERSION:
+        logging.warning(
+            "Database schema version %d is newer than supported version %d", current, SCHEMA_VERSION
         )
 
 
+def init_db() -> None:
+    """Enable WAL mode and apply pending schema migrations (once per database file)."""
+    db_path = _db_key()
+    if db_path in _initialized_paths and os.path.exists(db_path):
+        return
+    with _schema_lock:
+        if db_path in _initialized_paths and os.path.exists(db_path):
+            return
+        with connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            _apply_migrations(conn)
+        _initialized_paths.add(db_path)
+
+
+def _thread_connection() -> sqlite3.Connection:
+    """Return this thread's connection, reopening it when the DB path changed."""
+    db_path = _db_key()
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == db_path and _local.generation == _connection_generation:
+        return conn
+    if conn is not None:
+        _close(conn)
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(
+        db_path,
+        timeout=10,
+        check_same_thread=False,
+        cached_statements=_STATEMENT_CACHE_SIZE,
+    )
+    conn.row_factory = sqlite3.Row
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    with _registry_lock:
+        orphaned = [
+            other for other, owner in _open_connections.items()
+            if owner() is None or not owner().is_alive()
+        ]
+        for other in orphaned:
+            del _open_connections[other]
+        _open_connections[conn] = weakref.ref(threading.current_thread())
+        _local.generation = _connection_generation
+    for other in orphaned:
+        try:
+            other.close()
+        except sqlite3.Error:
+            pass
+    _local.conn = conn
+    _local.path = db_path
+    _local.depth = 0
+    return conn
+
+
+def _close(conn: sqlite3.Connection) -> None:
+    with _registry_lock:
+        _open_connections.pop(conn, None)
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def close_thread_connection() -> None:
+    """Close the calling thread's connection; worker threads call this when they exit."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _close(conn)
+    _local.conn = None
+
+
+def close_connections() -> None:
+    """Close every thread's connection; each thread reopens lazily on next use.
+
+    Stop and join the background workers first: a connection closed under a
+    running worker fails its in-flight statement.
+    """
+    global _connection_generation
+    with _registry_lock:
+        connections = list(_open_connections)
+        _open_connections.clear()
+        _connection_generation += 1
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _local.conn = None
+    invalidate_profile_cache()
+
+
 @contextlib.contextmanager
 def connect() -> Iterator[sqlite3.Connection]:
-    """Yield a short-lived SQLite connection (thread-safe)."""
-    conn = sqlite3.connect(_db_path(), timeout=10, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+    """Yield this thread's persistent connection; commits when the outermost scope exits."""
+    conn = _thread_connection()
+    _local.depth += 1
     try:
         yield conn
+    except BaseException:
+        _local.depth -= 1
+        if _local.depth == 0 and conn.in_transaction:
+            conn.rollback()
+        raise
+    _local.depth -= 1
+    if _local.depth == 0 and conn.in_transaction:
         conn.commit()
+
+
+@contextlib.contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """Run nested storage calls as one atomic write (BEGIN IMMEDIATE on the outermost scope)."""
+    init_db()
+    try:
+        with connect() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
     finally:
-        conn.close()
+        # Profile reads inside the scope may have seen uncommitted or rolled back rows.
+        invalidate_profile_cache()
 
 
 def _now() -> str:
@@ -108,17 +426,53 @@ def list_profiles() -> list[str]:
     return [row["name"] for row in rows]
 
 
-def get_profile(name: str) -> ProfileRecord | None:
-    """Return profile record by name."""
+def invalidate_profile_cache(name: str | None = None) -> None:
+    """Drop one cached profile record (all databases) or the whole cache."""
+    global _profile_cache_generation
+    with _profile_cache_lock:
+        _profile_cache_generation += 1
+        if name is None:
+            _profiles_by_name.clear()
+            _profiles_by_id.clear()
+            return
+        for key in [key for key in _profiles_by_name if key[1] == name]:
+            record = _profiles_by_name.pop(key)
+            _profiles_by_id.pop((key[0], record.id), None)
+
+
+def _fetch_profile(column: str, value: object) -> ProfileRecord | None:
+    """Return a profile record from the cache, loading and caching it on a miss."""
+    db_path = _db_key()
+    cache = _profiles_by_name if column == "name" else _profiles_by_id
+    with _profile_cache_lock:
+        record = cache.get((db_path, value))
+        generation = _profile_cache_generation
+    if record is not None:
+        return record
     init_db()
     with connect() as conn:
-        row = conn.execute(
-            "SELECT * FROM profiles WHERE name = ?",
-            (name,),
-        ).fetchone()
+        row = conn.execute(f"SELECT * FROM profiles WHERE {column} = ?", (value,)).fetchone()
+        cacheable = not conn.in_transaction
     if not row:
         return None
-    return ProfileRecord(**dict(row))
+    record = ProfileRecord(**dict(row))
+    if cacheable:
+        with _profile_cache_lock:
+            # A write since the read started may have made this row stale.
+            if generation == _profile_cache_generation:
+                _profiles_by_name[(db_path, record.name)] = record
+                _profiles_by_id[(db_path, record.id)] = record
+    return record
+
+
+def get_profile(name: str) -> ProfileRecord | None:
+    """Return profile record by name."""
+    return _fetch_profile("name", name)
+
+
+def get_profile_by_id(profile_id: int) -> ProfileRecord | None:
+    """Return profile record by id."""
+    return _fetch_profile("id", profile_id)
 
 
 def create_profile(name: str) -> None:
@@ -129,6 +483,7 @@ def create_profile(name: str) -> None:
             "INSERT INTO profiles (name, created_at) VALUES (?, ?)",
             (name, _now()),
         )
+    invalidate_profile_cache(name)
 
 
 def delete_profile(name: str) -> None:
@@ -136,6 +491,8 @@ def delete_profile(name: str) -> None:
     init_db()
     with connect() as conn:
         conn.execute("DELETE FROM profiles WHERE name = ?", (name,))
+    invalidate_profile_cache(name)
+    _reference_changed(name)
 
 
 def update_profile_fields(
@@ -145,6 +502,9 @@ def update_profile_fields(
     camera_device: str | None = None,
     target_fps: int | None = None,
     detection_threshold: float | None = None,
+    match_engine: str | None = None,
+    change_threshold: float | None = None,
+    capture_format: str | None = None,
 ) -> None:
     """Update mutable fields on a profile record."""
     init_db()
@@ -162,6 +522,15 @@ def update_profile_fields(
     if detection_threshold is not None:
         updates.append("detection_threshold = ?")
         values.append(detection_threshold)
+    if match_engine is not None:
+        updates.append("match_engine = ?")
+        values.append(match_engine)
+    if change_threshold is not None:
+        updates.append("change_threshold = ?")
+        values.append(change_threshold)
+    if capture_format is not None:
+        updates.append("capture_format = ?")
+        values.append(capture_format)
     if not updates:
         return
     values.append(name)
@@ -170,18 +539,18 @@ def update_profile_fields(
             f"UPDATE profiles SET {', '.join(updates)} WHERE name = ?",
             values,
         )
+    invalidate_profile_cache(name)
 
 
-def add_frame(profile_name: str, name: str, path: str) -> None:
-    """Insert frame metadata for a profile."""
-    profile = get_profile(profile_name)
-    if not profile:
-        return
-    with connect() as conn:
-        conn.execute(
-            "INSERT INTO frames (profile_id, name, path, created_at) VALUES (?, ?, ?, ?)",
-            (profile.id, name, path, _now()),
-        )
+def add_frame(
+    profile_name: str, name: str, path: str, size: tuple[int, int] | None = None
+) -> None:
+    """Insert frame metadata for a profile, or update the path of an existing name.
+
+    size is the (width, height) of the image when known; without one an
+    existing row keeps its stored size.
+    """
+    add_frames_bulk(profile_name, [(name, path, *(size or (None, None)))])
 
 
 def list_frames(profile_name: str) -> list[str]:
@@ -210,6 +579,18 @@ def list_frame_entries(profile_name: str) -> list[sqlite3.Row]:
     return rows
 
 
+def list_frame_entries_page(profile_name: str, after_id: int, limit: int) -> list[sqlite3.Row]:
+    """List up to limit frame rows (id, name, path) with id > after_id, in id order."""
+    profile = get_profile(profile_name)
+    if not profile:
+        return []
+    with connect() as conn:
+        return conn.execute(
+            "SELECT id, name, path FROM frames WHERE profile_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (profile.id, after_id, limit),
+        ).fetchall()
+
+
 def update_frame_path(profile_name: str, name: str, path: str) -> None:
     """Update the stored path for a frame."""
     profile = get_profile(profile_name)
@@ -234,16 +615,109 @@ def delete_frame(profile_name: str, name: str) -> None:
         )
 
 
-def add_reference(profile_name: str, name: str, path: str, frame_name: str | None) -> None:
-    """Insert reference metadata for a profile."""
+def add_frames_bulk(profile_name: str, entries: Iterable[tuple]) -> int:
+    """Upsert frame rows in one transaction. Returns the number of rows written.
+
+    Entries are (name, path) or (name, path, width, height) tuples. An entry
+    without a size keeps the size already stored for that name.
+    """
+    profile = get_profile(profile_name)
+    if not profile:
+        return 0
+    now = _now()
+    rows = []
+    for entry in entries:
+        width, height = entry[2:4] if len(entry) >= 4 else (None, None)
+        rows.append((profile.id, entry[0], entry[1], width, height, now))
+    if not rows:
+        return 0
+    with connect() as conn:
+        conn.executemany(
+            "INSERT INTO frames (profile_id, name, path, width, height, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(profile_id, name) DO UPDATE SET"
+            " path = excluded.path,"
+            " width = COALESCE(excluded.width, frames.width),"
+            " height = COALESCE(excluded.height, frames.height)",
+            rows,
+        )
+    return len(rows)
+
+
+def list_frame_sizes(profile_name: str) -> list[sqlite3.Row]:
+    """List frame rows (name, path, width, height) ordered by name; sizes may be NULL."""
+    profile = get_profile(profile_name)
+    if not profile:
+        return []
+    with connect() as conn:
+        return conn.execute(
+            "SELECT name, path, width, height FROM frames WHERE profile_id = ? ORDER BY LOWER(name)",
+            (profile.id,),
+        ).fetchall()
+
+
+def set_frame_size(profile_name: str, name: str, width: int, height: int) -> None:
+    """Store probed dimensions for an existing frame row."""
+    profile = get_profile(profile_name)
+    if not profile:
+        return
+    with connect() as conn:
+        conn.execute(
+            "UPDATE frames SET width = ?, height = ? WHERE profile_id = ? AND name = ?",
+            (width, height, profile.id, name),
+        )
+
+
+def delete_frames_bulk(profile_name: str, names: Iterable[str]) -> int:
+    """Delete frame rows by name in one transaction. Returns the number of names given."""
+    profile = get_profile(profile_name)
+    if not profile:
+        return 0
+    rows = [(profile.id, name) for name in names]
+    if not rows:
+        return 0
+    with connect() as conn:
+        conn.executemany("DELETE FROM frames WHERE profile_id = ? AND name = ?", rows)
+    return len(rows)
+
+
+def add_reference(
+    profile_name: str,
+    name: str,
+    path: str,
+    frame_name: str | None,
+    crop: tuple[int, int, int, int] | None = None,
+    source_size: tuple[int, int] | None = None,
+) -> None:
+    """Insert reference metadata for a profile, or update an existing name.
+
+    crop is the (x0, y0, x1, y1) of the reference within its source frame and
+    source_size the (width, height) of that frame, when known. On conflict the
+    path is replaced while unknown (None) fields keep their stored values.
+    """
     profile = get_profile(profile_name)
     if not profile:
         return
+    x0, y0, x1, y1 = crop if crop else (None, None, None, None)
+    source_width, source_height = source_size if source_size else (None, None)
     with connect() as conn:
         conn.execute(
-            "INSERT INTO reference_entries (profile_id, frame_name, name, path, created_at) VALUES (?, ?, ?, ?, ?)",
-            (profile.id, frame_name, name, path, _now()),
+            "INSERT INTO reference_entries"
+            " (profile_id, frame_name, name, path, created_at,"
+            " crop_x0, crop_y0, crop_x1, crop_y1, source_width, source_height)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(profile_id, name) DO UPDATE SET"
+            " path = excluded.path,"
+            " frame_name = COALESCE(excluded.frame_name, frame_name),"
+            " crop_x0 = COALESCE(excluded.crop_x0, crop_x0),"
+            " crop_y0 = COALESCE(excluded.crop_y0, crop_y0),"
+            " crop_x1 = COALESCE(excluded.crop_x1, crop_x1),"
+            " crop_y1 = COALESCE(excluded.crop_y1, crop_y1),"
+            " source_width = COALESCE(excluded.source_width, source_width),"
+            " source_height = COALESCE(excluded.source_height, source_height)",
+            (profile.id, frame_name, name, path, _now(), x0, y0, x1, y1, source_width, source_height),
         )
+    _reference_changed(profile_name, name)
 
 
 def list_references(profile_name: str) -> list[str]:
@@ -272,6 +746,18 @@ def list_reference_entries(profile_name: str) -> list[sqlite3.Row]:
     return rows
 
 
+def list_reference_entries_page(profile_name: str, after_id: int, limit: int) -> list[sqlite3.Row]:
+    """List up to limit reference rows (id, name, path) with id > after_id, in id order."""
+    profile = get_profile(profile_name)
+    if not profile:
+        return []
+    with connect() as conn:
+        return conn.execute(
+            "SELECT id, name, path FROM reference_entries WHERE profile_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (profile.id, after_id, limit),
+        ).fetchall()
+
+
 def update_reference_path(profile_name: str, name: str, path: str) -> None:
     """Update the stored path for a reference."""
     profile = get_profile(profile_name)
@@ -282,6 +768,7 @@ def update_reference_path(profile_name: str, name: str, path: str) -> None:
             "UPDATE reference_entries SET path = ? WHERE profile_id = ? AND name = ?",
             (path, profile.id, name),
         )
+    _reference_changed(profile_name, name)
 
 
 def delete_reference(profile_name: str, name: str) -> None:
@@ -294,6 +781,118 @@ def delete_reference(profile_name: str, name: str) -> None:
             "DELETE FROM reference_entries WHERE profile_id = ? AND name = ?",
             (profile.id, name),
         )
+    _reference_changed(profile_name, name)
+
+
+def add_references_bulk(
+    profile_name: str, entries: Iterable[tuple[str, str, str | None]]
+) -> int:
+    """Upsert (name, path, frame_name) reference rows in one transaction.
+
+    Matches add_reference without crop data: on conflict the path is replaced
+    and a None frame_name keeps the stored value. Returns the number of rows written.
+    """
+    profile = get_profile(profile_name)
+    if not profile:
+        return 0
+    now = _now()
+    rows = [(profile.id, frame_name, name, path, now) for name, path, frame_name in entries]
+    if not rows:
+        return 0
+    with connect() as conn:
+        conn.executemany(
+            "INSERT INTO reference_entries (profile_id, frame_name, name, path, created_at)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(profile_id, name) DO UPDATE SET"
+            " path = excluded.path,"
+            " frame_name = COALESCE(excluded.frame_name, frame_name)",
+            rows,
+        )
+    for row in rows:
+        _reference_changed(profile_name, row[2])
+    return len(rows)
+
+
+def delete_references_bulk(profile_name: str, names: Iterable[str]) -> int:
+    """Delete reference rows by name in one transaction. Returns the number of names given."""
+    profile = get_profile(profile_name)
+    if not profile:
+        return 0
+    name_list = list(names)
+    if not name_list:
+        return 0
+    with connect() as conn:
+        conn.executemany(
+            "DELETE FROM reference_entries WHERE profile_id = ? AND name = ?",
+            [(profile.id, name) for name in name_list],
+        )
+    for name in name_list:
+        _reference_changed(profile_name, name)
+    return len(name_list)
+
+
+def get_reference_region(profile_name: str, name: str) -> ReferenceRegion | None:
+    """Return stored crop coordinates and search settings for a reference."""
+    profile = get_profile(profile_name)
+    if not profile:
+        return None
+    with connect() as conn:
+        row = conn.execute(
+            "SELECT crop_x0, crop_y0, crop_x1, crop_y1, source_width, source_height,"
+            " search_region, search_margin"
+            " FROM reference_entries WHERE profile_id = ? AND name = ?",
+            (profile.id, name),
+        ).fetchone()
+    return _row_to_region(row)
+
+
+def list_reference_regions(profile_name: str) -> dict[str, ReferenceRegion]:
+    """Return reference regions keyed by name for references with stored crops."""
+    profile = get_profile(profile_name)
+    if not profile:
+        return {}
+    with connect() as conn:
+        rows = conn.execute(
+            "SELECT name, crop_x0, crop_y0, crop_x1, crop_y1, source_width, source_height,"
+            " search_region, search_margin"
+            " FROM reference_entries WHERE profile_id = ? AND crop_x0 IS NOT NULL",
+            (profile.id,),
+        ).fetchall()
+    return {row["name"]: _row_to_region(row) for row in rows}
+
+
+def _row_to_region(row: sqlite3.Row | None) -> ReferenceRegion | None:
+    """Build a ReferenceRegion from a row, or None when no crop is stored."""
+    if not row or row["crop_x0"] is None:
+        return None
+    return ReferenceRegion(
+        x0=row["crop_x0"],
+        y0=row["crop_y0"],
+        x1=row["crop_x1"],
+        y1=row["crop_y1"],
+        source_width=row["source_width"],
+        source_height=row["source_height"],
+        search_enabled=bool(row["search_region"]),
+        search_margin=row["search_margin"],
+    )
+
+
+def set_reference_search_region(
+    profile_name: str,
+    name: str,
+    enabled: bool,
+    margin: int | None = None,
+) -> None:
+    """Enable or disable region-restricted matching for a reference."""
+    profile = get_profile(profile_name)
+    if not profile:
+        return
+    with connect() as conn:
+        conn.execute(
+            "UPDATE reference_entries SET search_region = ?, search_margin = COALESCE(?, search_margin)"
+            " WHERE profile_id = ? AND name = ?",
+            (int(bool(enabled)), margin, profile.id, name),
+        )
 
 
 def get_reference_parent_frame(profile_name: str, ref_name: str) -> str | None:
@@ -359,20 +958,83 @@ def delete_debug_entries(ids: Iterable[int]) -> None:
         )
 
 
+def _debug_path_forms(path: str) -> set[str]:
+    """Return the spellings a debug row may store for path.
+
+    Rows written before debug paths were absolute hold them relative to the
+    working directory, with either separator.
+    """
+    absolute = os.path.abspath(path)
+    forms = {path, absolute}
+    try:
+        relative = os.path.relpath(absolute)
+    except ValueError:  # different drive on Windows
+        return forms
+    forms.update((relative, relative.replace("\\", "/"), relative.replace("/", "\\")))
+    return forms
+
+
+def delete_debug_entries_by_paths(paths: Iterable[str]) -> int:
+    """Delete debug metadata rows by file path, matching legacy relative rows too.
+
+    Returns the number of rows removed.
+    """
+    rows = [(form,) for path in paths for form in _debug_path_forms(path)]
+    if not rows:
+        return 0
+    with connect() as conn:
+        before = conn.total_changes
+        conn.executemany("DELETE FROM debug_entries WHERE path = ?", rows)
+        return conn.total_changes - before
+
+
 def prune_debug_entries(max_bytes: int, max_count: int) -> list[str]:
-    """Evict oldest debug entries to enforce size/count bounds. Returns removed file paths."""
-    removed_paths: list[str] = []
+    """Evict oldest debug entries to enforce size/count bounds. Returns removed file paths, oldest first.
+
+    Totals come from the covering created_at index. When a bound is exceeded,
+    a running-sum window over the oldest rows finds the cutoff (widening the
+    scan only if needed) and one range delete removes everything before it.
+    Only debug rows are touched, so this opens its own write transaction
+    instead of transaction(), which would flush the profile cache.
+    """
+    init_db()
     with connect() as conn:
-        rows = conn.execute(
-            "SELECT id, path, size_bytes FROM debug_entries ORDER BY created_at ASC"
-        ).fetchall()
-        total_bytes = sum(row["size_bytes"] for row in rows)
-        while rows and (total_bytes > max_bytes or len(rows) > max_count):
-            row = rows.pop(0)
-            removed_paths.append(row["path"])
-            total_bytes -= row["size_bytes"]
-            conn.execute("DELETE FROM debug_entries WHERE id = ?", (row["id"],))
-    return removed_paths
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        total_count, total_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM debug_entries"
+        ).fetchone()
+        excess_count = max(0, total_count - max_count)
+        excess_bytes = max(0, total_bytes - max_bytes)
+        if not excess_count and not excess_bytes:
+            return []
+        limit = max(_PRUNE_SCAN_ROWS, excess_count)
+        while True:
+            rows = conn.execute(
+                """
+                SELECT id, path, created_at FROM (
+                    SELECT id, path, created_at,
+                           COUNT(*) OVER oldest AS position,
+                           SUM(size_bytes) OVER oldest - size_bytes AS bytes_before
+                    FROM (
+                        SELECT id, path, created_at, size_bytes FROM debug_entries
+                        ORDER BY created_at, id LIMIT ?
+                    )
+                    WINDOW oldest AS (ORDER BY created_at, id ROWS UNBOUNDED PRECEDING)
+                )
+                WHERE position <= ? OR bytes_before < ?
+                """,
+                (limit, excess_count, excess_bytes),
+            ).fetchall()
+            if len(rows) < limit or limit >= total_count:
+                break
+            limit *= 4
+        cutoff = rows[-1]
+        conn.execute(
+            "DELETE FROM debug_entries WHERE created_at < ? OR (created_at = ? AND id <= ?)",
+            (cutoff["created_at"], cutoff["created_at"], cutoff["id"]),
+        )
+    return [row["path"] for row in rows]
 
 
 def set_app_state(key: str, value: str | None) -> None:
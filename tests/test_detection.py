@@ -3,6 +3,7 @@ import os
 import subprocess
 import sys
 import tempfile
+import time
 import unittest
 from pathlib import Path
 
@@ -26,6 +27,33 @@ def _module_importable(module: str) -> bool:
 CV2_AVAILABLE = _module_importable("cv2")
 
 
+def _square_pattern(hollow: bool = False) -> np.ndarray:
+    """Return a 16x16 reference with a white square, optionally with a dark centre."""
+    pattern = np.zeros((16, 16), dtype=np.uint8)
+    pattern[4:12, 4:12] = 255
+    if hollow:
+        pattern[6:10, 6:10] = 0
+    return pattern
+
+
+def _add_reference(profile_name, pattern, name="ref_1.png", frame_name=None, **fields) -> Path:
+    """Write pattern into the profile's references folder and index it."""
+    import cv2
+
+    ref_path = Path(profiles.get_profile_dirs(profile_name)["references"]) / name
+    cv2.imwrite(str(ref_path), pattern)
+    storage.add_reference(profile_name, name, str(ref_path), frame_name, **fields)
+    return ref_path
+
+
+def _profile_with_reference(profile_name, pattern, threshold=0.5, **reference) -> Path:
+    """Create a profile with one reference; threshold=None keeps the default."""
+    profiles.create_profile(profile_name)
+    if threshold is not None:
+        profiles.update_profile_detection_threshold(profile_name, threshold)
+    return _add_reference(profile_name, pattern, **reference)
+
+
 @unittest.skipUnless(CV2_AVAILABLE, "cv2 unavailable in test environment")
 class DetectionTests(unittest.TestCase):
     """Validate deterministic detection behavior."""
@@ -38,6 +66,9 @@ class DetectionTests(unittest.TestCase):
         os.environ["APP_DB_PATH"] = str(Path(self.temp_dir.name) / "Data" / "app.db")
 
     def tearDown(self):
+        from core.debug_writer import debug_writer
+        debug_writer.flush(timeout=5)
+        storage.close_connections()
         os.chdir(self.original_cwd)
         os.environ.pop("APP_DB_PATH", None)
 
@@ -45,23 +76,343 @@ class DetectionTests(unittest.TestCase):
         """Same input yields same confidence and match result."""
         import cv2
         from core import detector
-        profiles.create_profile("Delta")
-        profiles.update_profile_detection_threshold("Delta", 0.5)
-        dirs = profiles.get_profile_dirs("Delta")
-
         frame = np.zeros((64, 64, 3), dtype=np.uint8)
         frame[16:32, 16:32] = 255
-        frame_path = Path(dirs["frames"]) / "frame.png"
+        _profile_with_reference("Delta", frame[16:32, 16:32], frame_name="frame.png")
+        frame_path = Path(profiles.get_profile_dirs("Delta")["frames"]) / "frame.png"
         cv2.imwrite(str(frame_path), frame)
         storage.add_frame("Delta", frame_path.name, str(frame_path))
 
-        ref = frame[16:32, 16:32].copy()
-        ref_path = Path(dirs["references"]) / "ref_1.png"
-        cv2.imwrite(str(ref_path), ref)
-        storage.add_reference("Delta", ref_path.name, str(ref_path), "frame.png")
-
         state = detector.new_detector_state()
         result1 = detector.evaluate_frame("Delta", frame, state, selected_reference="ref_1.png")
         result2 = detector.evaluate_frame("Delta", frame, state, selected_reference="ref_1.png")
         self.assertEqual(result1.matched, result2.matched)
         self.assertAlmostEqual(result1.confidence, result2.confidence, places=6)
+
+    def test_reference_cache_reuses_compiled_templates(self):
+        """Repeated evaluations hit the compiled reference cache until invalidated."""
+        from core import detector
+        from core.reference_cache import reference_cache
+        reference_cache.invalidate()
+        frame = np.zeros((64, 64, 3), dtype=np.uint8)
+        frame[16:32, 16:32] = 255
+        _profile_with_reference("Echo", frame[16:32, 16:32], threshold=None)
+
+        state = detector.new_detector_state()
+        before = reference_cache.stats()
+        detector.evaluate_frame("Echo", frame, state, selected_reference="ref_1.png")
+        detector.evaluate_frame("Echo", frame, state, selected_reference="ref_1.png")
+        after = reference_cache.stats()
+        self.assertEqual(after["misses"] - before["misses"], 1)
+        self.assertEqual(after["hits"] - before["hits"], 1)
+
+        storage.delete_reference("Echo", "ref_1.png")
+        self.assertEqual(reference_cache.stats()["entries"], 0)
+
+    def test_reference_cache_evicts_least_recent_profile(self):
+        """Switching across more profiles than the cache holds evicts the oldest."""
+        import cv2
+        from core.reference_cache import ReferenceCache
+        cache = ReferenceCache(max_profiles=1)
+        ref_path = Path("ref.png")
+        cv2.imwrite(str(ref_path), np.full((8, 8), 255, dtype=np.uint8))
+        cache.get("One", "ref.png", str(ref_path))
+        cache.get("Two", "ref.png", str(ref_path))
+        self.assertEqual(cache.stats()["profiles"], 1)
+        cache.get("One", "ref.png", str(ref_path))
+        self.assertEqual(cache.stats()["misses"], 3)
+
+    def test_detection_context_avoids_per_frame_lookups(self):
+        """A prebuilt context skips SQLite and directory lookups during evaluation."""
+        from unittest import mock
+        from core import detector
+        frame = np.zeros((64, 64, 3), dtype=np.uint8)
+        frame[16:32, 16:32] = 255
+        _profile_with_reference("Foxtrot", frame[16:32, 16:32])
+
+        context = detector.build_detection_context("Foxtrot", "ref_1.png")
+        self.assertEqual(context.threshold, 0.5)
+        self.assertIn("ref_1.png", context.references)
+
+        state = detector.new_detector_state()
+        state.event_active = True
+        with mock.patch.object(detector, "get_profile_dirs") as dirs_mock, \
+                mock.patch.object(detector, "get_detection_threshold") as threshold_mock:
+            result = detector.evaluate_frame("Foxtrot", frame, state, context=context)
+        dirs_mock.assert_not_called()
+        threshold_mock.assert_not_called()
+        self.assertTrue(result.matched)
+        self.assertEqual(result.reference, "ref_1.png")
+
+    def test_tracking_window_follows_last_match(self):
+        """Tracked searches reuse the last bbox and fall back to a full search on a miss."""
+        from core import detector
+        pattern = _square_pattern(hollow=True)
+        _profile_with_reference("Golf", pattern)
+        profiles.update_profile_change_threshold("Golf", 0)
+
+        frame = np.zeros((240, 320), dtype=np.uint8)
+        frame[40:56, 40:56] = pattern
+        moved = np.zeros_like(frame)
+        moved[180:196, 260:276] = pattern
+
+        context = detector.build_detection_context("Golf", "ref_1.png")
+        state = detector.new_detector_state()
+        state.event_active = True
+        first = detector.evaluate_frame("Golf", frame, state, context=context)
+        second = detector.evaluate_frame("Golf", frame, state, context=context)
+        self.assertTrue(first.matched and second.matched)
+        self.assertEqual(first.bbox, second.bbox)
+        self.assertEqual(state.tracked_searches, 1)
+        self.assertEqual(state.full_searches, 1)
+
+        third = detector.evaluate_frame("Golf", moved, state, context=context)
+        self.assertTrue(third.matched)
+        self.assertEqual(state.tracked_searches, 2)
+        self.assertEqual(state.full_searches, 2)
+        self.assertEqual(third.bbox[:2], (256, 176))
+
+    def test_search_region_limits_matching_to_crop_area(self):
+        """References with an enabled search region only match inside that region."""
+        from core import detector
+        pattern = _square_pattern()
+        _profile_with_reference("Hotel", pattern, crop=(40, 40, 56, 56), source_size=(320, 240))
+        profiles.set_reference_search_region("Hotel", "ref_1.png", True, margin=8)
+
+        inside = np.zeros((240, 320), dtype=np.uint8)
+        inside[40:56, 40:56] = pattern
+        outside = np.zeros_like(inside)
+        outside[180:196, 260:276] = pattern
+
+        context = detector.build_detection_context("Hotel", "ref_1.png")
+        self.assertIn("ref_1.png", context.regions)
+        state = detector.new_detector_state()
+        state.event_active = True
+        self.assertTrue(detector.evaluate_frame("Hotel", inside, state, context=context).matched)
+        state = detector.new_detector_state()
+        state.event_active = True
+        self.assertFalse(detector.evaluate_frame("Hotel", outside, state, context=context).matched)
+
+    def test_search_region_follows_cropped_capture(self):
+        """Regions are shifted into a cropped capture and skipped when cropped away."""
+        from dataclasses import replace
+        from core import detector
+        pattern = _square_pattern()
+        _profile_with_reference("India", pattern, crop=(140, 100, 156, 116), source_size=(320, 240))
+        profiles.set_reference_search_region("India", "ref_1.png", True, margin=8)
+
+        cropped = np.zeros((80, 100), dtype=np.uint8)  # camera pixels (100, 60)-(200, 140)
+        cropped[40:56, 40:56] = pattern
+        context = replace(
+            detector.build_detection_context("India", "ref_1.png"),
+            frame_origin=(100, 60), source_size=(320, 240),
+        )
+        state = detector.new_detector_state()
+        state.event_active = True
+        result = detector.evaluate_frame("India", cropped, state, context=context)
+        self.assertTrue(result.matched)
+        self.assertEqual(result.bbox[:2], (140, 100))  # reported in camera pixels
+        self.assertEqual(state.track_bbox[:2], (40, 40))  # tracked in capture pixels
+        self.assertEqual(detector.capture_roi(context, (320, 240)), (100, 60, 96, 96))
+
+        elsewhere = replace(context, frame_origin=(0, 0), source_size=(320, 240))
+        state = detector.new_detector_state()
+        self.assertFalse(detector.evaluate_frame("India", cropped, state, context=elsewhere).matched)
+        unrestricted = replace(context, regions={})
+        self.assertIsNone(detector.capture_roi(unrestricted, (320, 240)))
+
+    def test_pyramid_engine_agrees_with_exhaustive(self):
+        """Pyramid matching agrees with exhaustive search on matches and near the threshold."""
+        import cv2
+        from dataclasses import replace
+        from core import detector
+        template = np.zeros((64, 128), dtype=np.uint8)
+        cv2.rectangle(template, (3, 3), (124, 60), 255, 2)
+        cv2.putText(template, "HELLO", (12, 44), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 255, 2)
+        _profile_with_reference("India", template)
+
+        frame = np.zeros((360, 640), dtype=np.uint8)
+        frame[200:264, 300:428] = template
+
+        exhaustive = detector.build_detection_context("India", "ref_1.png")
+        self.assertEqual(exhaustive.engine, profiles.MATCH_ENGINE_EXHAUSTIVE)
+        self.assertTrue(profiles.update_profile_match_engine("India", profiles.MATCH_ENGINE_PYRAMID))
+        pyramid = detector.build_detection_context("India", "ref_1.png")
+        self.assertEqual(pyramid.engine, profiles.MATCH_ENGINE_PYRAMID)
+
+        ref_a, bbox_a, score_a = detector._find_best_match(exhaustive, frame)
+        ref_b, bbox_b, score_b = detector._find_best_match(pyramid, frame)
+        self.assertEqual(ref_a, "ref_1.png")
+        self.assertEqual((ref_a, bbox_a), (ref_b, bbox_b))
+        self.assertAlmostEqual(score_a, score_b, places=5)
+
+        # Far below the threshold the coarse peaks may miss the best position, so the
+        # score is a lower bound; near it the exhaustive search confirms the decision.
+        rng = np.random.default_rng(3)
+        for _ in range(5):
+            noise = cv2.GaussianBlur(rng.integers(0, 255, (360, 640), dtype=np.uint8), (5, 5), 0)
+            _, _, score_a = detector._find_best_match(exhaustive, noise)
+            ref_b, _, score_b = detector._find_best_match(pyramid, noise)
+            self.assertIsNone(ref_b)
+            self.assertLessEqual(score_b, score_a + 1e-5)
+            near = replace(pyramid, threshold=score_a + detector.PYRAMID_CONFIRM_MARGIN / 2)
+            _, _, score_c = detector._find_best_match(near, noise)
+            self.assertAlmostEqual(score_a, score_c, places=5)
+
+    def test_fft_engine_agrees_with_exhaustive_across_references(self):
+        """FFT correlation finds the same best reference, bbox and score in all-references mode."""
+        import cv2
+        from core import detector
+        rng = np.random.default_rng(3)
+        frame = cv2.GaussianBlur(rng.integers(0, 255, (180, 320), dtype=np.uint8), (5, 5), 0)
+        _profile_with_reference("Juliet", frame[20:60, 30:90], name="ref_0.png")
+        for i, (y, x, h, w) in enumerate([(100, 200, 50, 80), (60, 120, 30, 30)], start=1):
+            _add_reference("Juliet", frame[y:y + h, x:x + w], name=f"ref_{i}.png")
+
+        exhaustive = detector.build_detection_context("Juliet")
+        profiles.update_profile_match_engine("Juliet", profiles.MATCH_ENGINE_FFT)
+        fft = detector.build_detection_context("Juliet")
+        self.assertEqual(fft.engine, profiles.MATCH_ENGINE_FFT)
+
+        ref_a, bbox_a, score_a = detector._find_best_match(exhaustive, frame)
+        ref_b, bbox_b, score_b = detector._find_best_match(fft, frame)
+        self.assertIsNotNone(ref_a)
+        self.assertEqual((ref_a, bbox_a), (ref_b, bbox_b))
+        self.assertAlmostEqual(score_a, score_b, places=3)
+
+    def test_unchanged_frames_reuse_last_result(self):
+        """Static frames skip matching until the frame or the context changes."""
+        from core import detector
+        pattern = _square_pattern()
+        _profile_with_reference("Kilo", pattern)
+        self.assertEqual(profiles.get_profile_change_threshold("Kilo"), profiles.DEFAULT_CHANGE_THRESHOLD)
+
+        frame = np.zeros((240, 320), dtype=np.uint8)
+        frame[40:56, 40:56] = pattern
+        noisy = frame.copy()
+        noisy[0, 0] = 3
+        moved = np.zeros_like(frame)
+        moved[180:196, 260:276] = pattern
+
+        context = detector.build_detection_context("Kilo", "ref_1.png")
+        state = detector.new_detector_state()
+        first = detector.evaluate_frame("Kilo", frame, state, context=context)
+        second = detector.evaluate_frame("Kilo", noisy, state, context=context)
+        self.assertTrue(first.matched and second.matched)
+        self.assertEqual((first.bbox, first.confidence), (second.bbox, second.confidence))
+        self.assertEqual(state.skipped_frames, 1)
+        self.assertEqual(state.full_searches, 1)
+
+        third = detector.evaluate_frame("Kilo", moved, state, context=context)
+        self.assertEqual(state.skipped_frames, 1)
+        self.assertNotEqual(third.bbox, first.bbox)
+
+        rebuilt = detector.build_detection_context("Kilo", "ref_1.png")
+        detector.evaluate_frame("Kilo", moved, state, context=rebuilt)
+        self.assertEqual(state.skipped_frames, 1)
+
+        profiles.update_profile_change_threshold("Kilo", 0)
+        disabled = detector.build_detection_context("Kilo", "ref_1.png")
+        detector.evaluate_frame("Kilo", moved, state, context=disabled)
+        detector.evaluate_frame("Kilo", moved, state, context=disabled)
+        self.assertEqual(state.skipped_frames, 1)
+
+    def test_tiled_edge_map_rescoring_matches_full_pass(self):
+        """Partial tile updates give the same best match as a full Canny and matchTemplate pass."""
+        import cv2
+        from core.edge_tiles import TiledEdgeMap
+        from core.reference_cache import CANNY_HIGH, CANNY_LOW, CompiledReference
+
+        rng = np.random.default_rng(5)
+        frame = cv2.GaussianBlur(rng.integers(0, 255, (240, 320), dtype=np.uint8), (5, 5), 0)
+        edges = cv2.Canny(frame[40:100, 60:160], CANNY_LOW, CANNY_HIGH)
+        compiled = CompiledReference("ref_1.png", "", 0, 0, None, edges)
+
+        edge_map = TiledEdgeMap(tile_size=32)
+        edge_map.update(frame)
+        edge_map.match("ref_1.png", compiled)
+        for step in range(3):
+            frame = frame.copy()
+            frame[180:220, 20 + step * 90:80 + step * 90] = rng.integers(0, 255, (40, 60), dtype=np.uint8)
+            recomputed = edge_map.tiles_recomputed
+            edge_map.update(frame)
+            self.assertLess(edge_map.tiles_recomputed - recomputed, 12)
+            score, loc = edge_map.match("ref_1.png", compiled)
+
+            full = cv2.matchTemplate(cv2.Canny(frame, CANNY_LOW, CANNY_HIGH), edges, cv2.TM_CCOEFF_NORMED)
+            _, expected_score, _, expected_loc = cv2.minMaxLoc(full)
+            self.assertEqual(loc, expected_loc)
+            self.assertAlmostEqual(score, expected_score, places=4)
+
+    def test_tiled_edge_map_matches_full_canny_over_long_sequence(self):
+        """Edges just outside dirty tiles are refreshed too, so incremental updates never drift."""
+        import cv2
+        from core.edge_tiles import TiledEdgeMap
+        from core.reference_cache import CANNY_HIGH, CANNY_LOW, CompiledReference
+
+        rng = np.random.default_rng(3)
+        base = cv2.GaussianBlur(rng.integers(0, 255, (240, 320), dtype=np.uint8), (7, 7), 0)
+        sprite = cv2.GaussianBlur(rng.integers(0, 255, (32, 40), dtype=np.uint8), (3, 3), 0)
+        compiled = CompiledReference("ref_1.png", "", 0, 0, None, cv2.Canny(base[20:80, 40:120], CANNY_LOW, CANNY_HIGH))
+
+        edge_map = TiledEdgeMap(tile_size=32)
+        for step in range(300):
+            frame = base.copy()
+            x, y = (step * 7) % 270, 60 + int(50 * np.sin(step / 9))
+            frame[y:y + 32, x:x + 40] = sprite
+            frame[200:220, (step * 13) % 290:(step * 13) % 290 + 20] = (step * 37) % 255
+            full = cv2.Canny(frame, CANNY_LOW, CANNY_HIGH)
+            np.testing.assert_array_equal(edge_map.update(frame), full)
+            score, _ = edge_map.match("ref_1.png", compiled)
+            _, expected, _, _ = cv2.minMaxLoc(cv2.matchTemplate(full, compiled.edges, cv2.TM_CCOEFF_NORMED))
+            self.assertAlmostEqual(score, expected, places=5)
+
+    def test_debug_writer_runs_off_thread_and_drops_when_full(self):
+        """Debug writes run on the writer thread and excess jobs are dropped, not queued."""
+        import threading
+        from core.debug_writer import DebugWriter
+
+        writer = DebugWriter(max_pending=1)
+        release = threading.Event()
+        threads = []
+
+        def job():
+            threads.append(threading.current_thread().name)
+            release.wait(timeout=5)
+
+        self.assertTrue(writer.submit(job))
+        deadline = time.time() + 5
+        while not threads and time.time() < deadline:
+            time.sleep(0.005)
+        self.assertTrue(writer.submit(job))
+        self.assertFalse(writer.submit(job))
+        release.set()
+        self.assertTrue(writer.flush(timeout=5))
+
+        stats = writer.stats()
+        self.assertEqual((stats["written"], stats["dropped"], stats["pending"]), (2, 1, 0))
+        self.assertEqual(threads, ["debug-writer", "debug-writer"])
+
+    def test_detection_event_writes_debug_image_in_background(self):
+        """An event start queues a debug image that is written and indexed by the writer."""
+        from unittest import mock
+        from core import detector
+        from core.debug_writer import debug_writer
+        frame = np.zeros((64, 64), dtype=np.uint8)
+        frame[16:32, 16:32] = 255
+        _profile_with_reference("Lima", frame[16:32, 16:32])
+
+        state = detector.new_detector_state()
+        submit = debug_writer.submit
+        with mock.patch.object(debug_writer, "submit", side_effect=submit) as submit_mock:
+            result = detector.evaluate_frame("Lima", frame, state, selected_reference="ref_1.png")
+        self.assertTrue(result.matched)
+        # The writer thread gets a path and a frame copy, never the detector state.
+        job_args = submit_mock.call_args.args[1:]
+        self.assertFalse(any(isinstance(arg, detector.DetectorState) for arg in job_args))
+        self.assertEqual(state.debug_counter, 1)
+        self.assertTrue(debug_writer.flush(timeout=5))
+        entries = storage.list_debug_entries("Lima")
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["path"], job_args[0])
+        self.assertTrue(os.path.isfile(entries[0]["path"]))
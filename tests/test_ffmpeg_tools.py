@@ -66,3 +66,21 @@ class FfmpegToolsTests(unittest.TestCase):
     )
     def test_resolve_camera_device_token_missing_returns_none(self, _mock_list):
         self.assertIsNone(ffmpeg_tools.resolve_camera_device_token("Camera 1"))
+
+    @patch("app.services.ffmpeg_tools.resolve_ffmpeg_path", return_value="ffmpeg")
+    def test_detection_format_crops_and_outputs_gray(self, _resolve_mock):
+        config = ffmpeg_tools.detection_capture_config(
+            ffmpeg_tools.CaptureConfig(width=1280, height=720, fps=30), crop=(1200, 600, 200, 200)
+        )
+        self.assertEqual(config.crop, (1200, 600, 80, 120))
+        self.assertEqual(config.frame_shape, (120, 80))
+        self.assertEqual(config.frame_bytes, 80 * 120)
+        cmd = ffmpeg_tools.build_ffmpeg_capture_command("video=Cam", config)
+        self.assertEqual(cmd[cmd.index("-vf") + 1], "crop=80:120:1200:600")
+        self.assertEqual(cmd[cmd.index("-pix_fmt") + 1], "gray")
+
+        full = ffmpeg_tools.CaptureConfig(width=1280, height=720, fps=30)
+        cmd = ffmpeg_tools.build_ffmpeg_capture_command("video=Cam", full)
+        self.assertNotIn("-vf", cmd)
+        self.assertEqual(cmd[cmd.index("-pix_fmt") + 1], "bgr24")
+        self.assertEqual(full.frame_bytes, 1280 * 720 * 3)
@@ -29,10 +29,10 @@ class DummyProcess:
 class DummyCapture:
     created = 0
 
-    def __init__(self, device_name, config, queue):
-        self.device_name = device_name
+    def __init__(self, input_token, config, frame_queue):
+        self.input_token = input_token
         self.config = config
-        self.queue = queue
+        self.queue = frame_queue
         self.process = DummyProcess()
         self.stop_calls = 0
         DummyCapture.created += 1
@@ -40,16 +40,17 @@ class DummyCapture:
     def start(self):
         return None
 
+    def is_alive(self):
+        return self.stop_calls == 0
+
     def stop(self):
         self.stop_calls += 1
 
 
 def _reset_globals(monitor_service):
     monitor_service._GLOBAL_CAPTURE = None
-    monitor_service._GLOBAL_QUEUE = None
-    monitor_service._GLOBAL_DEVICE = None
-    monitor_service._GLOBAL_CONFIG = None
-    monitor_service._GLOBAL_CAPTURE_USERS = 0
+    monitor_service._GLOBAL_BUS = None
+    monitor_service._GLOBAL_USERS = 0
 
 
 @unittest.skipUnless(CV2_AVAILABLE, "OpenCV unavailable in test environment")
@@ -73,14 +74,14 @@ class MonitorCaptureTests(unittest.TestCase):
             cap1, _ = self.monitor_service._ensure_global_capture("camera-1", config)
             cap2, _ = self.monitor_service._ensure_global_capture("camera-1", config)
             self.assertIs(cap1, cap2)
-            self.assertEqual(self.monitor_service._GLOBAL_CAPTURE_USERS, 2)
+            self.assertEqual(self.monitor_service._GLOBAL_USERS, 2)
 
             self.monitor_service._release_global_capture()
-            self.assertEqual(self.monitor_service._GLOBAL_CAPTURE_USERS, 1)
+            self.assertEqual(self.monitor_service._GLOBAL_USERS, 1)
             self.assertEqual(cap1.stop_calls, 0)
 
             self.monitor_service._release_global_capture()
-            self.assertEqual(self.monitor_service._GLOBAL_CAPTURE_USERS, 0)
+            self.assertEqual(self.monitor_service._GLOBAL_USERS, 0)
             self.assertEqual(cap1.stop_calls, 1)
 
     def test_start_stop_start_creates_new_capture(self):
@@ -96,6 +97,8 @@ class MonitorCaptureTests(unittest.TestCase):
     def test_monitor_stop_is_idempotent(self):
         """Ensure stop can be called twice without double-release."""
         service = self.monitor_service.MonitorService()
+        service._state.request_start()
+        service._state.mark_running()
         service._capture = DummyCapture("camera-1", CaptureConfig(1, 1, 1), None)
         service._capture_acquired = True
 
@@ -104,12 +107,26 @@ class MonitorCaptureTests(unittest.TestCase):
             service.stop()
             release_mock.assert_called_once()
 
-    def test_get_latest_global_frame_does_not_drain_queue(self):
-        """Global preview accessor should read latest frame without removing queued frames."""
-        queue = self.monitor_service.FrameQueue(maxlen=4)
-        queue.put((1.0, b"a"))
-        queue.put((2.0, b"b"))
-        self.monitor_service._GLOBAL_QUEUE = queue
-        latest = self.monitor_service.get_latest_global_frame()
-        self.assertEqual(latest, (2.0, b"b"))
-        self.assertEqual(queue.size(), 2)
+    def test_acquire_latest_global_frame_does_not_drain_subscribers(self):
+        """The preview accessor holds the newest frame without taking it from other subscribers."""
+        from app.services.frame_bus import FrameBus, FramePacket
+        from app.services.frame_ring import FrameRing
+
+        ring = FrameRing(4, (2, 2))
+        bus = FrameBus()
+        detection = bus.subscribe("detection", maxlen=4)
+        for timestamp in (1.0, 2.0):
+            slot = ring.acquire()
+            bus.publish(FramePacket(timestamp, slot.array, slot=slot))
+        self.monitor_service._GLOBAL_BUS = bus
+
+        packet = self.monitor_service.acquire_latest_global_frame()
+        self.assertEqual(packet.timestamp, 2.0)
+        self.assertEqual(detection.size(), 2)
+        packet.release()
+
+        for timestamp in (1.0, 2.0):
+            queued = detection.get(timeout=0)
+            self.assertEqual(queued.timestamp, timestamp)
+            queued.release()
+        self.assertEqual(ring.free_slots(), 3)  # the bus keeps the latest frame for previews
@@ -28,3 +28,187 @@ class PipelineTests(unittest.TestCase):
         self.assertEqual(queue.size(), 2)
         self.assertEqual(queue.get(), "x")
         self.assertEqual(queue.get(), "y")
+
+
+class FrameRingTests(unittest.TestCase):
+    """Validate zero-copy ring slots and queue release semantics."""
+
+    def test_queue_releases_dropped_and_cleared_slots(self):
+        """Dropped and cleared packets return their slots; get() hands ownership to the caller."""
+        from app.services.frame_bus import FramePacket
+        from app.services.frame_ring import FrameRing
+
+        ring = FrameRing(4, (2, 2, 3))
+        queue = FrameQueue(maxlen=2)
+        for i in range(3):
+            slot = ring.acquire()
+            queue.put(FramePacket(timestamp=i, payload=slot.array, slot=slot))
+        self.assertEqual(ring.free_slots(), 2)
+
+        latest = queue.peek_latest(retain=True)
+        queue.clear()
+        self.assertEqual(ring.free_slots(), 3)
+        latest.release()
+        self.assertEqual(ring.free_slots(), 4)
+        with self.assertRaises(RuntimeError):
+            latest.release()
+
+    def test_reader_fills_ring_slots_in_place(self):
+        """The FFmpeg reader fills preallocated slabs with readinto and never copies payloads."""
+        import io
+
+        import numpy as np
+
+        from app.services.ffmpeg_capture_supervisor import FfmpegCaptureSupervisor
+        from app.services.ffmpeg_tools import CaptureConfig
+
+        frames = [np.full((2, 4, 3), i, dtype=np.uint8) for i in range(5)]
+
+        class FakeProcess:
+            stdout = io.BytesIO(b"".join(frame.tobytes() for frame in frames) + b"\x00" * 7)
+
+            def poll(self):
+                return 0
+
+        queue = FrameQueue(maxlen=8)
+        capture = FfmpegCaptureSupervisor("token", CaptureConfig(width=4, height=2, fps=30), queue)
+        capture.process = FakeProcess()
+        capture._reader_loop()
+
+        self.assertEqual(capture.frames_captured, 5)
+        ring = capture.ring
+        self.assertEqual(ring.free_slots(), ring.capacity - 5)
+        for expected in frames:
+            packet = queue.get(timeout=0.01)
+            self.assertTrue(np.shares_memory(packet.payload, ring._buffer))
+            np.testing.assert_array_equal(packet.payload, expected)
+            packet.release()
+        self.assertEqual(ring.free_slots(), ring.capacity)
+
+
+class FrameBusTests(unittest.TestCase):
+    """Validate broadcast delivery, per-subscriber policies and slot ownership."""
+
+    def test_subscribers_have_independent_cursors_and_policies(self):
+        """Each subscriber sees every frame under its own policy and drop counters."""
+        from app.services.frame_bus import FrameBus, FramePacket, OverflowPolicy
+
+        bus = FrameBus()
+        detection = bus.subscribe("detection", maxlen=2)
+        preview = bus.subscribe("preview", maxlen=4, policy=OverflowPolicy.LAST_ONLY)
+        recorder = bus.subscribe("recorder", maxlen=8)
+        for i in range(3):
+            bus.publish(FramePacket(timestamp=float(i), payload=i))
+
+        self.assertEqual([detection.get(timeout=0.01).payload for _ in range(2)], [1, 2])
+        self.assertEqual(detection.dropped_frames, 1)
+        self.assertEqual(preview.get(timeout=0.01).payload, 2)
+        self.assertEqual(preview.dropped_frames, 2)
+        self.assertEqual(recorder.size(), 3)
+        self.assertEqual(recorder.dropped_frames, 0)
+        self.assertEqual(bus.peek_latest().payload, 2)
+
+        stats = bus.stats(now=10.0)
+        self.assertEqual(stats["recorder"]["pending"], 3)
+        self.assertAlmostEqual(stats["recorder"]["lag_ms"], 10000.0)
+        self.assertEqual(stats["detection"]["delivered"], 2)
+        with self.assertRaises(ValueError):
+            bus.subscribe("detection")
+
+    def test_block_policy_waits_for_consumer(self):
+        """A BLOCK subscriber stalls the publisher until it takes a frame, then nothing is dropped."""
+        import threading
+
+        from app.services.frame_bus import FrameBus, FramePacket, OverflowPolicy
+
+        bus = FrameBus()
+        queue = bus.subscribe("recorder", maxlen=1, policy=OverflowPolicy.BLOCK)
+        bus.publish(FramePacket(timestamp=0.0, payload=0))
+        publisher = threading.Thread(target=bus.publish, args=(FramePacket(timestamp=1.0, payload=1),))
+        publisher.start()
+        publisher.join(timeout=0.1)
+        self.assertTrue(publisher.is_alive())
+        self.assertEqual(queue.get(timeout=0.01).payload, 0)
+        publisher.join(timeout=1.0)
+        self.assertFalse(publisher.is_alive())
+        self.assertEqual(queue.get(timeout=0.01).payload, 1)
+        self.assertEqual(queue.dropped_frames, 0)
+
+    def test_slots_return_after_every_subscriber_releases(self):
+        """A ring slot is reused only once all subscribers and the latest-frame hold let go."""
+        from app.services.frame_bus import FrameBus, FramePacket
+        from app.services.frame_consumers import MetricsConsumer, SnapshotConsumer
+        from app.services.frame_ring import FrameRing
+
+        ring = FrameRing(4, (1, 1, 3))
+        bus = FrameBus()
+        metrics = MetricsConsumer(bus)
+        first = bus.subscribe("first")
+        second = bus.subscribe("second")
+        slot = ring.acquire()
+        slot.array[:] = 7
+        bus.publish(FramePacket(timestamp=0.0, payload=slot.array, slot=slot))
+        self.assertEqual(ring.free_slots(), 3)
+
+        first.get(timeout=0.01).release()
+        bus.unsubscribe("second")
+        self.assertEqual(second.size(), 0)
+        self.assertEqual(ring.free_slots(), 3)  # still the latest frame
+        self.assertEqual(SnapshotConsumer(bus).capture_snapshot().payload, b"\x07\x07\x07")
+        bus.clear()
+        self.assertEqual(ring.free_slots(), 4)
+        sample = metrics.sample()
+        self.assertGreater(sample["capture_fps"], 0.0)
+        self.assertEqual(list(sample["consumers"]), ["first"])
+
+
+class LoadSheddingTests(unittest.TestCase):
+    """Validate latest-frame-wins pulls and adaptive mode switching."""
+
+    def test_get_latest_sheds_backlog(self):
+        """get_latest returns the newest packet and counts older ones as shed, releasing their slots."""
+        from app.services.frame_bus import FramePacket
+        from app.services.frame_ring import FrameRing
+
+        ring = FrameRing(4, (1, 1, 3))
+        queue = FrameQueue(maxlen=4)
+        for i in range(3):
+            slot = ring.acquire()
+            queue.put(FramePacket(timestamp=float(i), payload=i, slot=slot))
+        packet = queue.get_latest(timeout=0.01)
+        self.assertEqual(packet.payload, 2)
+        self.assertEqual(queue.shed_frames, 2)
+        self.assertEqual(queue.size(), 0)
+        self.assertEqual(ring.free_slots(), 3)
+        packet.release()
+        self.assertIsNone(queue.get_latest(timeout=0.01))
+
+    def test_shedder_switches_on_processing_time(self):
+        """Slow processing switches to latest-only; fast processing returns to FIFO."""
+        from app.services.frame_bus import FramePacket
+        from app.services.frame_consumers import LoadShedder
+
+        queue = FrameQueue(maxlen=8)
+        shedder = LoadShedder()
+        for i in range(8):
+            queue.put(FramePacket(timestamp=i * 0.1, payload=i))
+
+        first = shedder.next_packet(queue, timeout=0.01)
+        second = shedder.next_packet(queue, timeout=0.01)
+        self.assertEqual((first.payload, second.payload), (0, 1))
+        self.assertAlmostEqual(shedder.capture_interval, 0.1)
+        shedder.record(second.timestamp, 1.0, 1.3)  # 300 ms per frame against 100 ms capture
+        self.assertTrue(shedder.shedding)
+
+        newest = shedder.next_packet(queue, timeout=0.01)
+        self.assertEqual(newest.payload, 7)
+        self.assertEqual(queue.shed_frames, 5)
+        self.assertAlmostEqual(shedder.capture_interval, 0.1)
+
+        for _ in range(20):
+            shedder.record(newest.timestamp, 2.0, 2.01)
+        self.assertFalse(shedder.shedding)
+        stats = shedder.stats()
+        self.assertEqual(stats["shed_mode"], "fifo")
+        self.assertEqual(stats["shed_switches"], 2)
+        self.assertGreater(stats["staleness_max_ms"], 0.0)
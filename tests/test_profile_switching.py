@@ -22,6 +22,10 @@ class ProfileSwitchingTests(unittest.TestCase):
         app_state.monitoring_active = False
 
     def tearDown(self):
+        from core import storage
+        from core.asset_sync import asset_sync
+        asset_sync.flush(timeout=5)
+        storage.close_connections()
         os.chdir(self.original_cwd)
         os.environ.pop("APP_DB_PATH", None)
         from app.app_state import app_state
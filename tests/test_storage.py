@@ -9,6 +9,49 @@ from core import profiles
 from core import storage
 
 
+_LEGACY_SCHEMA = """
+CREATE TABLE profiles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE NOT NULL,
+    created_at TEXT NOT NULL,
+    icon_path TEXT,
+    camera_device TEXT,
+    target_fps INTEGER,
+    detection_threshold REAL
+);
+CREATE TABLE frames (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    profile_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY(profile_id) REFERENCES profiles(id) ON DELETE CASCADE
+);
+CREATE TABLE reference_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    profile_id INTEGER NOT NULL,
+    frame_name TEXT,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY(profile_id) REFERENCES profiles(id) ON DELETE CASCADE
+);
+CREATE TABLE debug_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    profile_id INTEGER,
+    reference_name TEXT,
+    path TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY(profile_id) REFERENCES profiles(id) ON DELETE SET NULL
+);
+CREATE TABLE app_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
 class StorageTests(unittest.TestCase):
     """Validate SQLite storage behavior and migrations."""
 
@@ -20,6 +63,9 @@ class StorageTests(unittest.TestCase):
         os.environ["APP_DB_PATH"] = str(Path(self.temp_dir.name) / "Data" / "app.db")
 
     def tearDown(self):
+        from core.asset_sync import asset_sync
+        asset_sync.flush(timeout=5)
+        storage.close_connections()
         os.chdir(self.original_cwd)
         os.environ.pop("APP_DB_PATH", None)
 
@@ -68,6 +114,407 @@ class StorageTests(unittest.TestCase):
                 os.remove(path)
         self.assertLessEqual(len(storage.list_debug_entries("Gamma")), 2)
 
+    def _write_fixture_db(self, script):
+        """Create a database at APP_DB_PATH from raw SQL, bypassing migrations."""
+        import sqlite3
+
+        db_path = Path(os.environ["APP_DB_PATH"])
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(db_path)
+        conn.executescript(script)
+        conn.commit()
+        conn.close()
+
+    def _columns(self, table):
+        with storage.connect() as conn:
+            return {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+    def test_migrations_upgrade_unversioned_database(self):
+        """A pre-versioning database keeps its rows and gains every later column and index."""
+        self._write_fixture_db(_LEGACY_SCHEMA + """
+            INSERT INTO profiles (name, created_at, target_fps) VALUES ('Legacy', '2024-01-01', 24);
+            INSERT INTO reference_entries (profile_id, frame_name, name, path, created_at)
+                VALUES (1, 'frame.png', 'ref_1.png', 'ref_1.png', '2024-01-01');
+            INSERT INTO debug_entries (profile_id, reference_name, path, size_bytes, created_at)
+                VALUES (1, 'ref_1.png', 'debug.png', 10, '2024-01-01');
+        """)
+        storage.init_db()
+
+        self.assertEqual(storage.schema_version(), storage.SCHEMA_VERSION)
+        self.assertTrue({"match_engine", "change_threshold"} <= self._columns("profiles"))
+        self.assertTrue({"crop_x0", "search_region", "search_margin"} <= self._columns("reference_entries"))
+        with storage.connect() as conn:
+            indexes = {row["name"] for row in conn.execute("PRAGMA index_list(debug_entries)")}
+        self.assertIn("idx_debug_entries_created_at", indexes)
+
+        record = storage.get_profile("Legacy")
+        self.assertEqual(record.target_fps, 24)
+        self.assertIsNone(record.match_engine)
+        self.assertEqual(len(storage.list_debug_entries("Legacy")), 1)
+        region = storage.get_reference_region("Legacy", "ref_1.png")
+        self.assertIsNone(region)
+
+    def test_migrations_tolerate_partially_upgraded_layout(self):
+        """Columns added by earlier ad-hoc upgrades are not added twice."""
+        self._write_fixture_db(_LEGACY_SCHEMA + """
+            ALTER TABLE profiles ADD COLUMN match_engine TEXT;
+            INSERT INTO profiles (name, created_at, match_engine) VALUES ('Dev', '2024-01-01', 'pyramid');
+        """)
+        storage.init_db()
+        self.assertEqual(storage.schema_version(), storage.SCHEMA_VERSION)
+        self.assertEqual(storage.get_profile("Dev").match_engine, "pyramid")
+
+    def test_asset_migration_collapses_duplicates_and_upserts(self):
+        """Duplicate asset rows are collapsed on upgrade and re-adding a name updates it in place."""
+        self._write_fixture_db(_LEGACY_SCHEMA + """
+            INSERT INTO profiles (name, created_at) VALUES ('Dup', '2024-01-01');
+            INSERT INTO frames (profile_id, name, path, created_at) VALUES (1, 'f.png', 'old/f.png', '2024-01-01');
+            INSERT INTO frames (profile_id, name, path, created_at) VALUES (1, 'f.png', 'new/f.png', '2024-01-02');
+            INSERT INTO reference_entries (profile_id, name, path, created_at) VALUES (1, 'r.png', 'a', '2024-01-01');
+            INSERT INTO reference_entries (profile_id, name, path, created_at) VALUES (1, 'r.png', 'b', '2024-01-02');
+        """)
+        storage.init_db()
+        self.assertEqual([tuple(row) for row in storage.list_frame_entries("Dup")], [("f.png", "new/f.png")])
+        self.assertEqual(storage.list_references("Dup"), ["r.png"])
+
+        storage.add_frame("Dup", "f.png", "moved/f.png")
+        storage.add_reference("Dup", "r.png", "c", "f.png", crop=(1, 2, 3, 4), source_size=(10, 10))
+        storage.add_reference("Dup", "r.png", "d", None)
+        self.assertEqual([tuple(row) for row in storage.list_frame_entries("Dup")], [("f.png", "moved/f.png")])
+        self.assertEqual([tuple(row) for row in storage.list_reference_entries("Dup")], [("r.png", "d")])
+        region = storage.get_reference_region("Dup", "r.png")
+        self.assertEqual((region.x0, region.y1, region.source_width), (1, 4, 10))
+        self.assertEqual(storage.get_reference_parent_frame("Dup", "r.png"), "f.png")
+
+    def test_bulk_asset_helpers_upsert_and_delete(self):
+        """Bulk helpers write many rows per call with the same upsert rules as the single-row API."""
+        storage.create_profile("Bulk")
+        frames = [(f"f{i}.png", f"frames/f{i}.png") for i in range(50)]
+        self.assertEqual(storage.add_frames_bulk("Bulk", frames), 50)
+        self.assertEqual(storage.add_frames_bulk("Bulk", [("f0.png", "moved/f0.png")]), 1)
+        self.assertEqual(len(storage.list_frames("Bulk")), 50)
+        self.assertEqual(dict(tuple(row) for row in storage.list_frame_entries("Bulk"))["f0.png"], "moved/f0.png")
+
+        storage.add_references_bulk("Bulk", [("r0.png", "a", "f0.png"), ("r1.png", "b", None)])
+        storage.add_references_bulk("Bulk", [("r0.png", "c", None)])
+        self.assertEqual(storage.get_reference_parent_frame("Bulk", "r0.png"), "f0.png")
+        self.assertEqual(dict(tuple(row) for row in storage.list_reference_entries("Bulk"))["r0.png"], "c")
+
+        self.assertEqual(storage.delete_frames_bulk("Bulk", [name for name, _ in frames[:40]]), 40)
+        storage.delete_references_bulk("Bulk", ["r0.png", "missing.png"])
+        self.assertEqual(len(storage.list_frames("Bulk")), 10)
+        self.assertEqual(storage.list_references("Bulk"), ["r1.png"])
+        self.assertEqual(storage.add_frames_bulk("Nobody", frames), 0)
+
+    def test_asset_sync_runs_only_when_directories_change(self):
+        """list_profiles queues a background sync only for profiles whose asset directories changed."""
+        from core.asset_sync import asset_sync
+
+        profiles.create_profile("Synced")
+        frame_dir = Path(profiles.get_profile_dirs("Synced")["frames"])
+        (frame_dir / "a.png").write_bytes(b"x")
+        profiles.list_profiles()
+        self.assertTrue(asset_sync.flush(timeout=5))
+        self.assertEqual(storage.list_frames("Synced"), ["a.png"])
+
+        self.assertFalse(profiles.request_asset_sync("Synced"))
+
+        (frame_dir / "b.png").write_bytes(b"x")
+        self.assertTrue(profiles.request_asset_sync("Synced"))
+        self.assertTrue(asset_sync.flush(timeout=5))
+        self.assertEqual(storage.list_frames("Synced"), ["a.png", "b.png"])
+        self.assertFalse(profiles.request_asset_sync("Synced"))
+
+    def test_asset_watcher_applies_file_changes(self):
+        """The watcher mirrors added/removed files into SQLite and notifies subscribers."""
+        import time
+        from unittest import mock
+        from core import asset_watcher as watcher_module
+        from core.asset_watcher import asset_watcher
+
+        def wait_for(predicate):
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                if predicate():
+                    return True
+                time.sleep(0.02)
+            return False
+
+        for backend in ("inotify", "polling"):
+            with self.subTest(backend=backend), mock.patch.object(watcher_module, "WATCH_POLL_INTERVAL", 0.05):
+                name = f"Watched_{backend}"
+                profiles.create_profile(name)
+                frame_dir = Path(profiles.get_profile_dirs(name)["frames"])
+                (frame_dir / "a.png").write_bytes(b"x")
+                debug_dir = Path(profiles.get_debug_dir())
+                debug_dir.mkdir(parents=True, exist_ok=True)
+                debug_path = (debug_dir / f"{backend}.png").resolve()
+                debug_path.write_bytes(b"x")
+                storage.add_debug_entry(name, None, str(debug_path), 1)
+                events = []
+                def record(kind, profile, events=events):
+                    events.append((kind, profile))
+
+                asset_watcher.subscribe(record)
+                if not profiles.start_asset_watcher(backend=backend):
+                    self.skipTest(f"{backend} backend unavailable")
+                try:
+                    self.assertEqual(asset_watcher.backend_name, backend)
+                    self.assertTrue(wait_for(lambda: asset_watcher.covers(name)))
+                    self.assertEqual(storage.list_frames(name), ["a.png"])
+
+                    (frame_dir / "b.png").write_bytes(b"x")
+                    (frame_dir / "a.png").unlink()
+                    self.assertTrue(wait_for(lambda: storage.list_frames(name) == ["b.png"]))
+                    self.assertEqual(profiles.list_frames(name), ["b.png"])
+                    self.assertTrue(wait_for(lambda: ("frames", name) in events))
+
+                    debug_path.unlink()
+                    self.assertTrue(wait_for(lambda: not storage.list_debug_entries(name)))
+                finally:
+                    profiles.stop_asset_watcher()
+                    asset_watcher.unsubscribe(record)
+                self.assertFalse(asset_watcher.covers(name))
+
+    def test_asset_watcher_refreshes_sizes_and_legacy_debug_rows(self):
+        """Rewritten frames refresh their size; relative legacy debug rows are removed."""
+        import cv2
+        import numpy as np
+        from core.asset_watcher import asset_watcher
+
+        profiles.create_profile("Rewritten")
+        frame_dir = profiles.get_profile_dirs("Rewritten")["frames"]
+        frame_path = os.path.join(frame_dir, "a.png")
+        cv2.imwrite(frame_path, np.zeros((20, 30, 3), dtype=np.uint8))
+        storage.add_frame("Rewritten", "a.png", frame_path, (30, 20))
+        cv2.imwrite(frame_path, np.zeros((40, 50, 3), dtype=np.uint8))
+        asset_watcher._apply_assets("frames", "Rewritten", frame_dir, ["a.png"])
+        row = storage.list_frame_sizes("Rewritten")[0]
+        self.assertEqual((row["width"], row["height"]), (50, 40))
+
+        debug_dir = profiles.get_debug_dir()
+        Path(debug_dir, "old.png").write_bytes(b"x")
+        storage.add_debug_entry("Rewritten", None, os.path.relpath(os.path.join(debug_dir, "old.png")), 1)
+        os.remove(os.path.join(debug_dir, "old.png"))
+        asset_watcher._apply_debug(debug_dir, ["old.png"])
+        self.assertEqual(storage.list_debug_entries("Rewritten"), [])
+
+    def test_image_header_probe_matches_decoded_size(self):
+        """Header-only probing reports the same size as a full decode for each supported format."""
+        import cv2
+        import numpy as np
+        from core.image_header import probe_image_size
+
+        image = np.random.default_rng(0).integers(0, 255, (123, 457, 3), dtype=np.uint8)
+        cases = (
+            ("a.png", []),
+            ("b.jpg", []),
+            ("c.jpg", [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]),
+            ("d.webp", [cv2.IMWRITE_WEBP_QUALITY, 80]),
+            ("e.webp", [cv2.IMWRITE_WEBP_QUALITY, 101]),
+        )
+        for name, params in cases:
+            with self.subTest(name=name):
+                self.assertTrue(cv2.imwrite(name, image, params))
+                self.assertEqual(probe_image_size(name), (457, 123))
+        Path("junk.png").write_bytes(b"not an image")
+        self.assertIsNone(probe_image_size("junk.png"))
+        self.assertIsNone(probe_image_size("missing.png"))
+
+    def test_frame_size_is_stored_and_backfilled_without_decoding(self):
+        """Imported frames store their size; legacy rows are probed from headers and backfilled."""
+        from unittest import mock
+        import cv2
+        import numpy as np
+
+        profiles.create_profile("Sized")
+        source = Path("source.png")
+        cv2.imwrite(str(source), np.zeros((90, 160), dtype=np.uint8))
+        self.assertEqual(profiles.import_frames("Sized", [str(source)]), 1)
+        row = storage.list_frame_sizes("Sized")[0]
+        self.assertEqual((row["width"], row["height"]), (160, 90))
+
+        frame_dir = Path(profiles.get_profile_dirs("Sized")["frames"])
+        legacy = frame_dir / "0_legacy.png"
+        cv2.imwrite(str(legacy), np.zeros((72, 128), dtype=np.uint8))
+        storage.add_frame("Sized", legacy.name, str(legacy))
+        with mock.patch.object(cv2, "imread", side_effect=AssertionError("decoded")):
+            self.assertEqual(profiles.get_profile_frame_size("Sized"), (128, 72))
+        sizes = {row["name"]: (row["width"], row["height"]) for row in storage.list_frame_sizes("Sized")}
+        self.assertEqual(sizes["0_legacy.png"], (128, 72))
+        self.assertEqual(profiles.get_profile_frame_size("Nobody"), (None, None))
+
+        # Repointing a row without a size (as the integrity checker does) keeps the stored size.
+        storage.add_frames_bulk("Sized", [(legacy.name, str(frame_dir / "moved.png"))])
+        row = next(r for r in storage.list_frame_sizes("Sized") if r["name"] == legacy.name)
+        self.assertEqual((row["path"], row["width"], row["height"]), (str(frame_dir / "moved.png"), 128, 72))
+
+    def test_repeated_asset_migration_does_not_duplicate(self):
+        """Running the filesystem asset migration twice leaves one row per file."""
+        profiles.create_profile("Twice")
+        dirs = profiles.get_profile_dirs("Twice")
+        (Path(dirs["frames"]) / "frame.png").write_bytes(b"x")
+        (Path(dirs["references"]) / "ref_1.png").write_bytes(b"x")
+        profiles.migrate_profile_assets("Twice")
+        profiles.migrate_profile_assets("Twice")
+        self.assertEqual(storage.list_frames("Twice"), ["frame.png"])
+        self.assertEqual(storage.list_references("Twice"), ["ref_1.png"])
+
+    def test_failed_migration_rolls_back_its_step(self):
+        """A failing step leaves its changes and the schema version untouched."""
+        from unittest import mock
+
+        storage.init_db()
+        storage.close_connections()
+        storage._initialized_paths.clear()
+
+        def broken_step(conn):
+            conn.execute("CREATE TABLE half_done (id INTEGER)")
+            raise RuntimeError("boom")
+
+        with mock.patch.object(storage, "_MIGRATIONS", storage._MIGRATIONS + (broken_step,)):
+            with self.assertRaises(RuntimeError):
+                storage.init_db()
+        storage._initialized_paths.clear()
+        self.assertEqual(storage.schema_version(), storage.SCHEMA_VERSION)
+        with storage.connect() as conn:
+            tables = {row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertNotIn("half_done", tables)
+
+    def test_connections_are_reused_per_thread(self):
+        """Each thread reuses one connection; other threads get their own."""
+        import threading
+
+        storage.init_db()
+        with storage.connect() as first:
+            pass
+        with storage.connect() as second:
+            pass
+        self.assertIs(first, second)
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(storage.list_profiles() is not None and storage._local.conn))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], first)
+
+        storage.close_connections()
+        with storage.connect() as reopened:
+            self.assertIsNot(reopened, first)
+
+    def test_transaction_groups_writes_and_rolls_back(self):
+        """Writes inside transaction() commit together or not at all."""
+        storage.init_db()
+        with self.assertRaises(RuntimeError):
+            with storage.transaction():
+                storage.create_profile("Rollback")
+                storage.set_app_state("last_profile", "Rollback")
+                raise RuntimeError("abort")
+        self.assertIsNone(storage.get_profile("Rollback"))
+        self.assertIsNone(storage.get_app_state("last_profile"))
+
+        with storage.transaction():
+            storage.create_profile("Batch")
+            storage.set_app_state("last_profile", "Batch")
+        self.assertIsNotNone(storage.get_profile("Batch"))
+        self.assertEqual(storage.get_app_state("last_profile"), "Batch")
+
+    def test_profile_cache_is_invalidated_by_writes(self):
+        """Cached profile records are reused until a write touches the profile."""
+        import threading
+
+        storage.create_profile("Cached")
+        first = storage.get_profile("Cached")
+        self.assertIs(storage.get_profile("Cached"), first)
+        self.assertIs(storage.get_profile_by_id(first.id), first)
+
+        thread = threading.Thread(target=lambda: storage.update_profile_fields("Cached", target_fps=12))
+        thread.start()
+        thread.join()
+        self.assertEqual(storage.get_profile("Cached").target_fps, 12)
+
+        with self.assertRaises(RuntimeError):
+            with storage.transaction():
+                storage.update_profile_fields("Cached", target_fps=48)
+                self.assertEqual(storage.get_profile("Cached").target_fps, 48)
+                raise RuntimeError("abort")
+        self.assertEqual(storage.get_profile("Cached").target_fps, 12)
+
+        # Debug writes and pruning leave profile records cached.
+        cached = storage.get_profile("Cached")
+        storage.add_debug_entry("Cached", None, "a.png", 10)
+        storage.add_debug_entry("Cached", None, "b.png", 10)
+        self.assertEqual(storage.prune_debug_entries(10, 1), ["a.png"])
+        self.assertIs(storage.get_profile("Cached"), cached)
+
+        storage.delete_profile("Cached")
+        self.assertIsNone(storage.get_profile("Cached"))
+        self.assertIsNone(storage.get_profile_by_id(first.id))
+
+    def test_debug_pruning_matches_oldest_first_eviction(self):
+        """Set-based pruning evicts exactly the oldest rows past either bound."""
+        profiles.create_profile("Gamma")
+        sizes = [5, 40, 7, 300, 12, 1, 90, 33, 8, 60] * 40
+        with storage.connect() as conn:
+            conn.executemany(
+                "INSERT INTO debug_entries (profile_id, reference_name, path, size_bytes, created_at)"
+                " VALUES (NULL, NULL, ?, ?, ?)",
+                [(f"debug_{i}.png", size, f"2026-01-01T00:00:{i // 2:06d}") for i, size in enumerate(sizes)],
+            )
+
+        def expected(rows, max_bytes, max_count):
+            rows = list(rows)
+            total = sum(size for _, size in rows)
+            removed = []
+            while rows and (total > max_bytes or len(rows) > max_count):
+                path, size = rows.pop(0)
+                removed.append(path)
+                total -= size
+            return removed
+
+        remaining = [(f"debug_{i}.png", size) for i, size in enumerate(sizes)]
+        for max_bytes, max_count in [(10**9, 390), (20_000, 390), (10**9, 100), (2_000, 80)]:
+            removed = storage.prune_debug_entries(max_bytes=max_bytes, max_count=max_count)
+            self.assertEqual(removed, expected(remaining, max_bytes, max_count))
+            remaining = remaining[len(removed):]
+            self.assertEqual(
+                sorted(row["path"] for row in storage.list_debug_entries(None)),
+                sorted(path for path, _ in remaining),
+            )
+        self.assertEqual(storage.prune_debug_entries(max_bytes=2_000, max_count=80), [])
+
+    def test_debug_usage_tracks_deletions_and_reconciles(self):
+        """Debug usage totals follow deletions and a rescan corrects outside changes."""
+        from core.debug_usage import DebugUsage, debug_usage
+
+        profiles.create_profile("Gamma")
+        debug_dir = Path(profiles.get_debug_dir())
+        for i in range(3):
+            path = debug_dir / f"debug_{i}.png"
+            path.write_bytes(b"x" * 10)
+            storage.add_debug_entry("Gamma", None, str(path.resolve()), 10)
+        debug_usage.seed(str(debug_dir), profiles.DEBUG_EXTENSIONS)
+        self.assertEqual(debug_usage.snapshot(), (30, 3))
+
+        success, freed = profiles.delete_debug_frame("Gamma", "debug_0.png")
+        self.assertTrue(success)
+        self.assertEqual(freed, 10)
+        self.assertEqual(debug_usage.snapshot(), (20, 2))
+
+        (debug_dir / "external.png").write_bytes(b"x" * 5)
+        self.assertEqual(debug_usage.snapshot(), (20, 2))
+        self.assertTrue(debug_usage.reconcile())
+        self.assertEqual(debug_usage.snapshot(), (25, 3))
+
+        deleted, freed = profiles.delete_all_debug_frames("Gamma")
+        self.assertEqual((deleted, freed), (2, 20))
+        self.assertEqual(debug_usage.snapshot(), (5, 1))
+
+        fresh = DebugUsage()
+        self.assertTrue(fresh.reconcile_due())
+        fresh.seed(str(debug_dir), profiles.DEBUG_EXTENSIONS)
+        self.assertFalse(fresh.reconcile_due())
+
     def test_filesystem_migration(self):
         """Profiles in filesystem migrate into SQLite on list."""
         legacy_dir = Path("Data") / "Profiles" / "Legacy"
@@ -76,7 +523,11 @@ class StorageTests(unittest.TestCase):
         self.assertIn("Legacy", names)
 
     def test_missing_file_cleanup(self):
-        """Missing frame/reference files are removed from SQLite listings."""
+        """The integrity checker removes rows for missing files and repoints moved ones."""
+        from unittest import mock
+        from core import asset_integrity as integrity_module
+        from core.asset_integrity import asset_integrity
+
         profiles.create_profile("Delta")
         frame_dir = Path("Data") / "Profiles" / "Delta" / "frames"
         frame_dir.mkdir(parents=True, exist_ok=True)
@@ -84,8 +535,8 @@ class StorageTests(unittest.TestCase):
         frame_path.write_bytes(b"fake")
         storage.add_frame("Delta", frame_path.name, str(frame_path))
         frame_path.unlink()
-        self.assertNotIn("gone.png", profiles.list_frames("Delta"))
-        self.assertEqual(storage.list_frames("Delta"), [])
+        (frame_dir / "kept.png").write_bytes(b"fake")
+        storage.add_frame("Delta", "kept.png", "elsewhere/kept.png")
 
         ref_dir = Path("Data") / "Profiles" / "Delta" / "references"
         ref_dir.mkdir(parents=True, exist_ok=True)
@@ -93,8 +544,33 @@ class StorageTests(unittest.TestCase):
         ref_path.write_bytes(b"fake")
         storage.add_reference("Delta", ref_path.name, str(ref_path), None)
         ref_path.unlink()
-        self.assertNotIn("missing_ref.png", profiles.list_references("Delta"))
-        self.assertEqual(storage.list_references("Delta"), [])
+        self.assertIn("gone.png", profiles.list_frames("Delta"))
+
+        with mock.patch.object(integrity_module, "INTEGRITY_CHUNK_ROWS", 1):
+            repairs = asset_integrity.check_profile(profiles.BASE_DIR, "Delta")
+        self.assertEqual(
+            sorted((r.kind, r.name, r.action) for r in repairs),
+            [("frames", "gone.png", "removed"), ("frames", "kept.png", "repointed"),
+             ("references", "missing_ref.png", "removed")],
+        )
+        self.assertEqual(profiles.list_frames("Delta"), ["kept.png"])
+        self.assertEqual(profiles.list_references("Delta"), [])
+        self.assertEqual(dict(tuple(row) for row in storage.list_frame_entries("Delta"))["kept.png"],
+                         str(frame_dir / "kept.png"))
+        self.assertEqual(asset_integrity.check_profile(profiles.BASE_DIR, "Delta"), [])
+
+        import time
+        (frame_dir / "kept.png").unlink()
+        self.assertTrue(asset_integrity.start(profiles.BASE_DIR))
+        try:
+            asset_integrity.request("Delta")
+            deadline = time.monotonic() + 5
+            while profiles.list_frames("Delta") and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            asset_integrity.stop()
+        self.assertEqual(profiles.list_frames("Delta"), [])
+        self.assertEqual(asset_integrity.stats()["recent"][-1].name, "kept.png")
 
     def test_import_guard_skips_self_copy(self):
         """Import guard skips copying a frame into itself."""
@@ -106,3 +582,55 @@ class StorageTests(unittest.TestCase):
         added = profiles.import_frames("Echo", [str(frame_path)])
         self.assertEqual(added, 0)
         self.assertEqual(storage.list_frames("Echo"), [])
+
+    def test_reference_crop_region_round_trip(self):
+        """Crop coordinates persist and the search region can be toggled."""
+        profiles.create_profile("Foxtrot")
+        ref_path = Path("Data") / "Profiles" / "Foxtrot" / "references" / "ref_1.png"
+        ref_path.write_bytes(b"fake")
+        storage.add_reference(
+            "Foxtrot", ref_path.name, str(ref_path), "frame.png",
+            crop=(10, 20, 50, 60), source_size=(1280, 720),
+        )
+        region = profiles.get_reference_search_region("Foxtrot", "ref_1.png")
+        self.assertEqual((region.x0, region.y0, region.x1, region.y1), (10, 20, 50, 60))
+        self.assertEqual((region.source_width, region.source_height), (1280, 720))
+        self.assertFalse(region.search_enabled)
+        self.assertEqual(profiles.list_reference_search_regions("Foxtrot"), {})
+
+        success, _ = profiles.set_reference_search_region("Foxtrot", "ref_1.png", True)
+        self.assertTrue(success)
+        regions = profiles.list_reference_search_regions("Foxtrot")
+        self.assertTrue(regions["ref_1.png"].search_enabled)
+        self.assertEqual(regions["ref_1.png"].search_margin, profiles.DEFAULT_SEARCH_MARGIN)
+
+        storage.add_reference("Foxtrot", "legacy.png", str(ref_path), None)
+        success, _ = profiles.set_reference_search_region("Foxtrot", "legacy.png", True)
+        self.assertFalse(success)
+
+    def test_thread_connections_are_closed_or_reaped(self):
+        """Exited threads do not keep connections; stopped workers close theirs."""
+        import threading
+
+        from core.asset_sync import asset_sync
+        from core.debug_writer import debug_writer
+
+        asset_sync.stop(timeout=5)
+        storage.init_db()
+
+        def query(close):
+            storage.list_profiles()
+            if close:
+                storage.close_thread_connection()
+
+        for index in range(20):
+            thread = threading.Thread(target=query, args=(index % 2 == 0,))
+            thread.start()
+            thread.join()
+        debug_writer.submit(storage.list_profiles)
+        debug_writer.stop(timeout=5)
+        self.assertFalse(debug_writer._thread.is_alive())
+        storage.close_thread_connection()
+        storage.list_profiles()  # opening a connection reaps those of dead threads
+        owners = [owner() for owner in storage._open_connections.values()]
+        self.assertEqual(owners, [threading.current_thread()])
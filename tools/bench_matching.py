@@ -0,0 +1,204 @@
+"""Benchmark the pyramid and FFT matchers against the exhaustive matcher.
+
+Usage:
+    python tools/bench_matching.py --frames path/to/recorded_frames --reference ref.png
+    python tools/bench_matching.py            # synthetic 1280x720 frames
+    python tools/bench_matching.py --ref-counts 1,4,16
+
+Reports mean per-frame matching time for each engine, the speedup, and how
+often each engine agrees with the exhaustive path on the match decision and bbox.
+A second table matches 1, 8 and 32 references per frame (the reference plus
+synthetic distractors) with the FFT engine and the direct spatial path, showing
+how each scales with the reference count.
+Exits non-zero when an engine disagrees with the exhaustive path on whether a
+frame matches, or when a score that decides it drifts by more than
+SCORE_TOLERANCE. FFT scores are checked on every frame. Pyramid scores are only
+checked from PYRAMID_CONFIRM_MARGIN below the threshold up, because far below
+it the pyramid reports a lower bound.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import detector  # noqa: E402
+from core.profiles import (  # noqa: E402
+    MATCH_ENGINE_EXHAUSTIVE,
+    MATCH_ENGINE_FFT,
+    MATCH_ENGINE_PYRAMID,
+)
+from core.reference_cache import ReferenceCache  # noqa: E402
+
+SCORE_TOLERANCE = 1e-4  # float noise between spatial, sub-window and FFT correlation
+
+
+def _synthetic_frames(count, width, height, seed=7):
+    """Yield (frames, reference_path) with a textured template pasted at random spots."""
+    rng = np.random.default_rng(seed)
+    template = np.zeros((96, 240), dtype=np.uint8)
+    cv2.rectangle(template, (4, 4), (235, 91), 255, 2)
+    cv2.putText(template, "DIALOGUE", (18, 62), cv2.FONT_HERSHEY_SIMPLEX, 1.3, 255, 3)
+    ref_path = os.path.join(tempfile.mkdtemp(), "ref_synthetic.png")
+    cv2.imwrite(ref_path, template)
+
+    frames = []
+    for i in range(count):
+        frame = cv2.GaussianBlur(rng.integers(0, 90, (height, width), dtype=np.uint8), (9, 9), 0)
+        for _ in range(12):
+            x, y = int(rng.integers(0, width - 80)), int(rng.integers(0, height - 80))
+            cv2.rectangle(frame, (x, y), (x + int(rng.integers(20, 80)), y + int(rng.integers(20, 80))), 200, 2)
+        if i % 2 == 0:
+            x = int(rng.integers(0, width - template.shape[1]))
+            y = int(rng.integers(0, height - template.shape[0]))
+            frame[y:y + template.shape[0], x:x + template.shape[1]] = template  # opaque, like a dialogue box
+        frames.append(frame)
+    return frames, ref_path
+
+
+def _synthetic_references(count, seed=11):
+    """Return paths of count distractor templates in two sizes with distinct text."""
+    rng = np.random.default_rng(seed)
+    directory = tempfile.mkdtemp()
+    paths = []
+    for i in range(count):
+        height, width = (96, 240) if i % 2 == 0 else (72, 200)
+        template = np.zeros((height, width), dtype=np.uint8)
+        cv2.rectangle(template, (4, 4), (width - 5, height - 5), 255, 2)
+        text = "".join(chr(int(c)) for c in rng.integers(65, 91, 6))
+        cv2.putText(template, text, (14, height - 28), cv2.FONT_HERSHEY_SIMPLEX, 1.1, 255, 3)
+        path = os.path.join(directory, f"ref_distractor_{i:02d}.png")
+        cv2.imwrite(path, template)
+        paths.append(path)
+    return paths
+
+
+def _load_frames(frames_dir):
+    frames = []
+    for name in sorted(os.listdir(frames_dir), key=str.lower):
+        if not name.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
+            continue
+        frame = cv2.imread(os.path.join(frames_dir, name), cv2.IMREAD_GRAYSCALE)
+        if frame is not None:
+            frames.append(frame)
+    return frames
+
+
+def _context(references, engine, threshold):
+    return detector.DetectionContext(
+        profile_name="bench",
+        profile_valid=False,
+        threshold=threshold,
+        references_dir="",
+        debug_dir=None,
+        references={compiled.name: compiled for compiled in references},
+        tracking=False,
+        engine=engine,
+    )
+
+
+def _run(context, frames):
+    results = []
+    start = time.perf_counter()
+    for frame in frames:
+        results.append(detector._find_best_match(context, frame))
+    elapsed = time.perf_counter() - start
+    return results, elapsed / max(1, len(frames))
+
+
+def _compare(baseline, results):
+    """Return (frames agreeing on reference and bbox, max score delta) against baseline."""
+    agree = sum(
+        1
+        for (ref_a, bbox_a, _), (ref_b, bbox_b, _) in zip(baseline, results)
+        if ref_a == ref_b and bbox_a == bbox_b
+    )
+    return agree, max(abs(a[2] - b[2]) for a, b in zip(baseline, results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", help="directory of recorded frames")
+    parser.add_argument("--reference", help="reference PNG to match")
+    parser.add_argument("--count", type=int, default=40, help="synthetic frame count")
+    parser.add_argument("--threshold", type=float, default=0.70)
+    parser.add_argument(
+        "--ref-counts",
+        type=lambda value: [int(v) for v in value.split(",") if v],
+        default=[1, 8, 32],
+        help="comma-separated reference counts for the scaling table",
+    )
+    parser.add_argument("--scaling-frames", type=int, default=10, help="frames per scaling row")
+    args = parser.parse_args()
+
+    if args.frames and args.reference:
+        frames = _load_frames(args.frames)
+        ref_path = args.reference
+    else:
+        frames, ref_path = _synthetic_frames(args.count, 1280, 720)
+    if not frames:
+        print("No frames to benchmark.")
+        return 1
+
+    cache = ReferenceCache()
+    compiled = cache.get("bench", os.path.basename(ref_path), ref_path)
+    if compiled is None:
+        print(f"Reference could not be loaded: {ref_path}")
+        return 1
+
+    status = 0
+    exhaustive, t_exhaustive = _run(_context([compiled], MATCH_ENGINE_EXHAUSTIVE, args.threshold), frames)
+    print(f"frames:            {len(frames)}")
+    print(f"exhaustive:        {t_exhaustive * 1000:.2f} ms/frame")
+
+    for engine in (MATCH_ENGINE_PYRAMID, MATCH_ENGINE_FFT):
+        results, elapsed = _run(_context([compiled], engine, args.threshold), frames)
+        agree, max_delta = _compare(exhaustive, results)
+        decisions = sum(1 for a, b in zip(exhaustive, results) if a[0] == b[0])
+        floor = args.threshold - detector.PYRAMID_CONFIRM_MARGIN if engine == MATCH_ENGINE_PYRAMID else -1.0
+        checked = [abs(a[2] - b[2]) for a, b in zip(exhaustive, results) if a[2] >= floor]
+        checked_delta = max(checked, default=0.0)
+        print(f"{engine + ':':<19}{elapsed * 1000:.2f} ms/frame")
+        print(f"  speedup:         {t_exhaustive / max(elapsed, 1e-9):.2f}x")
+        print(f"  agreement:       {agree}/{len(frames)} (decision {decisions}/{len(frames)})")
+        print(f"  max score delta: {max_delta:.4f} (checked frames {checked_delta:.4f})")
+        if decisions < len(frames) or checked_delta > SCORE_TOLERANCE:
+            print(f"  FAIL: decision mismatch or checked score delta above {SCORE_TOLERANCE}")
+            status = 1
+
+    counts = sorted(count for count in args.ref_counts if count > 0)
+    if not counts:
+        return status
+    distractors = [
+        cache.get("bench", os.path.basename(path), path)
+        for path in _synthetic_references(counts[-1] - 1)
+    ]
+    sample = frames[: max(1, args.scaling_frames)]
+    print()
+    print(f"reference scaling over {len(sample)} frames (ms/frame, ms per reference in brackets):")
+    print(f"{'refs':>5}  {'direct':>15}  {'fft':>15}  {'speedup':>7}  {'agreement':>9}  {'max delta':>9}")
+    for count in counts:
+        references = [compiled] + distractors[: count - 1]
+        direct, t_direct = _run(_context(references, MATCH_ENGINE_EXHAUSTIVE, args.threshold), sample)
+        fft, t_fft = _run(_context(references, MATCH_ENGINE_FFT, args.threshold), sample)
+        agree, max_delta = _compare(direct, fft)
+        print(
+            f"{count:>5}  {t_direct * 1000:>7.2f} ({t_direct * 1000 / count:>5.2f})"
+            f"  {t_fft * 1000:>7.2f} ({t_fft * 1000 / count:>5.2f})"
+            f"  {t_direct / max(t_fft, 1e-9):>6.2f}x  {agree:>4}/{len(sample):<4}  {max_delta:>9.4f}"
+        )
+        if max_delta > SCORE_TOLERANCE:
+            print(f"  FAIL: fft score delta exceeds {SCORE_TOLERANCE} with {count} references")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Benchmark frame/reference metadata lookups on large profiles.
+
+Usage:
+    python tools/bench_storage.py                 # 10k frames + 10k references
+    python tools/bench_storage.py --assets 50000
+    python tools/bench_storage.py --drop-indexes  # compare against unindexed tables
+
+Reports mean time per call for listing, keyed lookups, path updates,
+batched imports and deletes against a temporary database.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import storage  # noqa: E402
+
+_ASSET_INDEXES = (
+    "idx_frames_profile_name",
+    "idx_frames_profile_lower_name",
+    "idx_reference_entries_profile_name",
+    "idx_reference_entries_profile_lower_name",
+)
+
+
+def _populate(profile: str, count: int) -> None:
+    storage.create_profile(profile)
+    profile_id = storage.get_profile(profile).id
+    now = storage._now()
+    with storage.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO frames (profile_id, name, path, created_at) VALUES (?, ?, ?, ?)",
+            [(profile_id, f"Frame_{i:06d}.png", f"frames/Frame_{i:06d}.png", now) for i in range(count)],
+        )
+        conn.executemany(
+            "INSERT INTO reference_entries (profile_id, frame_name, name, path, created_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            [
+                (profile_id, f"Frame_{i:06d}.png", f"ref_{i:06d}.png", f"refs/ref_{i:06d}.png", now)
+                for i in range(count)
+            ],
+        )
+
+
+def _time(label: str, calls: int, func) -> None:
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    elapsed = (time.perf_counter() - start) / calls
+    print(f"{label:<28}{elapsed * 1000:8.3f} ms/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--assets", type=int, default=10_000, help="frames and references per profile")
+    parser.add_argument("--profiles", type=int, default=3, help="profiles sharing the database")
+    parser.add_argument("--calls", type=int, default=200, help="calls per keyed operation")
+    parser.add_argument("--drop-indexes", action="store_true", help="drop the asset indexes first")
+    args = parser.parse_args()
+
+    os.environ["APP_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    storage.init_db()
+    if args.drop_indexes:
+        with storage.connect() as conn:
+            for index in _ASSET_INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {index}")
+
+    for p in range(args.profiles):
+        _populate(f"Bench{p}", args.assets)
+    profile = "Bench0"
+    n = args.assets
+    print(f"assets/profile:             {n} frames + {n} references x {args.profiles} profiles")
+    print(f"indexes:                    {'dropped' if args.drop_indexes else 'present'}")
+
+    _time("list_frames", 5, lambda i: storage.list_frames(profile))
+    _time("list_reference_entries", 5, lambda i: storage.list_reference_entries(profile))
+    _time("get_reference_parent_frame", args.calls, lambda i: storage.get_reference_parent_frame(
+        profile, f"ref_{(i * 7919) % n:06d}.png"))
+    _time("update_frame_path", args.calls, lambda i: storage.update_frame_path(
+        profile, f"Frame_{(i * 7919) % n:06d}.png", f"moved/{i}.png"))
+    if not args.drop_indexes:  # frame writes upsert on the unique (profile_id, name) index
+        _time("add_frame (upsert existing)", args.calls, lambda i: storage.add_frame(
+            profile, f"Frame_{(i * 104729) % n:06d}.png", f"again/{i}.png"))
+        batch = [(f"Import_{j:04d}.png", f"imports/{j}.png") for j in range(500)]
+        _time("add_frame x500 (loop)", 3, lambda i: [storage.add_frame(profile, *row) for row in batch])
+        _time("add_frames_bulk x500", 3, lambda i: storage.add_frames_bulk(profile, batch))
+    _time("delete_reference", args.calls, lambda i: storage.delete_reference(profile, f"ref_{i:06d}.png"))
+    storage.close_connections()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())